@@ -0,0 +1,159 @@
+"""
+Diccionario normalizado de características de las propiedades.
+
+Cada fila de `features` sigue guardando el texto que se muestra, pero las que
+corresponden a una característica conocida apuntan además a la tabla
+`amenities` (`amenity_id` = clave estable como "pool" o "garage"), de modo que
+"Piscina", "piscina" y "Piscina comunitaria" son la misma. Con esa clave se
+filtra el listado (`features=pool,garage`): en el catálogo en memoria cada
+característica es un bit de una columna uint64, así que "piscina Y garaje Y
+ascensor" es una sola operación AND sobre todas las propiedades.
+"""
+from datetime import timedelta
+
+from text_utils import normalize
+
+# clave -> (nombre, sinónimos). El orden da la posición del bit en el catálogo.
+AMENITIES = {
+    "pool": ("Piscina", ("piscina", "pool")),
+    "garage": ("Garaje", ("garaje", "parking", "aparcamiento", "plaza de garaje", "cochera")),
+    "terrace": ("Terraza", ("terraza", "atico con terraza")),
+    "lift": ("Ascensor", ("ascensor", "elevador")),
+    "air_conditioning": ("Aire acondicionado", ("aire acondicionado", "climatizacion", "a/a")),
+    "heating": ("Calefacción", ("calefaccion", "suelo radiante")),
+    "garden": ("Jardín", ("jardin", "zona verde")),
+    "storage": ("Trastero", ("trastero",)),
+    "balcony": ("Balcón", ("balcon",)),
+    "furnished": ("Amueblado", ("amueblado", "amueblada", "muebles")),
+    "built_in_wardrobes": ("Armarios empotrados", ("armarios empotrados", "armario empotrado")),
+    "concierge": ("Portero", ("portero", "conserje", "conserjeria")),
+    "security": ("Seguridad", ("seguridad", "alarma", "vigilancia")),
+    "accessible": ("Accesible", ("accesible", "adaptado", "movilidad reducida")),
+    "pets": ("Admite mascotas", ("mascotas", "admite mascotas")),
+    "sea_view": ("Vistas al mar", ("vistas al mar", "primera linea de playa"))
+}
+
+assert len(AMENITIES) <= 64, "El catálogo guarda las características en un uint64"
+
+BITS = {key: 1 << position for position, key in enumerate(AMENITIES)}
+
+# Sinónimos más largos primero: "plaza de garaje" antes que "garaje"
+ALIASES = sorted(
+    ((normalize(alias), key) for key, (_, aliases) in AMENITIES.items() for alias in aliases),
+    key=lambda item: -len(item[0])
+)
+
+SYNC_LOCK = "amenities.sync"
+
+SEED_SQL = """
+    INSERT INTO amenities (key, name)
+    SELECT * FROM unnest($1::text[], $2::text[])
+    ON CONFLICT (key) DO UPDATE SET name = EXCLUDED.name
+"""
+
+BACKFILL_SQL = """
+    UPDATE features f
+    SET amenity_id = t.key, name = t.display, updated_at = now() AT TIME ZONE 'UTC'
+    FROM unnest($1::text[], $2::text[], $3::text[]) AS t(name, key, display)
+    WHERE f.amenity_id IS NULL AND f.name = t.name
+    RETURNING f.property_id
+"""
+
+# Una misma característica repetida en una propiedad: se conserva la más antigua
+DEDUPLICATE_SQL = """
+    DELETE FROM features f
+    USING features g
+    WHERE f.amenity_id IS NOT NULL
+      AND g.property_id = f.property_id AND g.amenity_id = f.amenity_id
+      AND (g.created_at, g.id) < (f.created_at, f.id)
+    RETURNING f.property_id
+"""
+
+
+def match(name):
+    """
+    Clave de la característica que corresponde a un texto libre, o None
+    """
+    text = f" {normalize(name)} "
+    # "Sin ascensor", "No admite mascotas"
+    if text.startswith((" sin ", " no ")):
+        return None
+    for alias, key in ALIASES:
+        if f" {alias} " in text:
+            return key
+    return None
+
+
+def display_name(name, key):
+    """
+    Nombre del diccionario si el texto es solo un sinónimo ("piscina" -> "Piscina");
+    si añade algo ("Piscina comunitaria") se conserva
+    """
+    if normalize(name) in {normalize(alias) for alias in AMENITIES[key][1]}:
+        return AMENITIES[key][0]
+    return name.strip()
+
+
+def parse(features):
+    """
+    "pool,garage" -> ["pool", "garage"]; ValueError si alguna clave no existe
+    """
+    keys = list(dict.fromkeys(key.strip() for key in features.split(",") if key.strip()))
+    for key in keys:
+        if key not in AMENITIES:
+            raise ValueError(key)
+    return keys
+
+
+def bitmask(keys):
+    mask = 0
+    for key in keys:
+        mask |= BITS.get(key, 0)
+    return mask
+
+
+async def needs_sync(db):
+    """
+    Solo lectura: True si la tabla `amenities` no coincide con `AMENITIES` o
+    quedan características de texto libre sin enlazar que sí se reconocen
+    """
+    rows = await db.query_raw("SELECT key, name FROM amenities")
+    if {row["key"]: row["name"] for row in rows} != {key: name for key, (name, _) in AMENITIES.items()}:
+        return True
+    rows = await db.query_raw("SELECT DISTINCT name FROM features WHERE amenity_id IS NULL")
+    return any(match(row["name"]) for row in rows)
+
+
+async def seed_dictionary(db):
+    """
+    Crea o actualiza las filas de `amenities` a partir de `AMENITIES`
+    """
+    await db.execute_raw(SEED_SQL, list(AMENITIES), [name for name, _ in AMENITIES.values()])
+
+
+async def sync_amenities(db, timeout=timedelta(minutes=5)):
+    """
+    Crea o actualiza el diccionario y enlaza las características antiguas de
+    texto libre. Devuelve los ids de las propiedades modificadas. El bloqueo
+    consultivo impide que dos procesos lo hagan a la vez.
+    """
+    async with db.tx(timeout=timeout) as tx:
+        await tx.query_raw("SELECT pg_advisory_xact_lock(hashtext($1))::text AS locked", SYNC_LOCK)
+        await seed_dictionary(tx)
+
+        rows = await tx.query_raw("SELECT DISTINCT name FROM features WHERE amenity_id IS NULL")
+        matched = [(row["name"], match(row["name"])) for row in rows]
+        matched = [(name, key) for name, key in matched if key]
+
+        changed = set()
+        if matched:
+            rows = await tx.query_raw(
+                BACKFILL_SQL,
+                [name for name, _ in matched],
+                [key for _, key in matched],
+                [display_name(name, key) for name, key in matched]
+            )
+            changed.update(row["property_id"] for row in rows)
+        rows = await tx.query_raw(DEDUPLICATE_SQL)
+        changed.update(row["property_id"] for row in rows)
+    return changed
@@ -0,0 +1,106 @@
+"""
+Benchmark: latencia de las lecturas del catálogo con Prisma frente a asyncpg.
+
+Ejecuta las mismas consultas públicas (listado, detalle, destacadas y posts)
+por los dos caminos contra la base de datos de DATABASE_URL y muestra la
+latencia media, p50 y p95 de cada una.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_catalog_reads --iterations 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from prisma import Prisma
+
+from catalog_reader import CatalogReader
+
+load_dotenv()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def measure(fn, iterations):
+    await fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--statement-cache-size", type=int, default=100)
+    args = parser.parse_args()
+
+    db = Prisma()
+    await db.connect()
+    reader = CatalogReader(
+        dsn=os.getenv("CATALOG_READ_DATABASE_URL", os.getenv("DATABASE_URL")),
+        statement_cache_size=args.statement_cache_size
+    )
+    await reader.connect()
+
+    try:
+        sample = await db.property.find_first()
+        property_id = sample.id if sample else "00000000-0000-0000-0000-000000000000"
+        include = {"images": True, "features": True}
+        post_include = {"categories": {"include": {"category": True}}}
+
+        cases = {
+            "get_properties": (
+                lambda: db.property.find_many(where={"status": "ACTIVE"}, include=include, take=args.limit),
+                lambda: reader.fetch_properties(status="ACTIVE", limit=args.limit)
+            ),
+            "get_property": (
+                lambda: db.property.find_unique(where={"id": property_id}, include=include),
+                lambda: reader.fetch_property(property_id)
+            ),
+            "get_featured_properties": (
+                lambda: db.property.find_many(where={"featured": True, "status": "ACTIVE"}, include=include, take=6),
+                lambda: reader.fetch_featured_properties(limit=6)
+            ),
+            "get_posts": (
+                lambda: db.post.find_many(
+                    where={"published": True},
+                    include=post_include,
+                    take=args.limit,
+                    order_by={"createdAt": "desc"}
+                ),
+                lambda: reader.fetch_posts(published=True, limit=args.limit)
+            ),
+        }
+
+        print(f"{'endpoint':<26}{'camino':<10}{'media':>10}{'p50':>10}{'p95':>10}   (ms, {args.iterations} iteraciones)")
+        for name, (prisma_fn, asyncpg_fn) in cases.items():
+            results = {}
+            for label, fn in (("prisma", prisma_fn), ("asyncpg", asyncpg_fn)):
+                samples = await measure(fn, args.iterations)
+                results[label] = statistics.mean(samples)
+                print(
+                    f"{name:<26}{label:<10}{results[label]:>10.3f}"
+                    f"{percentile(samples, 50):>10.3f}{percentile(samples, 95):>10.3f}"
+                )
+            print(f"{'':<26}{'delta':<10}{results['prisma'] - results['asyncpg']:>10.3f}")
+    finally:
+        await reader.close()
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
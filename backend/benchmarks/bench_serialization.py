@@ -0,0 +1,104 @@
+"""
+Microbenchmark: serialización de 100 propiedades.
+
+Compara el camino por defecto de FastAPI (validar con `response_model` y
+codificar con el encoder JSON estándar) con el camino rápido de `fast_json`.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_serialization --listings 100 --rounds 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+
+import fast_json
+from server import PropertyResponse
+
+
+def fake_property(i):
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i)
+    return SimpleNamespace(
+        id=f"00000000-0000-4000-8000-{i:012d}",
+        title=f"Piso luminoso en Delicias {i}",
+        slug=f"piso-luminoso-en-delicias-{i}",
+        description="Vivienda reformada con calefacción central y ascensor. " * 8,
+        price=150000.0 + i * 1000,
+        location="Delicias",
+        address=f"Calle Delicias {i}",
+        zipCode="50017",
+        city="Zaragoza",
+        province="Zaragoza",
+        latitude=41.65 + i * 0.0001,
+        longitude=-0.90 - i * 0.0001,
+        bedrooms=3,
+        bathrooms=2,
+        area=90.0 + i,
+        yearBuilt=1985,
+        energyRating="D",
+        propertyType="Piso",
+        status="ACTIVE",
+        featured=i % 7 == 0,
+        createdAt=now,
+        updatedAt=now,
+        images=[
+            SimpleNamespace(id=f"img-{i}-{j}", url=f"https://res.cloudinary.com/demo/{i}-{j}.jpg", main=j == 0)
+            for j in range(5)
+        ],
+        features=[
+            SimpleNamespace(id=f"feat-{i}-{j}", name=name)
+            for j, name in enumerate(["Ascensor", "Terraza", "Garaje"])
+        ],
+    )
+
+
+def default_path(adapter, properties):
+    # Lo que hace FastAPI con response_model=List[PropertyResponse] + JSONResponse
+    validated = adapter.validate_python(properties, from_attributes=True)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(properties):
+    return fast_json.dumps([fast_json.property_to_dict(p) for p in properties])
+
+
+def measure(fn, rounds):
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    properties = [fake_property(i) for i in range(args.listings)]
+    adapter = TypeAdapter(List[PropertyResponse])
+
+    # Ambos caminos deben producir el mismo documento JSON
+    assert json.loads(default_path(adapter, properties)) == json.loads(fast_path(properties))
+
+    before = measure(lambda: default_path(adapter, properties), args.rounds)
+    after = measure(lambda: fast_path(properties), args.rounds)
+
+    print(f"Serialización de {args.listings} propiedades ({args.rounds} rondas)")
+    print(f"  response_model + json : {before * 1000:8.3f} ms")
+    print(f"  fast_json (orjson)    : {after * 1000:8.3f} ms")
+    print(f"  mejora                : {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
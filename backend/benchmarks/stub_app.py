@@ -0,0 +1,37 @@
+"""
+Aplicación para los benchmarks: la misma `server.app` pero con Cloudinary
+sustituido por un almacenamiento falso que no sale de la máquina.
+
+    uvicorn benchmarks.stub_app:app
+"""
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server
+
+
+async def stub_upload(content, folder="", public_id=None, **options):
+    public_id = f"{folder}/{public_id or uuid.uuid4()}"
+    return {
+        "secure_url": f"https://storage.invalid/{public_id}.jpg",
+        "public_id": public_id,
+        "bytes": len(content)
+    }
+
+
+async def stub_destroy(public_id):
+    return {"result": "ok"}
+
+
+async def stub_check_storage():
+    return "ok"
+
+
+server.cloudinary_upload = stub_upload
+server.cloudinary_destroy = stub_destroy
+server.check_storage = stub_check_storage
+
+app = server.app
@@ -0,0 +1,82 @@
+"""
+Caché en memoria LRU con caducidad.
+
+Cada worker tiene la suya; la coherencia entre workers se mantiene con
+`invalidation.InvalidationBus`, que borra las entradas cuando otro worker
+publica un cambio.
+
+Una invalidación puede llegar mientras se lee el valor de la base de datos. Por
+eso quien carga toma antes `generation()` y se lo pasa a `set`, que descarta el
+valor si la clave (o toda la caché) se invalidó entretanto:
+
+    generation = cache.generation()
+    value = await load(key)
+    cache.set(key, value, generation=generation)
+"""
+import time
+from collections import OrderedDict
+
+import metrics
+
+
+class TTLCache:
+    def __init__(self, name, maxsize=1000, ttl=300.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        # Contador de invalidaciones; clave -> valor del contador en su última invalidación
+        self._generation = 0
+        self._invalidated = {}
+        # Todo lo cargado antes de este valor está obsoleto (vaciado completo)
+        self._cleared = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            metrics.cache_miss(self.name)
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            metrics.cache_miss(self.name)
+            return None
+        self._data.move_to_end(key)
+        metrics.cache_hit(self.name)
+        return value
+
+    def generation(self):
+        return self._generation
+
+    def set(self, key, value, ttl=None, generation=None):
+        """
+        Con `generation` (tomada antes de cargar el valor) no guarda nada si la
+        clave se invalidó después. Devuelve si se ha guardado.
+        """
+        if generation is not None and (
+            self._cleared > generation or self._invalidated.get(key, 0) > generation
+        ):
+            return False
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return True
+
+    def invalidate(self, key=None):
+        """
+        Borra una entrada, o toda la caché si `key` es None
+        """
+        self._generation += 1
+        if key is None or len(self._invalidated) >= self.maxsize:
+            # Un vaciado cubre todas las claves; también acota el registro de invalidaciones
+            self._cleared = self._generation
+            self._invalidated.clear()
+        if key is None:
+            self._data.clear()
+        else:
+            self._invalidated[key] = self._generation
+            self._data.pop(key, None)
@@ -0,0 +1,358 @@
+"""
+Motor de catálogo en memoria para el listado de propiedades activas.
+
+`Catalog` guarda las propiedades activas como columnas NumPy (precio,
+superficie, dormitorios, baños, tipo y certificado codificados, destacado,
+coordenadas, zona codificada, fecha de alta, popularidad y un bit por cada
+característica del diccionario de `amenities`). Los filtros de
+`get_properties` se evalúan como máscaras booleanas vectorizadas y la
+ordenación y la paginación se hacen en el proceso; Postgres solo tiene que
+devolver los documentos de la página final.
+
+Se mantiene al día fila a fila con los eventos `property` del bus de
+invalidación y, por si se pierde alguno (o cambia la popularidad, que la
+recalcula un trabajo periódico), se recarga entero cada `reload_interval`.
+Otros índices derivados de estas columnas (los clusters del mapa) se
+registran con `listen()` en lugar de leer sus propias filas de Postgres.
+"""
+import asyncio
+import logging
+
+import numpy as np
+
+import amenities
+from energy_ratings import rating_index
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = {
+    "price": np.float64,
+    "area": np.float64,
+    "bedrooms": np.int16,
+    "bathrooms": np.int16,
+    "type_code": np.int16,
+    "energy_code": np.int8,
+    "featured": bool,
+    "latitude": np.float64,
+    "longitude": np.float64,
+    "location_code": np.int32,
+    "created": np.float64,
+    "popularity": np.int64,
+    "amenities": np.uint64
+}
+
+ROWS_SQL = """
+    SELECT id, status::text AS status, price, area, bedrooms, bathrooms,
+           property_type AS "propertyType", energy_rating AS "energyRating",
+           featured, latitude, longitude, location, popularity,
+           EXTRACT(EPOCH FROM created_at)::float AS created,
+           COALESCE((
+               SELECT array_agg(DISTINCT f.amenity_id)
+               FROM features f
+               WHERE f.property_id = properties.id AND f.amenity_id IS NOT NULL
+           ), '{{}}') AS amenities
+    FROM properties
+    WHERE {where}
+"""
+
+
+class Catalog:
+    def __init__(self, db, reload_interval=900.0, initial_capacity=1024):
+        self.db = db
+        self.reload_interval = reload_interval
+        self.loaded = False
+        self._task = None
+        self._initial_capacity = initial_capacity
+        self._reloading = False
+        self._pending = set()
+        self._listeners = []
+        self._reset()
+
+    def __len__(self):
+        return self._size
+
+    def __getattr__(self, name):
+        # Las columnas se exponen como vistas del tamaño actual: catalog.price, catalog.area...
+        if name in COLUMNS:
+            return self._data[name][:self._size]
+        raise AttributeError(name)
+
+    def _reset(self):
+        self.ids = []
+        self._rows = {}
+        self._size = 0
+        self.types = []
+        self._type_codes = {}
+        self.locations = []
+        self._location_codes = {}
+        self._data = {
+            name: np.zeros(self._initial_capacity, dtype=dtype) for name, dtype in COLUMNS.items()
+        }
+
+    def _code(self, values, codes, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def listen(self, listener):
+        """
+        `listener` se construye a partir de estas columnas: se llama a su
+        `rebuild()` tras la primera carga y a `update(property_id)` cada vez que
+        una propiedad entra, sale o cambia en alguna de sus `columns`
+        """
+        self._listeners.append(listener)
+        return listener
+
+    def value(self, property_id, column):
+        index = self._rows.get(property_id)
+        return None if index is None else self._data[column][index].item()
+
+    # --- Mantenimiento ---
+
+    async def fetch_rows(self, property_ids=None):
+        if property_ids is None:
+            return await self.db.query_raw(ROWS_SQL.format(where="status = 'ACTIVE'"))
+        return await self.db.query_raw(ROWS_SQL.format(where="id = ANY($1::text[])"), property_ids)
+
+    def _put(self, row):
+        index = self._rows.get(row["id"])
+        if index is None:
+            if self._size == len(self._data["price"]):
+                for name, column in self._data.items():
+                    self._data[name] = np.concatenate([column, np.zeros_like(column)])
+            index = self._size
+            self._size += 1
+            self._rows[row["id"]] = index
+            self.ids.append(row["id"])
+
+        data = self._data
+        data["price"][index] = row["price"]
+        data["area"][index] = row["area"]
+        data["bedrooms"][index] = row["bedrooms"]
+        data["bathrooms"][index] = row["bathrooms"]
+        data["type_code"][index] = self._code(self.types, self._type_codes, row["propertyType"])
+        data["energy_code"][index] = rating_index(row["energyRating"])
+        data["featured"][index] = row["featured"]
+        data["latitude"][index] = np.nan if row["latitude"] is None else row["latitude"]
+        data["longitude"][index] = np.nan if row["longitude"] is None else row["longitude"]
+        data["location_code"][index] = self._code(self.locations, self._location_codes, row["location"])
+        data["created"][index] = row["created"]
+        data["popularity"][index] = row["popularity"]
+        data["amenities"][index] = amenities.bitmask(row["amenities"] or ())
+
+    def remove(self, property_id):
+        index = self._rows.pop(property_id, None)
+        if index is None:
+            return
+        # La última fila ocupa el hueco para que las columnas sigan compactas
+        last = self._size - 1
+        if index != last:
+            last_id = self.ids[last]
+            for column in self._data.values():
+                column[index] = column[last]
+            self.ids[index] = last_id
+            self._rows[last_id] = index
+        self.ids.pop()
+        self._size -= 1
+
+    def apply(self, property_id, row):
+        if row is not None and row["status"] == "ACTIVE":
+            self._put(row)
+        else:
+            self.remove(property_id)
+        for listener in self._listeners:
+            listener.update(property_id)
+
+    def _changed(self, old_rows, old_data, columns):
+        """
+        Ids que entraron, salieron o cambiaron en `columns` respecto a la carga anterior
+        """
+        changed = [property_id for property_id in old_rows if property_id not in self._rows]
+        old_index = np.array([old_rows.get(property_id, -1) for property_id in self.ids], dtype=np.int64)
+        known = old_index >= 0
+        differs = ~known
+        for column in columns:
+            new = self._data[column][:self._size]
+            old = old_data[column][np.where(known, old_index, 0)]
+            same = new == old
+            if new.dtype.kind == "f":
+                same |= np.isnan(new) & np.isnan(old)
+            differs |= ~same
+        changed.extend(self.ids[index] for index in np.flatnonzero(differs).tolist())
+        return changed
+
+    async def reload(self):
+        self._reloading = True
+        self._pending.clear()
+        was_loaded, old_rows, old_data = self.loaded, self._rows, self._data
+        try:
+            rows = await self.fetch_rows()
+            self._reset()
+            for row in rows:
+                self._put(row)
+            # Cambios que llegaron mientras se leía la tabla
+            if self._pending:
+                pending = list(self._pending)
+                found = {row["id"]: row for row in await self.fetch_rows(pending)}
+                for property_id in pending:
+                    self.apply(property_id, found.get(property_id))
+        finally:
+            self._reloading = False
+        self.loaded = True
+        logger.info("Catálogo en memoria cargado: %d propiedades activas", self._size)
+
+        # Las recargas periódicas solo propagan las diferencias
+        for listener in self._listeners:
+            if not was_loaded:
+                listener.rebuild()
+                continue
+            for property_id in self._changed(old_rows, old_data, listener.columns):
+                listener.update(property_id)
+
+    async def refresh(self, property_id):
+        """
+        Suscriptor del bus de invalidación
+        """
+        if property_id is None:
+            await self.reload()
+            return
+        if self._reloading:
+            self._pending.add(property_id)
+            return
+        if not self.loaded:
+            return
+        rows = await self.fetch_rows([property_id])
+        self.apply(property_id, rows[0] if rows else None)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except Exception:
+                logger.exception("Error al recargar el catálogo en memoria")
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    # --- Consultas ---
+
+    def mask(
+        self,
+        min_price=None,
+        max_price=None,
+        bedrooms=None,
+        property_type=None,
+        location=None,
+        featured=None,
+        features=None
+    ):
+        """
+        Máscara booleana con la misma semántica que los filtros de `get_properties`
+        """
+        mask = np.ones(self._size, dtype=bool)
+        if min_price is not None:
+            mask &= self.price >= min_price
+        if max_price is not None:
+            mask &= self.price <= max_price
+        if bedrooms:
+            mask &= self.bedrooms >= bedrooms
+        if property_type:
+            code = self._type_codes.get(property_type)
+            if code is None:
+                return np.zeros(self._size, dtype=bool)
+            mask &= self.type_code == code
+        if location:
+            # `contains` sensible a mayúsculas, como Prisma: se resuelve sobre las zonas distintas
+            codes = [code for code, name in enumerate(self.locations) if location in name]
+            mask &= np.isin(self.location_code, codes)
+        if featured is not None:
+            mask &= self.featured == featured
+        if features:
+            required = np.uint64(amenities.bitmask(features))
+            mask &= (self.amenities & required) == required
+        return mask
+
+    def page(self, mask, sort=None, skip=0, limit=10):
+        """
+        Ids de la página pedida, en el mismo orden que las consultas SQL:
+        `created_at DESC, id` por defecto y `popularity DESC, created_at DESC, id`
+        con `sort="popular"`
+        """
+        candidates = np.flatnonzero(mask)
+        wanted = skip + limit
+        if not len(candidates) or limit <= 0 or skip >= len(candidates):
+            return []
+
+        created = self.created[candidates]
+        if sort == "popular":
+            primary = self.popularity[candidates]
+        else:
+            primary = created
+
+        # Solo se ordenan las filas que pueden caer en la página (más los empates del límite)
+        if wanted < len(candidates):
+            threshold = np.partition(primary, len(primary) - wanted)[len(primary) - wanted]
+            keep = primary >= threshold
+            candidates, primary, created = candidates[keep], primary[keep], created[keep]
+
+        order = np.lexsort((-created, -primary))
+        candidates, primary, created = candidates[order], primary[order], created[order]
+
+        # Empates exactos en los bordes de la página: se amplía la ventana con
+        # todas las filas empatadas y se desempata por id
+        first, last = skip, min(wanted, len(candidates)) - 1
+        start, end = first, last
+        while start > 0 and primary[start - 1] == primary[first] and created[start - 1] == created[first]:
+            start -= 1
+        while end + 1 < len(candidates) and primary[end + 1] == primary[last] and created[end + 1] == created[last]:
+            end += 1
+        window = sorted(
+            zip((-primary[start:end + 1]).tolist(), (-created[start:end + 1]).tolist(),
+                [self.ids[index] for index in candidates[start:end + 1].tolist()])
+        )
+        return [property_id for _, _, property_id in window[first - start:last - start + 1]]
+
+
+def _round_down(value, magnitude):
+    return np.floor(value / magnitude) * magnitude
+
+
+def _round_up(value, magnitude):
+    return np.ceil(value / magnitude) * magnitude
+
+
+def histogram(values, bins=20):
+    """
+    Histograma con bordes adaptativos: cuantiles redondeados a dos cifras
+    significativas, de modo que cada barra tenga un número parecido de anuncios
+    """
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return {"min": None, "max": None, "edges": [], "counts": []}
+
+    low, high = float(values.min()), float(values.max())
+    quantiles = np.quantile(values, np.linspace(0, 1, bins + 1))
+    magnitude = 10 ** (np.floor(np.log10(np.maximum(np.abs(quantiles), 1))) - 1)
+    edges = np.round(quantiles / magnitude) * magnitude
+    edges[0] = _round_down(low, magnitude[0])
+    edges[-1] = _round_up(high, magnitude[-1])
+    edges = np.unique(edges)
+    if len(edges) < 2:
+        edges = np.array([low, high if high > low else low + 1])
+
+    counts, _ = np.histogram(values, edges)
+    return {
+        "min": low,
+        "max": high,
+        "edges": edges.tolist(),
+        "counts": counts.tolist()
+    }
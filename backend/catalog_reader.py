@@ -0,0 +1,273 @@
+"""
+Lecturas directas con asyncpg para los endpoints públicos del catálogo.
+
+El cliente de Prisma para Python habla con un proceso query-engine aparte por
+HTTP/JSON. Para las rutas de lectura más calientes (listado, detalle,
+destacadas y posts) este módulo usa un pool de asyncpg con SQL escrito a mano
+que devuelve exactamente la misma forma que `fast_json.property_to_dict` y
+`fast_json.post_to_dict`. Las escrituras siguen pasando por Prisma.
+"""
+import orjson
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - dependencia opcional
+    asyncpg = None
+
+
+PROPERTY_COLUMNS = """
+    p.title,
+    p.description,
+    p.price,
+    p.location,
+    p.address,
+    p.zip_code AS "zipCode",
+    p.city,
+    p.province,
+    p.latitude,
+    p.longitude,
+    p.bedrooms,
+    p.bathrooms,
+    p.area,
+    p.year_built AS "yearBuilt",
+    p.energy_rating AS "energyRating",
+    p.property_type AS "propertyType",
+    p.featured,
+    p.id,
+    p.slug,
+    p.status::text AS status,
+    p.created_at AT TIME ZONE 'UTC' AS "createdAt",
+    p.updated_at AT TIME ZONE 'UTC' AS "updatedAt",
+    COALESCE((
+        SELECT json_agg(json_build_object('id', i.id, 'url', i.url, 'main', i.main) ORDER BY i.created_at)
+        FROM images i
+        WHERE i.property_id = p.id
+    ), '[]'::json) AS images,
+    COALESCE((
+        SELECT json_agg(json_build_object('id', f.id, 'name', f.name) ORDER BY f.created_at)
+        FROM features f
+        WHERE f.property_id = p.id
+    ), '[]'::json) AS features
+"""
+
+POST_COLUMNS = """
+    p.title,
+    p.content,
+    p.excerpt,
+    p.published,
+    p.id,
+    p.slug,
+    p.cover_image AS "coverImage",
+    p.created_at AT TIME ZONE 'UTC' AS "createdAt",
+    p.updated_at AT TIME ZONE 'UTC' AS "updatedAt"
+"""
+
+POST_CATEGORIES_SQL = """
+    SELECT
+        cp.post_id,
+        c.name,
+        c.id,
+        c.slug,
+        c.created_at AT TIME ZONE 'UTC' AS "createdAt",
+        c.updated_at AT TIME ZONE 'UTC' AS "updatedAt"
+    FROM category_post cp
+    JOIN categories c ON c.id = cp.category_id
+    WHERE cp.post_id = ANY($1::text[])
+    ORDER BY cp.created_at
+"""
+
+
+class CatalogReader:
+    """
+    Pool de asyncpg de solo lectura para el catálogo público
+    """
+
+    def __init__(
+        self,
+        dsn,
+        min_size=1,
+        max_size=10,
+        statement_cache_size=100,
+        command_timeout=5.0,
+        connect_timeout=10.0
+    ):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self.command_timeout = command_timeout
+        self.connect_timeout = connect_timeout
+        self.pool = None
+
+    @property
+    def connected(self):
+        return self.pool is not None
+
+    async def connect(self):
+        if asyncpg is None:
+            raise RuntimeError("asyncpg no está instalado; desactiva ASYNCPG_READS o instálalo")
+        self.pool = await asyncpg.create_pool(
+            dsn=self.dsn,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            # Con PgBouncer en modo transacción hay que poner 0
+            statement_cache_size=self.statement_cache_size,
+            command_timeout=self.command_timeout,
+            timeout=self.connect_timeout,
+            init=self._init_connection
+        )
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    @staticmethod
+    async def _init_connection(connection):
+        # Los json_agg se decodifican directamente a listas de Python
+        await connection.set_type_codec(
+            "json",
+            encoder=lambda value: orjson.dumps(value).decode(),
+            decoder=orjson.loads,
+            schema="pg_catalog"
+        )
+
+    # --- Propiedades ---
+
+    async def fetch_properties(
+        self,
+        status=None,
+        min_price=None,
+        max_price=None,
+        bedrooms=None,
+        property_type=None,
+        location=None,
+        featured=None,
+        features=None,
+        sort=None,
+        skip=0,
+        limit=10
+    ):
+        clauses = []
+        args = []
+
+        def arg(value):
+            args.append(value)
+            return f"${len(args)}"
+
+        if status:
+            clauses.append(f"p.status::text = {arg(status)}")
+        if min_price is not None:
+            clauses.append(f"p.price >= {arg(min_price)}")
+        if max_price is not None:
+            clauses.append(f"p.price <= {arg(max_price)}")
+        if bedrooms:
+            clauses.append(f"p.bedrooms >= {arg(bedrooms)}")
+        if property_type:
+            clauses.append(f"p.property_type = {arg(property_type)}")
+        if location:
+            # Misma semántica que el `contains` de Prisma (sensible a mayúsculas)
+            clauses.append(f"strpos(p.location, {arg(location)}) > 0")
+        if featured is not None:
+            clauses.append(f"p.featured = {arg(featured)}")
+        if features:
+            # Todas las características pedidas (índice features(amenity_id, property_id))
+            clauses.append(
+                f"p.id IN (SELECT f.property_id FROM features f WHERE f.amenity_id = ANY({arg(features)}::text[]) "
+                f"GROUP BY f.property_id HAVING count(DISTINCT f.amenity_id) = {arg(len(features))})"
+            )
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        # Mismo orden que el catálogo en memoria (catalog.Catalog.page)
+        if sort == "popular":
+            order = "ORDER BY p.popularity DESC, p.created_at DESC, p.id"
+        else:
+            order = "ORDER BY p.created_at DESC, p.id"
+        sql = f"""
+            SELECT {PROPERTY_COLUMNS}
+            FROM properties p
+            {where}
+            {order}
+            OFFSET {arg(skip)}
+            LIMIT {arg(limit)}
+        """
+        rows = await self.pool.fetch(sql, *args)
+        return [dict(row) for row in rows]
+
+    async def fetch_property(self, property_id):
+        row = await self.pool.fetchrow(
+            f"SELECT {PROPERTY_COLUMNS} FROM properties p WHERE p.id = $1",
+            property_id
+        )
+        return dict(row) if row else None
+
+    async def fetch_property_snapshot(self, property_id):
+        # convert_to devuelve bytea: el documento llega tal cual, sin decodificar
+        return await self.pool.fetchval(
+            "SELECT convert_to(document, 'UTF8') FROM property_snapshots WHERE property_id = $1",
+            property_id
+        )
+
+    async def fetch_property_snapshots(self, property_ids):
+        rows = await self.pool.fetch(
+            "SELECT property_id, convert_to(document, 'UTF8') AS document "
+            "FROM property_snapshots WHERE property_id = ANY($1::text[])",
+            property_ids
+        )
+        return {row["property_id"]: row["document"] for row in rows}
+
+    async def fetch_featured_properties(self, limit=6):
+        rows = await self.pool.fetch(
+            f"""
+            SELECT {PROPERTY_COLUMNS}
+            FROM properties p
+            WHERE p.featured AND p.status = 'ACTIVE'
+            LIMIT $1
+            """,
+            limit
+        )
+        return [dict(row) for row in rows]
+
+    # --- Posts ---
+
+    async def fetch_posts(self, published=None, category_id=None, skip=0, limit=10):
+        clauses = []
+        args = []
+
+        def arg(value):
+            args.append(value)
+            return f"${len(args)}"
+
+        if published is not None:
+            clauses.append(f"p.published = {arg(published)}")
+        if category_id:
+            clauses.append(
+                f"EXISTS (SELECT 1 FROM category_post cp WHERE cp.post_id = p.id AND cp.category_id = {arg(category_id)})"
+            )
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"""
+            SELECT {POST_COLUMNS}
+            FROM posts p
+            {where}
+            ORDER BY p.created_at DESC
+            OFFSET {arg(skip)}
+            LIMIT {arg(limit)}
+        """
+
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(sql, *args)
+            posts = []
+            by_id = {}
+            for row in rows:
+                post = dict(row)
+                post["categories"] = []
+                posts.append(post)
+                by_id[post["id"]] = post
+
+            if by_id:
+                for row in await connection.fetch(POST_CATEGORIES_SQL, list(by_id)):
+                    category = dict(row)
+                    by_id[category.pop("post_id")]["categories"].append(category)
+
+        return posts
@@ -0,0 +1,232 @@
+"""
+Agrupación de marcadores del mapa en el servidor (`/api/properties/clusters`).
+
+`ClusterPyramid` precalcula, para cada nivel de zoom por debajo de
+`points_zoom`, una rejilla sobre la proyección Web Mercator (`cells_per_tile`
+celdas por lado de tesela) con el número de anuncios activos con coordenadas,
+la suma de latitudes y longitudes (para el centroide) y los precios ordenados
+(para el rango aunque se quiten anuncios). Desde `points_zoom` se devuelven los
+puntos individuales, que se guardan por celda del nivel más fino.
+
+No lee Postgres: se construye a partir de las columnas de `catalog.Catalog`
+(que ya contiene solo los anuncios activos) y se registra en él con `listen()`,
+así que solo se tocan las celdas de un anuncio cuando el catálogo lo añade, lo
+quita o cambian sus coordenadas o su precio.
+"""
+import bisect
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAX_LATITUDE = 85.05112878
+
+
+def project(latitude, longitude):
+    """
+    Coordenadas Web Mercator normalizadas a [0, 1)
+    """
+    latitude = np.clip(latitude, -MAX_LATITUDE, MAX_LATITUDE)
+    x = (np.asarray(longitude) + 180.0) / 360.0
+    sin = np.sin(np.radians(latitude))
+    y = 0.5 - np.log((1 + sin) / (1 - sin)) / (4 * math.pi)
+    return np.clip(x, 0, 1 - 1e-12), np.clip(y, 0, 1 - 1e-12)
+
+
+class Cell:
+    __slots__ = ("count", "latitude", "longitude", "prices")
+
+    def __init__(self):
+        self.count = 0
+        self.latitude = 0.0
+        self.longitude = 0.0
+        self.prices = []
+
+    def add(self, latitude, longitude, price):
+        self.count += 1
+        self.latitude += latitude
+        self.longitude += longitude
+        bisect.insort(self.prices, price)
+
+    def remove(self, latitude, longitude, price):
+        self.count -= 1
+        self.latitude -= latitude
+        self.longitude -= longitude
+        del self.prices[bisect.bisect_left(self.prices, price)]
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "latitude": self.latitude / self.count,
+            "longitude": self.longitude / self.count,
+            "minPrice": self.prices[0],
+            "maxPrice": self.prices[-1]
+        }
+
+
+class ClusterPyramid:
+    # Columnas del catálogo de las que depende
+    columns = ("latitude", "longitude", "price")
+
+    def __init__(self, catalog, points_zoom=15, cells_per_tile=4):
+        self.catalog = catalog
+        self.points_zoom = points_zoom
+        self.cells_per_tile = cells_per_tile
+        self.loaded = False
+        self._reset()
+
+    def _reset(self):
+        # levels[zoom]: (cx, cy) -> Cell, para zoom < points_zoom
+        self.levels = [{} for _ in range(self.points_zoom)]
+        # Nivel de puntos: (cx, cy) -> {id, ...}
+        self._points = {}
+        # id -> (latitude, longitude, price)
+        self._by_property = {}
+
+    def __len__(self):
+        return len(self._by_property)
+
+    def _scale(self, zoom):
+        return (1 << zoom) * self.cells_per_tile
+
+    def _cells(self, latitude, longitude):
+        x, y = project(latitude, longitude)
+        return [
+            (int(x * self._scale(zoom)), int(y * self._scale(zoom)))
+            for zoom in range(self.points_zoom + 1)
+        ]
+
+    def rebuild(self):
+        """
+        Carga completa desde las columnas del catálogo
+        """
+        self._reset()
+        located = np.flatnonzero(np.isfinite(self.catalog.latitude) & np.isfinite(self.catalog.longitude))
+        if len(located):
+            latitude = self.catalog.latitude[located]
+            longitude = self.catalog.longitude[located]
+            price = self.catalog.price[located]
+            x, y = project(latitude, longitude)
+            ids = [self.catalog.ids[index] for index in located.tolist()]
+
+            for zoom in range(self.points_zoom + 1):
+                scale = self._scale(zoom)
+                cx = (x * scale).astype(np.int64)
+                cy = (y * scale).astype(np.int64)
+                # Agrupa por celda (y por precio dentro de cada una) con una sola ordenación
+                order = np.lexsort((price, cy, cx))
+                cx, cy = cx[order], cy[order]
+                starts = np.flatnonzero(np.r_[True, (cx[1:] != cx[:-1]) | (cy[1:] != cy[:-1])])
+                keys = zip(cx[starts].tolist(), cy[starts].tolist())
+                bounds = np.r_[starts, len(order)].tolist()
+
+                if zoom == self.points_zoom:
+                    members = [ids[index] for index in order.tolist()]
+                    for i, key in enumerate(keys):
+                        self._points[key] = set(members[bounds[i]:bounds[i + 1]])
+                    continue
+
+                counts = np.diff(bounds).tolist()
+                latitudes = np.add.reduceat(latitude[order], starts).tolist()
+                longitudes = np.add.reduceat(longitude[order], starts).tolist()
+                prices = price[order].tolist()
+                level = self.levels[zoom]
+                for i, key in enumerate(keys):
+                    cell = level[key] = Cell()
+                    cell.count = counts[i]
+                    cell.latitude = latitudes[i]
+                    cell.longitude = longitudes[i]
+                    cell.prices = prices[bounds[i]:bounds[i + 1]]
+
+            self._by_property = dict(zip(ids, zip(latitude.tolist(), longitude.tolist(), price.tolist())))
+
+        self.loaded = True
+        logger.info("Pirámide de clusters cargada: %d propiedades con coordenadas", len(self._by_property))
+
+    def _add(self, property_id, latitude, longitude, price):
+        self._by_property[property_id] = (latitude, longitude, price)
+        cells = self._cells(latitude, longitude)
+        for zoom, key in enumerate(cells[:-1]):
+            cell = self.levels[zoom].get(key)
+            if cell is None:
+                cell = self.levels[zoom][key] = Cell()
+            cell.add(latitude, longitude, price)
+        self._points.setdefault(cells[-1], set()).add(property_id)
+
+    def _remove(self, property_id):
+        point = self._by_property.pop(property_id, None)
+        if point is None:
+            return
+        latitude, longitude, price = point
+        cells = self._cells(latitude, longitude)
+        for zoom, key in enumerate(cells[:-1]):
+            cell = self.levels[zoom][key]
+            cell.remove(latitude, longitude, price)
+            if not cell.count:
+                del self.levels[zoom][key]
+        members = self._points[cells[-1]]
+        members.discard(property_id)
+        if not members:
+            del self._points[cells[-1]]
+
+    def update(self, property_id):
+        """
+        Llamado por el catálogo cuando la propiedad entra, sale o cambia
+        """
+        if not self.loaded:
+            return
+        latitude = self.catalog.value(property_id, "latitude")
+        longitude = self.catalog.value(property_id, "longitude")
+        point = None
+        if latitude is not None and math.isfinite(latitude) and math.isfinite(longitude):
+            point = (latitude, longitude, self.catalog.value(property_id, "price"))
+        if point == self._by_property.get(property_id):
+            return
+        self._remove(property_id)
+        if point is not None:
+            self._add(property_id, *point)
+
+    def _cells_in(self, cells, zoom, bbox):
+        """
+        Celdas de `cells` que tocan el rectángulo (min_lng, min_lat, max_lng, max_lat)
+        """
+        min_lng, min_lat, max_lng, max_lat = bbox
+        scale = self._scale(zoom)
+        x0, y1 = project(min_lat, min_lng)
+        x1, y0 = project(max_lat, max_lng)
+        x0, x1 = int(x0 * scale), int(x1 * scale)
+        y0, y1 = int(y0 * scale), int(y1 * scale)
+
+        # Se recorre lo que sea menor: el rango de la rejilla o las celdas ocupadas
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= len(cells):
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    value = cells.get((cx, cy))
+                    if value is not None:
+                        yield value
+        else:
+            for (cx, cy), value in cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    yield value
+
+    def query(self, bbox, zoom):
+        zoom = max(zoom, 0)
+        if zoom >= self.points_zoom:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            points = []
+            for members in self._cells_in(self._points, self.points_zoom, bbox):
+                for property_id in members:
+                    latitude, longitude, price = self._by_property[property_id]
+                    if min_lat <= latitude <= max_lat and min_lng <= longitude <= max_lng:
+                        points.append({
+                            "id": property_id,
+                            "latitude": latitude,
+                            "longitude": longitude,
+                            "price": price
+                        })
+            return {"zoom": zoom, "clusters": [], "points": points}
+
+        clusters = [cell.to_dict() for cell in self._cells_in(self.levels[zoom], zoom, bbox)]
+        return {"zoom": zoom, "clusters": clusters, "points": []}
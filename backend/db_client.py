@@ -0,0 +1,59 @@
+"""
+Cliente Prisma instrumentado.
+
+Todas las operaciones de los modelos (`db.property.find_many`, `db.user.count`,
+...) pasan por `Prisma._execute`. `InstrumentedPrisma` mide cada llamada y avisa
+a los listeners registrados con `add_query_listener`, que reciben
+`(model, operation, arguments, duration, error)`.
+"""
+import logging
+import time
+
+from prisma import Prisma
+
+logger = logging.getLogger(__name__)
+
+_listeners = []
+
+
+def add_query_listener(listener):
+    _listeners.append(listener)
+    return listener
+
+
+def remove_query_listener(listener):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def _notify(model, operation, arguments, duration, error):
+    for listener in _listeners:
+        try:
+            listener(model, operation, arguments, duration, error)
+        except Exception:
+            logger.exception("Error en un listener de consultas")
+
+
+class InstrumentedPrisma(Prisma):
+    async def _execute(self, *, method, arguments, model=None, root_selection=None):
+        error = None
+        start = time.perf_counter()
+        try:
+            return await super()._execute(
+                method=method,
+                arguments=arguments,
+                model=model,
+                root_selection=root_selection
+            )
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if _listeners:
+                _notify(
+                    model.__name__ if model is not None else "raw",
+                    method,
+                    arguments,
+                    time.perf_counter() - start,
+                    error
+                )
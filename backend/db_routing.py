@@ -0,0 +1,127 @@
+"""
+Enrutado de lecturas a réplicas de PostgreSQL.
+
+Los handlers de solo lectura piden su cliente a `ReplicaRouter.for_read`, que
+reparte la carga entre las réplicas sanas en round-robin. Un usuario que acaba
+de escribir queda fijado al primario durante unos segundos para que vea
+siempre sus propios cambios aunque las réplicas vayan con retraso.
+"""
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Retraso de replicación en segundos (0 si la réplica está al día o es un primario)
+REPLICATION_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END::float AS lag
+"""
+
+
+class Replica:
+    def __init__(self, url, client):
+        self.url = url
+        self.client = client
+        self.healthy = False
+        self.lag = 0.0
+
+
+class ReplicaRouter:
+    """
+    Selecciona el cliente Prisma para cada lectura
+    """
+
+    def __init__(self, primary, replicas=(), pin_seconds=10.0, health_interval=5.0, max_lag_seconds=5.0):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.pin_seconds = pin_seconds
+        self.health_interval = health_interval
+        self.max_lag_seconds = max_lag_seconds
+        self._next = 0
+        self._pins = {}
+        self._health_task = None
+
+    # --- Ciclo de vida ---
+
+    async def connect(self):
+        for replica in self.replicas:
+            try:
+                await replica.client.connect()
+                replica.healthy = True
+            except Exception as e:
+                logger.warning("No se pudo conectar a la réplica %s: %s", replica.url, e)
+        if self.replicas:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def disconnect(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for replica in self.replicas:
+            if replica.client.is_connected():
+                await replica.client.disconnect()
+
+    # --- Lectura tras escritura ---
+
+    def pin(self, subject):
+        """
+        Fija al primario las lecturas de `subject` durante `pin_seconds`
+        """
+        if subject and self.replicas:
+            self._pins[subject] = time.monotonic() + self.pin_seconds
+
+    def is_pinned(self, subject):
+        if not subject:
+            return False
+        deadline = self._pins.get(subject)
+        if deadline is None:
+            return False
+        if deadline < time.monotonic():
+            self._pins.pop(subject, None)
+            return False
+        return True
+
+    # --- Selección ---
+
+    def for_read(self, subject=None):
+        if not self.replicas or self.is_pinned(subject):
+            return self.primary
+
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next]
+            self._next = (self._next + 1) % len(self.replicas)
+            if replica.healthy:
+                return replica.client
+
+        # Ninguna réplica disponible: se lee del primario
+        return self.primary
+
+    async def check_replica(self, replica):
+        try:
+            if not replica.client.is_connected():
+                await replica.client.connect()
+            rows = await replica.client.query_raw(REPLICATION_LAG_SQL)
+            replica.lag = float(rows[0]["lag"]) if rows else 0.0
+            healthy = replica.lag <= self.max_lag_seconds
+        except Exception as e:
+            logger.warning("Réplica %s no disponible: %s", replica.url, e)
+            healthy = False
+
+        if healthy != replica.healthy:
+            logger.info("Réplica %s %s", replica.url, "disponible" if healthy else "retirada")
+        replica.healthy = healthy
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await asyncio.gather(*(self.check_replica(r) for r in self.replicas))
+
+            # Limpiar los pins caducados
+            now = time.monotonic()
+            for subject, deadline in list(self._pins.items()):
+                if deadline < now:
+                    self._pins.pop(subject, None)
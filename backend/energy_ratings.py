@@ -0,0 +1,12 @@
+"""
+Escala del certificado energético, de la mejor (A) a la peor (G).
+"""
+ENERGY_RATINGS = ["A", "B", "C", "D", "E", "F", "G"]
+
+
+def rating_index(rating):
+    """
+    Posición en la escala ("b" y "B+" cuentan como B) o -1 si no es válido
+    """
+    rating = (rating or "").strip().upper()[:1]
+    return ENERGY_RATINGS.index(rating) if rating in ENERGY_RATINGS else -1
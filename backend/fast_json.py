@@ -0,0 +1,122 @@
+"""
+Serialización rápida de las respuestas de la API.
+
+Los datos que devuelve Prisma ya vienen tipados y validados desde la base de
+datos, así que para los listados públicos no hace falta que FastAPI vuelva a
+validarlos fila a fila contra `response_model`. Estas funciones construyen
+directamente los diccionarios con la misma forma que `PropertyResponse` y
+`PostResponse` y los codifican con orjson.
+"""
+from enum import Enum
+
+import orjson
+from fastapi.responses import Response
+
+
+def _enum_value(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+def image_to_dict(image):
+    return {
+        "id": image.id,
+        "url": image.url,
+        "main": image.main
+    }
+
+
+def feature_to_dict(feature):
+    return {
+        "id": feature.id,
+        "name": feature.name
+    }
+
+
+def property_to_dict(property):
+    """
+    Equivalente a PropertyResponse para un modelo Property con `images` y `features`
+    """
+    return {
+        "title": property.title,
+        "description": property.description,
+        "price": property.price,
+        "location": property.location,
+        "address": property.address,
+        "zipCode": property.zipCode,
+        "city": property.city,
+        "province": property.province,
+        "latitude": property.latitude,
+        "longitude": property.longitude,
+        "bedrooms": property.bedrooms,
+        "bathrooms": property.bathrooms,
+        "area": property.area,
+        "yearBuilt": property.yearBuilt,
+        "energyRating": property.energyRating,
+        "propertyType": property.propertyType,
+        "featured": property.featured,
+        "id": property.id,
+        "slug": property.slug,
+        "status": _enum_value(property.status),
+        "createdAt": property.createdAt,
+        "updatedAt": property.updatedAt,
+        "images": [image_to_dict(image) for image in property.images or ()],
+        "features": [feature_to_dict(feature) for feature in property.features or ()]
+    }
+
+
+def category_to_dict(category):
+    return {
+        "name": category.name,
+        "id": category.id,
+        "slug": category.slug,
+        "createdAt": category.createdAt,
+        "updatedAt": category.updatedAt
+    }
+
+
+def post_to_dict(post):
+    """
+    Equivalente a PostResponse para un modelo Post con `categories.category`
+    """
+    return {
+        "title": post.title,
+        "content": post.content,
+        "excerpt": post.excerpt,
+        "published": post.published,
+        "id": post.id,
+        "slug": post.slug,
+        "coverImage": post.coverImage,
+        "createdAt": post.createdAt,
+        "updatedAt": post.updatedAt,
+        "categories": [category_to_dict(cp.category) for cp in post.categories or ()]
+    }
+
+
+def dumps(content):
+    # OPT_UTC_Z: las fechas UTC salen con "Z", igual que con Pydantic
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+class FastJSONResponse(Response):
+    """
+    Respuesta JSON codificada con orjson. No pasa por `jsonable_encoder`.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """
+    Respuesta con un cuerpo JSON ya serializado (bytes)
+    """
+    media_type = "application/json"
+
+
+def properties_response(properties):
+    return FastJSONResponse([property_to_dict(p) for p in properties])
+
+
+def posts_response(posts):
+    return FastJSONResponse([post_to_dict(p) for p in posts])
@@ -0,0 +1,24 @@
+# Configuración de producción: gunicorn como gestor de procesos con workers uvicorn
+#
+#   gunicorn -c gunicorn.conf.py server:app
+#   python server.py --prod
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8001")
+
+# Un worker por CPU salvo que se indique otra cosa
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# La aplicación se importa una vez en el proceso maestro y los workers la heredan.
+# Las conexiones (Prisma, asyncpg, LISTEN/NOTIFY) se abren en el startup de cada worker.
+preload_app = True
+
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+accesslog = os.getenv("ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
@@ -0,0 +1,127 @@
+"""
+Invalidación de cachés entre workers con LISTEN/NOTIFY de PostgreSQL.
+
+Los endpoints que modifican datos llaman a `publish(topic, key)`. Los
+suscriptores locales se ejecutan al momento y el evento se envía por
+`pg_notify`; el resto de workers, que escuchan el mismo canal, ejecutan sus
+suscriptores al recibirlo. Una clave `None` significa "invalidar todo el
+tema" y se usa también tras una reconexión, porque se han podido perder
+eventos mientras tanto.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import os
+import uuid
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - dependencia opcional
+    asyncpg = None
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationBus:
+    def __init__(self, dsn=None, channel="cache_invalidation", reconnect_delay=1.0):
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._subscribers = {}
+        self._connection = None
+        self._lock = asyncio.Lock()
+        self._closing = False
+        self._reconnect_task = None
+        # Despachos en curso de eventos recibidos: el bucle solo guarda referencias débiles
+        self._tasks = set()
+
+    @property
+    def connected(self):
+        return self._connection is not None and not self._connection.is_closed()
+
+    def subscribe(self, topic, handler):
+        """
+        `handler(key)` puede ser una función normal o una corrutina
+        """
+        self._subscribers.setdefault(topic, []).append(handler)
+        return handler
+
+    # --- Ciclo de vida ---
+
+    async def start(self):
+        if not self.dsn or asyncpg is None:
+            logger.info("Invalidación entre workers desactivada: solo se invalidan las cachés locales")
+            return
+        self._closing = False
+        await self._connect()
+
+    async def stop(self):
+        self._closing = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def _connect(self):
+        connection = await asyncpg.connect(self.dsn, statement_cache_size=0)
+        await connection.add_listener(self.channel, self._on_notify)
+        connection.add_termination_listener(self._on_terminated)
+        self._connection = connection
+
+    def _on_terminated(self, connection):
+        self._connection = None
+        if not self._closing and self._reconnect_task is None:
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self):
+        delay = self.reconnect_delay
+        while not self._closing:
+            try:
+                await self._connect()
+                break
+            except Exception as e:
+                logger.warning("No se pudo reconectar al canal %s: %s", self.channel, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+        self._reconnect_task = None
+        # Se han podido perder eventos: se vacían todas las cachés
+        for topic in list(self._subscribers):
+            await self._dispatch(topic, None)
+
+    # --- Publicación y recepción ---
+
+    async def publish(self, topic, key=None):
+        await self._dispatch(topic, key)
+        if not self.connected:
+            return
+        payload = json.dumps({"t": topic, "k": key, "o": self.origin})
+        try:
+            # Una conexión de asyncpg no admite consultas concurrentes
+            async with self._lock:
+                await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+        except Exception as e:
+            logger.warning("No se pudo publicar la invalidación %s/%s: %s", topic, key, e)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        if event.get("o") == self.origin:
+            return
+        task = asyncio.get_running_loop().create_task(self._dispatch(event.get("t"), event.get("k")))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, topic, key):
+        for handler in self._subscribers.get(topic, ()):
+            try:
+                result = handler(key)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception("Error al invalidar %s/%s", topic, key)
@@ -0,0 +1,337 @@
+"""
+Cola de trabajos en segundo plano sobre PostgreSQL (tabla `jobs`).
+
+Los handlers HTTP encolan con `job_queue.enqueue(kind, payload)` y responden
+en el acto. Los workers reclaman trabajos con `SELECT ... FOR UPDATE SKIP
+LOCKED`, así que pueden convivir varios (tareas asyncio dentro de cada worker
+web o un proceso aparte con `python server.py --jobs`) sin pisarse. Los
+trabajos fallidos se reintentan con backoff exponencial hasta `maxAttempts`.
+
+Los tipos de trabajo se registran con el decorador `job_handler`:
+
+    @job_handler("cloudinary.destroy")
+    async def destroy_image(payload):
+        ...
+
+Los trabajos periódicos (`periodic_job(kind, interval)`) se vuelven a encolar
+al terminar; el mantenimiento se asegura de que siempre haya uno pendiente.
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+_periodic = {}
+
+JOBS_PROCESSED = metrics.registry.counter(
+    "jobs_processed_total",
+    "Trabajos ejecutados por tipo y resultado",
+    ("kind", "result")
+)
+JOB_DURATION = metrics.registry.histogram(
+    "job_duration_seconds",
+    "Duración de los trabajos en segundo plano",
+    ("kind",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0)
+)
+
+CLAIM_SQL = """
+    UPDATE jobs
+    SET status = 'RUNNING',
+        locked_at = now() AT TIME ZONE 'UTC',
+        attempts = attempts + 1,
+        updated_at = now() AT TIME ZONE 'UTC'
+    WHERE id = (
+        SELECT id FROM jobs
+        WHERE status = 'PENDING' AND run_at <= now() AT TIME ZONE 'UTC'
+        ORDER BY priority DESC, run_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, kind, payload, attempts, max_attempts
+"""
+
+RECOVER_SQL = """
+    UPDATE jobs
+    SET status = 'PENDING', locked_at = NULL, updated_at = now() AT TIME ZONE 'UTC'
+    WHERE status = 'RUNNING' AND locked_at < (now() AT TIME ZONE 'UTC') - make_interval(secs => $1)
+"""
+
+PURGE_SQL = """
+    DELETE FROM jobs
+    WHERE status = 'DONE' AND updated_at < (now() AT TIME ZONE 'UTC') - make_interval(days => $1)
+"""
+
+STATS_SQL = """
+    SELECT kind, status::text AS status, count(*)::int AS count,
+           EXTRACT(EPOCH FROM (now() AT TIME ZONE 'UTC') - min(run_at))::float AS oldest_age
+    FROM jobs
+    GROUP BY kind, status
+    ORDER BY kind, status
+"""
+
+
+def job_handler(kind):
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def periodic_job(kind, interval):
+    """
+    Como `job_handler`, pero el trabajo se repite cada `interval` segundos
+    """
+    def register(fn):
+        _handlers[kind] = fn
+        _periodic[kind] = interval
+        return fn
+    return register
+
+
+def _json(value):
+    # Importación diferida: solo la necesita quien encola (los tests de la cola no)
+    from prisma import Json
+    return Json(value)
+
+
+class JobQueue:
+    def __init__(
+        self,
+        db,
+        poll_interval=1.0,
+        backoff_base=5.0,
+        backoff_max=3600.0,
+        lock_timeout=300.0,
+        job_timeout=120.0,
+        retention_days=7
+    ):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lock_timeout = lock_timeout
+        self.job_timeout = job_timeout
+        self.retention_days = retention_days
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+
+    # --- Encolar ---
+
+    async def enqueue(self, kind, payload=None, priority=0, run_at=None, max_attempts=5):
+        job = await self.db.job.create(
+            data={
+                "kind": kind,
+                "payload": _json(payload or {}),
+                "priority": priority,
+                "runAt": run_at or datetime.now(timezone.utc),
+                "maxAttempts": max_attempts
+            }
+        )
+        self._wakeup.set()
+        return job
+
+    async def enqueue_many(self, kind, payloads, priority=0, max_attempts=5, client=None):
+        """
+        Con `client` (una transacción de `db.tx()`) los trabajos solo se
+        confirman si se confirma la transacción
+        """
+        if not payloads:
+            return 0
+        now = datetime.now(timezone.utc)
+        count = await (client or self.db).job.create_many(
+            data=[
+                {
+                    "kind": kind,
+                    "payload": _json(payload),
+                    "priority": priority,
+                    "runAt": now,
+                    "maxAttempts": max_attempts
+                }
+                for payload in payloads
+            ]
+        )
+        self._wakeup.set()
+        return count
+
+    # --- Ejecución ---
+
+    async def run_next(self):
+        """
+        Reclama y ejecuta un trabajo. Devuelve False si no había ninguno listo.
+        """
+        rows = await self.db.query_raw(CLAIM_SQL)
+        if not rows:
+            return False
+
+        job = rows[0]
+        kind = job["kind"]
+        handler = _handlers.get(kind)
+        start = time.perf_counter()
+        try:
+            if handler is None:
+                raise LookupError(f"No hay handler para el trabajo '{kind}'")
+            await asyncio.wait_for(handler(job["payload"] or {}), timeout=self.job_timeout)
+        except Exception as e:
+            await self._fail(job, e)
+            JOBS_PROCESSED.labels(kind, "error").inc()
+        else:
+            await self.db.job.update(
+                where={"id": job["id"]},
+                data={"status": "DONE", "lockedAt": None, "lastError": None}
+            )
+            JOBS_PROCESSED.labels(kind, "ok").inc()
+            if kind in _periodic:
+                await self.ensure_scheduled(kind, delay=_periodic[kind])
+        finally:
+            JOB_DURATION.labels(kind).observe(time.perf_counter() - start)
+        return True
+
+    async def _fail(self, job, error):
+        message = f"{type(error).__name__}: {error}"[:2000]
+        if job["attempts"] >= job["max_attempts"]:
+            logger.error("Trabajo %s (%s) fallido definitivamente: %s", job["id"], job["kind"], message)
+            data = {"status": "FAILED", "lockedAt": None, "lastError": message}
+        else:
+            # Backoff exponencial con jitter
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (job["attempts"] - 1))
+            delay *= random.uniform(0.8, 1.2)
+            logger.warning("Trabajo %s (%s) reintentará en %.0f s: %s", job["id"], job["kind"], delay, message)
+            data = {
+                "status": "PENDING",
+                "lockedAt": None,
+                "lastError": message,
+                "runAt": datetime.now(timezone.utc) + timedelta(seconds=delay)
+            }
+        await self.db.job.update(where={"id": job["id"]}, data=data)
+
+    async def ensure_scheduled(self, kind, delay=0.0, payload=None):
+        """
+        Encola `kind` si no hay ya uno pendiente o en ejecución. El bloqueo
+        consultivo evita que dos workers lo encolen a la vez.
+        """
+        async with self.db.tx() as tx:
+            await tx.query_raw("SELECT pg_advisory_xact_lock(hashtext($1))::text AS locked", kind)
+            scheduled = await tx.job.count(where={"kind": kind, "status": {"in": ["PENDING", "RUNNING"]}})
+            if scheduled:
+                return False
+            await tx.job.create(
+                data={
+                    "kind": kind,
+                    "payload": _json(payload or {}),
+                    "runAt": datetime.now(timezone.utc) + timedelta(seconds=delay)
+                }
+            )
+        self._wakeup.set()
+        return True
+
+    async def recover(self):
+        """
+        Devuelve a la cola los trabajos de workers que murieron a medias,
+        borra los terminados hace más de `retention_days` y programa los
+        periódicos que falten
+        """
+        await self.db.execute_raw(RECOVER_SQL, self.lock_timeout)
+        await self.db.execute_raw(PURGE_SQL, self.retention_days)
+        for kind in _periodic:
+            await self.ensure_scheduled(kind)
+
+    async def _worker(self):
+        while True:
+            try:
+                if await self.run_next():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error en el worker de trabajos")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _maintenance(self):
+        while True:
+            try:
+                await self.recover()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error al recuperar trabajos bloqueados")
+            await asyncio.sleep(self.lock_timeout / 2)
+
+    def start(self, workers=1):
+        if workers <= 0:
+            return
+        self._tasks.append(asyncio.create_task(self._maintenance()))
+        for _ in range(workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    # --- Administración ---
+
+    async def stats(self, failures=20):
+        rows = await self.db.query_raw(STATS_SQL)
+        queues = {}
+        for row in rows:
+            queue = queues.setdefault(row["kind"], {"kind": row["kind"], "counts": {}, "oldestPendingSeconds": None})
+            queue["counts"][row["status"]] = row["count"]
+            if row["status"] == "PENDING":
+                queue["oldestPendingSeconds"] = row["oldest_age"]
+
+        recent_failures = await self.db.job.find_many(
+            where={"status": "FAILED"},
+            order={"updatedAt": "desc"},
+            take=failures
+        )
+        return {
+            "queues": list(queues.values()),
+            "pending": sum(q["counts"].get("PENDING", 0) for q in queues.values()),
+            "running": sum(q["counts"].get("RUNNING", 0) for q in queues.values()),
+            "failed": sum(q["counts"].get("FAILED", 0) for q in queues.values()),
+            "recentFailures": [
+                {
+                    "id": job.id,
+                    "kind": job.kind,
+                    "attempts": job.attempts,
+                    "lastError": job.lastError,
+                    "updatedAt": job.updatedAt
+                }
+                for job in recent_failures
+            ]
+        }
+
+    async def retry(self, job_id):
+        """
+        Vuelve a encolar un trabajo fallido. Devuelve None si no existe y lanza
+        ValueError si no está fallido (pendiente, en ejecución o terminado)
+        """
+        job = await self.db.job.find_unique(where={"id": job_id})
+        if job is None:
+            return None
+        # El estado se comprueba en el propio UPDATE por si un worker lo cambia entretanto
+        count = await self.db.job.update_many(
+            where={"id": job_id, "status": "FAILED"},
+            data={
+                "status": "PENDING",
+                "attempts": 0,
+                "lockedAt": None,
+                "runAt": datetime.now(timezone.utc)
+            }
+        )
+        if not count:
+            raise ValueError(f"El trabajo {job_id} no está fallido")
+        self._wakeup.set()
+        return job
@@ -0,0 +1,172 @@
+"""
+Sugerencias de ubicación para el buscador (`/api/locations/suggest`).
+
+`LocationIndex` reúne los valores distintos de `location`, `city`, `zipCode`
+y el nombre de la calle de `address` de las propiedades activas, con el
+número de anuncios de cada uno. Las claves se normalizan (minúsculas y sin
+tildes) y se guardan en un array ordenado, una entrada por cada palabra del
+término, de modo que "deli" encuentra "Las Delicias". Una búsqueda es una
+bisección para acotar el rango del prefijo y un top-k por número de anuncios.
+
+Se mantiene con los eventos `property` del bus de invalidación, igual que el
+índice de similares.
+"""
+import bisect
+import heapq
+import logging
+import re
+
+from text_utils import normalize
+
+logger = logging.getLogger(__name__)
+
+ROWS_SQL = """
+    SELECT id, status::text AS status, location, city, zip_code AS "zipCode", address
+    FROM properties
+    WHERE {where}
+"""
+
+# "Calle Alfonso I, 12, 3º B" -> "Calle Alfonso I"
+STREET_NUMBER = re.compile(r"[,;]|\s(?:n[º°o.]\s*)?\d")
+
+
+def street_name(address):
+    match = STREET_NUMBER.search(address)
+    return (address[:match.start()] if match else address).strip()
+
+
+def terms_for(row):
+    terms = set()
+    for kind, value in (
+        ("location", row["location"]),
+        ("city", row["city"]),
+        ("zipCode", row["zipCode"]),
+        ("street", street_name(row["address"]) if row["address"] else None)
+    ):
+        if value and value.strip():
+            terms.add((kind, value.strip()))
+    return terms
+
+
+class LocationIndex:
+    def __init__(self, db):
+        self.db = db
+        self.loaded = False
+        self._reloading = False
+        self._pending = set()
+        self._reset()
+
+    def _reset(self):
+        # (kind, texto normalizado) -> número de anuncios
+        self._counts = {}
+        # (kind, texto normalizado) -> {texto original: anuncios} para mostrar la variante más usada
+        self._labels = {}
+        self._by_property = {}
+        # Claves ordenadas: (prefijo buscable, kind, texto normalizado)
+        self._keys = []
+
+    def __len__(self):
+        return len(self._counts)
+
+    async def fetch_rows(self, property_ids=None):
+        if property_ids is None:
+            return await self.db.query_raw(ROWS_SQL.format(where="status = 'ACTIVE'"))
+        return await self.db.query_raw(ROWS_SQL.format(where="id = ANY($1::text[])"), property_ids)
+
+    async def reload(self):
+        self._reloading = True
+        self._pending.clear()
+        try:
+            rows = await self.fetch_rows()
+            self._reset()
+            for row in rows:
+                self._add(row["id"], terms_for(row), build=False)
+            self._keys = sorted(
+                (key, kind, normalized)
+                for kind, normalized in self._counts
+                for key in self._search_keys(normalized)
+            )
+            # Cambios que llegaron mientras se leía la tabla
+            if self._pending:
+                pending = list(self._pending)
+                found = {row["id"]: row for row in await self.fetch_rows(pending)}
+                for property_id in pending:
+                    self.apply(property_id, found.get(property_id))
+        finally:
+            self._reloading = False
+        self.loaded = True
+        logger.info("Índice de ubicaciones cargado: %d términos", len(self._counts))
+
+    @staticmethod
+    def _search_keys(normalized):
+        words = normalized.split(" ")
+        return {" ".join(words[i:]) for i in range(len(words))}
+
+    def _add(self, property_id, terms, build=True):
+        self._by_property[property_id] = terms
+        for kind, text in terms:
+            term = (kind, normalize(text))
+            if term not in self._counts:
+                self._counts[term] = 0
+                self._labels[term] = {}
+                if build:
+                    for key in self._search_keys(term[1]):
+                        bisect.insort(self._keys, (key, kind, term[1]))
+            self._counts[term] += 1
+            labels = self._labels[term]
+            labels[text] = labels.get(text, 0) + 1
+
+    def _remove(self, property_id):
+        for kind, text in self._by_property.pop(property_id, ()):
+            term = (kind, normalize(text))
+            self._counts[term] -= 1
+            labels = self._labels[term]
+            labels[text] -= 1
+            if not labels[text]:
+                del labels[text]
+            if not self._counts[term]:
+                del self._counts[term]
+                del self._labels[term]
+                for key in self._search_keys(term[1]):
+                    entry = (key, kind, term[1])
+                    index = bisect.bisect_left(self._keys, entry)
+                    if index < len(self._keys) and self._keys[index] == entry:
+                        del self._keys[index]
+
+    async def refresh(self, property_id):
+        """
+        Suscriptor del bus de invalidación
+        """
+        if property_id is None:
+            await self.reload()
+            return
+        if self._reloading or not self.loaded:
+            # Se aplica al terminar la carga (la primera o una tras reconexión)
+            self._pending.add(property_id)
+            return
+        rows = await self.fetch_rows([property_id])
+        self.apply(property_id, rows[0] if rows else None)
+
+    def apply(self, property_id, row):
+        self._remove(property_id)
+        if row is not None and row["status"] == "ACTIVE":
+            self._add(property_id, terms_for(row))
+
+    def suggest(self, query, limit=8):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self._keys, (prefix,))
+        end = bisect.bisect_left(self._keys, (prefix + "\uffff",), lo=start)
+
+        # Un término puede aparecer varias veces (una por palabra)
+        terms = {(kind, normalized) for _, kind, normalized in self._keys[start:end]}
+        best = heapq.nsmallest(limit, terms, key=lambda term: (-self._counts[term], term[1]))
+        return [
+            {
+                "text": max(self._labels[term].items(), key=lambda label: label[1])[0],
+                "type": term[0],
+                "count": self._counts[term]
+            }
+            for term in best
+        ]
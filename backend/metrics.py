@@ -0,0 +1,298 @@
+"""
+Métricas en formato de texto de Prometheus.
+
+Implementación mínima pensada para estar siempre activa en producción: cada
+observación es una búsqueda en un diccionario y un par de sumas, sin locks.
+Todo se ejecuta en el hilo del event loop, así que no hay carreras entre
+peticiones.
+"""
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        self.value += amount
+
+    def dec(self, amount=1.0):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_number(child.value)}"]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def dec(self, amount=1.0):
+        self.labels().dec(amount)
+
+
+class _HistogramValue:
+    __slots__ = ("upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.upper_bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.upper_bounds)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _render_child(self, values, child):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.upper_bounds + (float("inf"),), child.counts):
+            cumulative += count
+            le = f'le="{_format_number(float(bound))}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_number(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        """
+        Función llamada antes de cada exportación para actualizar métricas derivadas
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por ruta y código de estado",
+    ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight",
+    "Peticiones HTTP en curso"
+)
+DB_QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds",
+    "Duración de las consultas de Prisma por modelo y operación",
+    ("model", "operation")
+)
+DB_QUERY_ERRORS = registry.counter(
+    "db_query_errors_total",
+    "Consultas de Prisma que terminaron en error",
+    ("model", "operation")
+)
+EXTERNAL_CALL_DURATION = registry.histogram(
+    "external_call_duration_seconds",
+    "Latencia de las llamadas a servicios externos",
+    ("service", "operation"),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total",
+    "Consultas a cachés en memoria por resultado",
+    ("cache", "result")
+)
+CACHE_HIT_RATIO = registry.gauge(
+    "cache_hit_ratio",
+    "Proporción de aciertos de cada caché desde el arranque",
+    ("cache",)
+)
+EVENT_LOOP_LAG = registry.histogram(
+    "event_loop_lag_seconds",
+    "Retraso del event loop respecto al intervalo programado",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+
+def cache_hit(cache):
+    CACHE_REQUESTS.labels(cache, "hit").inc()
+
+
+def cache_miss(cache):
+    CACHE_REQUESTS.labels(cache, "miss").inc()
+
+
+def _collect_cache_ratios():
+    totals = {}
+    for (cache, result), child in CACHE_REQUESTS._children.items():
+        hits, total = totals.get(cache, (0.0, 0.0))
+        if result == "hit":
+            hits += child.value
+        totals[cache] = (hits, total + child.value)
+    for cache, (hits, total) in totals.items():
+        CACHE_HIT_RATIO.labels(cache).set(hits / total if total else 0.0)
+
+
+registry.add_collector(_collect_cache_ratios)
+
+
+def observe_query(model, operation, arguments, duration, error):
+    """
+    Listener de consultas para `db_client.add_query_listener`
+    """
+    DB_QUERY_DURATION.labels(model, operation).observe(duration)
+    if error is not None:
+        DB_QUERY_ERRORS.labels(model, operation).inc()
+
+
+async def monitor_event_loop(interval=0.5):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide la latencia por plantilla de ruta (p. ej.
+    `/api/properties/{property_id}`) para no disparar la cardinalidad.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code)
+            ).observe(time.perf_counter() - start)
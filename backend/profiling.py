@@ -0,0 +1,176 @@
+"""
+Perfilado bajo demanda de peticiones concretas (solo administradores).
+
+Con la cabecera `X-Profile: 1` y un token de administrador, `ProfilingMiddleware`
+ejecuta la petición bajo el perfilador de muestreo de pyinstrument y guarda en
+`directory` un fichero speedscope (https://www.speedscope.app) y un resumen con
+el tiempo total, el de base de datos y el de serialización. Solo se conservan
+los `ring_size` perfiles más recientes. Sin la cabecera el middleware se limita
+a mirar las cabeceras y pasar la petición.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+
+import query_tracking
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pragma: no cover - dependencia opcional
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ID = re.compile(r"^[\w-]+$")
+
+# Marcos que cuentan como serialización de la respuesta
+SERIALIZATION_FRAMES = (
+    ("fastapi/routing.py", "serialize_response"),
+    ("fastapi/encoders.py", "jsonable_encoder"),
+    ("starlette/responses.py", "render"),
+    ("fast_json.py", None)
+)
+
+
+def _is_serialization(frame):
+    path = (frame.file_path or "").replace(os.sep, "/")
+    for suffix, function in SERIALIZATION_FRAMES:
+        if path.endswith(suffix) and (function is None or frame.function == function):
+            return True
+    return False
+
+
+def serialization_time(frame):
+    if frame is None:
+        return 0.0
+    if _is_serialization(frame):
+        return frame.time
+    return sum(serialization_time(child) for child in frame.children)
+
+
+class ProfileStore:
+    """
+    Anillo de perfiles en disco: `<id>.speedscope.json` y `<id>.summary.json`
+    """
+
+    def __init__(self, directory, ring_size=50):
+        self.directory = directory
+        self.ring_size = ring_size
+
+    def _path(self, profile_id, kind):
+        return os.path.join(self.directory, f"{profile_id}.{kind}.json")
+
+    def save(self, profile_id, speedscope, summary):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(profile_id, "speedscope"), "w") as f:
+            f.write(speedscope)
+        with open(self._path(profile_id, "summary"), "w") as f:
+            json.dump(summary, f)
+        self._trim()
+
+    def _trim(self):
+        summaries = sorted(
+            name for name in os.listdir(self.directory) if name.endswith(".summary.json")
+        )
+        for name in summaries[:-self.ring_size] if len(summaries) > self.ring_size else []:
+            profile_id = name[:-len(".summary.json")]
+            for kind in ("summary", "speedscope"):
+                try:
+                    os.remove(self._path(profile_id, kind))
+                except FileNotFoundError:
+                    pass
+
+    def list(self):
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.endswith(".summary.json"):
+                with open(os.path.join(self.directory, name)) as f:
+                    summaries.append(json.load(f))
+        return summaries
+
+    def speedscope_path(self, profile_id):
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = self._path(profile_id, "speedscope")
+        return path if os.path.exists(path) else None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, store, authorize, interval=0.001):
+        self.app = app
+        self.store = store
+        self.authorize = authorize
+        self.interval = interval
+        # pyinstrument no admite bien varios perfiles a la vez en el mismo hilo
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(
+            name == b"x-profile" and value == b"1" for name, value in scope["headers"]
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        if Profiler is None or not self.authorize(headers) or self._lock.locked():
+            await self.app(scope, receive, send)
+            return
+
+        async with self._lock:
+            await self._profile(scope, receive, send)
+
+    async def _profile(self, scope, receive, send):
+        # Prefijo con la fecha: el orden alfabético es el cronológico
+        profile_id = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        status_code = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        start = time.perf_counter()
+        with query_tracking.record_queries() as recorder:
+            profiler.start()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.stop()
+                total = time.perf_counter() - start
+
+        try:
+            session = profiler.last_session
+            serialize = serialization_time(session.root_frame())
+            summary = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status_code,
+                "createdAt": datetime.now(timezone.utc).isoformat(),
+                "totalMs": round(total * 1000, 2),
+                "dbMs": round(recorder.total_time * 1000, 2),
+                "dbQueries": recorder.count,
+                "serializationMs": round(serialize * 1000, 2),
+                "handlerMs": round(max(total - recorder.total_time - serialize, 0) * 1000, 2),
+                "queries": [
+                    {"fingerprint": fp, "ms": round(duration * 1000, 2)} for fp, duration in recorder.queries
+                ]
+            }
+            speedscope = SpeedscopeRenderer().render(session)
+            await asyncio.to_thread(self.store.save, profile_id, speedscope, summary)
+        except Exception:
+            logger.exception("No se pudo guardar el perfil %s", profile_id)
@@ -0,0 +1,99 @@
+"""
+Registro de consultas lentas y estadísticas por huella.
+
+`QueryStats.observe` es un listener de `db_client`: agrupa cada consulta por
+su huella (`query_tracking.fingerprint`: modelo, operación y forma del
+`where`), acumula número, tiempo total, máximo y errores, y guarda las últimas
+duraciones para calcular el p95. Las consultas que superan `slow_threshold`
+se escriben en el log con los valores de `where`, `data` y los parámetros,
+y los literales del SQL en crudo, sustituidos por `?`.
+"""
+import logging
+from collections import deque
+
+from query_tracking import fingerprint, normalize_sql
+
+logger = logging.getLogger("slow_queries")
+
+# Argumentos con datos de usuario que nunca se escriben en el log
+REDACTED_KEYS = ("where", "data", "parameters", "create", "update")
+
+
+def redact(value, hidden=False):
+    if isinstance(value, dict):
+        return {
+            key: normalize_sql(item) if key == "query" and isinstance(item, str)
+            else redact(item, hidden or key in REDACTED_KEYS)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item, hidden) for item in value]
+    return "?" if hidden else value
+
+
+class FingerprintStats:
+    __slots__ = ("count", "total", "max", "errors", "recent")
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.recent = deque(maxlen=window)
+
+    def p95(self):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class QueryStats:
+    def __init__(self, slow_threshold=0.2, window=1000, max_fingerprints=1000):
+        self.slow_threshold = slow_threshold
+        self.window = window
+        self.max_fingerprints = max_fingerprints
+        self._stats = {}
+
+    def observe(self, model, operation, arguments, duration, error):
+        fp = fingerprint(model, operation, arguments)
+        stats = self._stats.get(fp)
+        if stats is None:
+            if len(self._stats) >= self.max_fingerprints:
+                # Protección frente a huellas sin límite (p. ej. SQL generado)
+                fp = "other"
+                stats = self._stats.setdefault(fp, FingerprintStats(self.window))
+            else:
+                stats = self._stats[fp] = FingerprintStats(self.window)
+        stats.count += 1
+        stats.total += duration
+        stats.max = max(stats.max, duration)
+        stats.recent.append(duration)
+        if error is not None:
+            stats.errors += 1
+
+        if duration >= self.slow_threshold:
+            logger.warning(
+                "Consulta lenta (%.1f ms): %s %s",
+                duration * 1000, fp, redact(arguments or {})
+            )
+
+    def snapshot(self, sort="total", limit=50):
+        rows = [
+            {
+                "fingerprint": fp,
+                "count": stats.count,
+                "totalMs": round(stats.total * 1000, 2),
+                "meanMs": round(stats.total / stats.count * 1000, 3),
+                "p95Ms": round(stats.p95() * 1000, 3),
+                "maxMs": round(stats.max * 1000, 3),
+                "errors": stats.errors
+            }
+            for fp, stats in list(self._stats.items())
+        ]
+        key = {"total": "totalMs", "p95": "p95Ms", "count": "count", "max": "maxMs", "mean": "meanMs"}[sort]
+        rows.sort(key=lambda row: row[key], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        self._stats.clear()
@@ -0,0 +1,145 @@
+"""
+Registro de consultas por petición y detección de N+1.
+
+`record_queries()` abre un registro en el contexto actual; el listener
+`track_query` (registrado en `db_client`) apunta en él cada consulta con su
+huella y su duración. En modo desarrollo `QueryTrackingMiddleware` lo hace para
+cada petición, añade las cabeceras `X-DB-Query-Count` y `X-DB-Time-Ms` y avisa
+en el log cuando la misma consulta se repite dentro de una petición.
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("query_recorder", default=None)
+# Registros que reciben todas las consultas, sea cual sea el contexto (tests)
+_global_recorders = []
+
+
+# Literales que se sustituyen por `?` en el SQL en crudo
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*(?:\?|\$\d+)(?:\s*,\s*(?:\?|\$\d+))*\s*\)", re.IGNORECASE)
+
+
+def normalize_sql(query):
+    """
+    Texto de la consulta en una línea y sin literales: cadenas y números pasan
+    a `?` y una lista `IN (...)` de cualquier longitud queda en `IN (?)`
+    """
+    query = _STRING.sub("?", " ".join(query.split()))
+    query = _NUMBER.sub("?", query)
+    return _IN_LIST.sub("IN (?)", query)
+
+
+def _shape(value):
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{key}:{_shape(value[key])}" for key in sorted(value)) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(sorted({_shape(item) for item in value})) + "]"
+    return "?"
+
+
+def fingerprint(model, operation, arguments):
+    """
+    Huella de una consulta: modelo, operación y forma del `where` sin valores,
+    p. ej. `Category.find_unique where={id:?}`. Para SQL en crudo, el texto
+    de la consulta sin literales (`normalize_sql`).
+    """
+    query = (arguments or {}).get("query")
+    if isinstance(query, str):
+        return f"{model}.{operation} {normalize_sql(query)[:160]}"
+    where = (arguments or {}).get("where")
+    if where is None:
+        return f"{model}.{operation}"
+    return f"{model}.{operation} where={_shape(where)}"
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+        self.total_time = 0.0
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def add(self, fingerprint, duration):
+        self.queries.append((fingerprint, duration))
+        self.total_time += duration
+
+    def repeated(self, threshold):
+        """
+        Huellas que se repiten al menos `threshold` veces (posible N+1)
+        """
+        counts = Counter(fp for fp, _ in self.queries)
+        return {fp: n for fp, n in counts.items() if n >= threshold}
+
+    def summary(self):
+        return "\n".join(f"  {duration * 1000:8.2f} ms  {fp}" for fp, duration in self.queries)
+
+
+@contextmanager
+def record_queries(capture_all=False):
+    """
+    Registra las consultas hechas dentro del bloque. Con `capture_all=True`
+    recoge también las de otros hilos y tareas (útil con TestClient).
+    """
+    recorder = QueryRecorder()
+    token = _current.set(recorder)
+    if capture_all:
+        _global_recorders.append(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+        if capture_all:
+            _global_recorders.remove(recorder)
+
+
+def track_query(model, operation, arguments, duration, error):
+    recorder = _current.get()
+    if recorder is None and not _global_recorders:
+        return
+    fp = fingerprint(model, operation, arguments)
+    if recorder is not None:
+        recorder.add(fp, duration)
+    for global_recorder in _global_recorders:
+        if global_recorder is not recorder:
+            global_recorder.add(fp, duration)
+
+
+class QueryTrackingMiddleware:
+    """
+    Middleware ASGI solo para desarrollo: cuenta las consultas de cada petición
+    """
+
+    def __init__(self, app, n_plus_one_threshold=3):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with record_queries() as recorder:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-query-count", str(recorder.count).encode()))
+                    headers.append((b"x-db-time-ms", f"{recorder.total_time * 1000:.2f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        for fp, count in recorder.repeated(self.n_plus_one_threshold).items():
+            logger.warning(
+                "Posible N+1 en %s %s: %d consultas %s",
+                scope["method"], scope["path"], count, fp
+            )
@@ -0,0 +1,180 @@
+"""
+Búsquedas guardadas y emparejamiento incremental de anuncios.
+
+En lugar de volver a lanzar cada filtro guardado cuando entra o cambia un
+anuncio, `SearchIndex` invierte los filtros: cubos por tipo de vivienda y, en
+cada cubo, un árbol de intervalos sobre el rango de precio. Para un anuncio se
+consultan solo las búsquedas de su tipo (o sin tipo) cuyo intervalo contiene
+su precio, y sobre esos candidatos se comprueban el resto de condiciones
+(dormitorios, estado, zona, destacado). Son las mismas condiciones que
+aplica `get_properties`.
+
+Cada worker tiene su índice; se mantiene con los eventos `saved-search` del
+bus de invalidación (clave = id de la búsqueda, `None` = recarga completa).
+"""
+import logging
+import math
+from enum import Enum
+
+logger = logging.getLogger(__name__)
+
+
+def _value(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+class SearchFilter:
+    __slots__ = ("id", "status", "min_price", "max_price", "bedrooms", "property_type", "location", "featured")
+
+    def __init__(self, search):
+        self.id = search.id
+        self.status = search.status
+        self.min_price = search.minPrice if search.minPrice is not None else -math.inf
+        self.max_price = search.maxPrice if search.maxPrice is not None else math.inf
+        self.bedrooms = search.bedrooms
+        self.property_type = search.propertyType
+        self.location = search.location
+        self.featured = search.featured
+
+    def matches(self, listing):
+        """
+        Condiciones que no resuelve el índice
+        """
+        if self.status and self.status != _value(listing.status):
+            return False
+        if self.bedrooms and listing.bedrooms < self.bedrooms:
+            return False
+        if self.location and self.location not in listing.location:
+            return False
+        if self.featured is not None and self.featured != listing.featured:
+            return False
+        return True
+
+
+class IntervalTree:
+    """
+    Árbol de intervalos centrado y estático: se reconstruye al cambiar los
+    intervalos y responde "¿qué intervalos contienen x?" en O(log n + k)
+    """
+
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, intervals):
+        # intervals: lista de (inicio, fin, clave)
+        points = sorted(point for start, end, _ in intervals for point in (start, end) if math.isfinite(point))
+        self.center = points[len(points) // 2] if points else 0.0
+
+        here, left, right = [], [], []
+        for interval in intervals:
+            start, end, _ = interval
+            if end < self.center:
+                left.append(interval)
+            elif start > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        self.by_start = sorted(here, key=lambda interval: interval[0])
+        self.by_end = sorted(here, key=lambda interval: interval[1], reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def stab(self, x, out):
+        node = self
+        while node is not None:
+            if x < node.center:
+                for start, _, key in node.by_start:
+                    if start > x:
+                        break
+                    out.append(key)
+                node = node.left
+            else:
+                for _, end, key in node.by_end:
+                    if end < x:
+                        break
+                    out.append(key)
+                if x == node.center:
+                    break
+                node = node.right
+        return out
+
+
+class SearchIndex:
+    def __init__(self, db):
+        self.db = db
+        self.loaded = False
+        self._filters = {}
+        self._by_type = {}
+        self._trees = {}
+
+    def __len__(self):
+        return len(self._filters)
+
+    async def reload(self):
+        searches = await self.db.savedsearch.find_many(where={"active": True})
+        self._filters = {}
+        self._by_type = {}
+        for search in searches:
+            self._add(SearchFilter(search))
+        self._trees = {}
+        self.loaded = True
+        logger.info("Índice de búsquedas guardadas cargado: %d búsquedas", len(self._filters))
+
+    def _add(self, search_filter):
+        self._filters[search_filter.id] = search_filter
+        self._by_type.setdefault(search_filter.property_type, set()).add(search_filter.id)
+        # El árbol del cubo se reconstruye en el siguiente emparejamiento
+        self._trees.pop(search_filter.property_type, None)
+
+    def _remove(self, search_id):
+        search_filter = self._filters.pop(search_id, None)
+        if search_filter is not None:
+            self._by_type[search_filter.property_type].discard(search_id)
+            self._trees.pop(search_filter.property_type, None)
+
+    async def refresh(self, search_id):
+        """
+        Suscriptor del bus de invalidación
+        """
+        if search_id is None:
+            await self.reload()
+            return
+        if not self.loaded:
+            return
+        self._remove(search_id)
+        search = await self.db.savedsearch.find_unique(where={"id": search_id})
+        if search and search.active:
+            self._add(SearchFilter(search))
+
+    def match(self, listing):
+        """
+        Ids de las búsquedas que casan con el anuncio (modelo Property)
+        """
+        candidates = []
+        for property_type in (listing.propertyType, None):
+            if not self._by_type.get(property_type):
+                continue
+            tree = self._trees.get(property_type)
+            if tree is None:
+                tree = self._trees[property_type] = IntervalTree([
+                    (self._filters[search_id].min_price, self._filters[search_id].max_price, search_id)
+                    for search_id in self._by_type[property_type]
+                ])
+            tree.stab(listing.price, candidates)
+        return [search_id for search_id in candidates if self._filters[search_id].matches(listing)]
+
+
+async def record_matches(client, index, listing, reason):
+    """
+    Apunta en la tabla de salida (`search_matches`) las búsquedas que casan con
+    el anuncio, dentro de la transacción que lo modifica
+    """
+    search_ids = index.match(listing)
+    if not search_ids:
+        return 0
+    return await client.searchmatch.create_many(
+        data=[
+            {"savedSearchId": search_id, "propertyId": listing.id, "reason": reason}
+            for search_id in search_ids
+        ]
+    )
@@ -1,15 +1,314 @@
+import argparse
 import asyncio
+import math
+import random
+import re
+import unicodedata
+import uuid
+from datetime import datetime, timedelta, timezone
 from prisma import Prisma
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
 
+import amenities
+
 load_dotenv()
 
 # Configuración de encriptación
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-async def main():
+
+# --- Generador de datos sintéticos ---
+#
+# Uso:
+#   python seed.py --properties 100000 --posts 5000 --images-per-property 20 --seed 42
+#
+# Con la misma semilla se generan exactamente los mismos datos, así que las
+# ejecuciones de los benchmarks son comparables entre sí.
+
+# Límites aproximados del término municipal de Zaragoza
+CITY_BOUNDS = {"lat": (41.585, 41.715), "lng": (-0.975, -0.820)}
+
+# Barrio: (latitud, longitud, radio en grados, código postal, €/m² medio, peso)
+NEIGHBOURHOODS = {
+    "Centro": (41.6505, -0.8815, 0.006, "50004", 3100, 8),
+    "Casco Histórico": (41.6555, -0.8785, 0.005, "50003", 2600, 6),
+    "Universidad": (41.6420, -0.8950, 0.007, "50005", 2500, 8),
+    "Romareda": (41.6365, -0.9010, 0.006, "50009", 2900, 5),
+    "Delicias": (41.6470, -0.9160, 0.009, "50017", 1550, 12),
+    "Actur-Rey Fernando": (41.6715, -0.8935, 0.010, "50018", 2100, 9),
+    "El Rabal": (41.6625, -0.8715, 0.008, "50014", 1650, 7),
+    "San José": (41.6400, -0.8655, 0.007, "50008", 1700, 8),
+    "Las Fuentes": (41.6460, -0.8555, 0.006, "50002", 1500, 5),
+    "Torrero-La Paz": (41.6270, -0.8830, 0.008, "50007", 1600, 6),
+    "Casablanca": (41.6280, -0.9065, 0.007, "50012", 2200, 4),
+    "Oliver-Valdefierro": (41.6420, -0.9320, 0.008, "50011", 1500, 4),
+    "Valdespartera": (41.6130, -0.9240, 0.008, "50019", 1900, 5),
+    "Arcosur": (41.6020, -0.9430, 0.009, "50021", 1750, 4),
+    "Miralbueno": (41.6500, -0.9330, 0.008, "50011", 1800, 3),
+    "La Almozara": (41.6600, -0.9050, 0.006, "50003", 1800, 4),
+    "Parque Goya": (41.6850, -0.8850, 0.006, "50015", 1700, 3),
+    "Santa Isabel": (41.6740, -0.8480, 0.007, "50016", 1500, 3),
+}
+
+STREETS = {
+    "Centro": ["Paseo de la Independencia", "Calle Alfonso I", "Calle Costa", "Plaza de España"],
+    "Casco Histórico": ["Calle Mayor", "Calle San Pablo", "Calle Predicadores", "Calle Don Jaime I"],
+    "Universidad": ["Calle Pedro Cerbuna", "Paseo de Fernando el Católico", "Calle Corona de Aragón"],
+    "Romareda": ["Avenida de Isabel la Católica", "Calle Luis Bermejo", "Vía Ibérica"],
+    "Delicias": ["Avenida de Madrid", "Calle Delicias", "Vía Univérsitas", "Calle Duquesa Villahermosa"],
+    "Actur-Rey Fernando": ["Avenida de Ranillas", "Calle Gertrudis Gómez de Avellaneda", "Avenida de Gómez Laguna"],
+    "El Rabal": ["Avenida de Cataluña", "Calle Sobrarbe", "Calle Marqués de la Cadena"],
+    "San José": ["Avenida de San José", "Calle Miguel Servet", "Calle Cuarte"],
+    "Las Fuentes": ["Calle Compromiso de Caspe", "Calle Rodrigo Rebolledo", "Calle Salvador Minguijón"],
+    "Torrero-La Paz": ["Avenida de América", "Calle Fray Julián Garcés", "Paseo Cuéllar"],
+    "Casablanca": ["Vía Ibérica", "Calle Argualas", "Avenida de Casablanca"],
+    "Oliver-Valdefierro": ["Calle Antonio Leyva", "Avenida de la Ilustración", "Calle Teniente Polanco"],
+    "Valdespartera": ["Calle Casablanca", "Calle Lo que el viento se llevó", "Avenida de Cesáreo Alierta"],
+    "Arcosur": ["Avenida de la Ciudad de Soria", "Calle Alfredo Di Stéfano", "Avenida de Ana María Matute"],
+    "Miralbueno": ["Camino del Pilón", "Calle Alfonso Solans", "Avenida de Navarra"],
+    "La Almozara": ["Avenida de Puerta Sancho", "Calle Ricla", "Avenida de Pablo Gargallo"],
+    "Parque Goya": ["Avenida de la Academia General Militar", "Calle Ángela Bravo Ortega", "Calle Emilio Alfaro"],
+    "Santa Isabel": ["Avenida de Santa Isabel", "Calle Mayor de Santa Isabel", "Calle Camino de los Molinos"],
+}
+
+# Tipo: (superficie mediana m², dispersión log-normal, multiplicador de precio, peso)
+PROPERTY_TYPES = {
+    "APARTMENT": (82, 0.25, 1.00, 55),
+    "PENTHOUSE": (105, 0.25, 1.20, 6),
+    "DUPLEX": (120, 0.22, 1.05, 5),
+    "STUDIO": (38, 0.18, 1.10, 6),
+    "HOUSE": (160, 0.30, 0.90, 8),
+    "CHALET": (230, 0.30, 0.95, 6),
+    "VILLA": (320, 0.30, 1.10, 1),
+    "COMMERCIAL": (95, 0.50, 0.70, 5),
+    "OFFICE": (110, 0.45, 0.75, 3),
+    "WAREHOUSE": (400, 0.50, 0.25, 1),
+    "GARAGE": (14, 0.15, 1.00, 3),
+    "LAND": (600, 0.60, 0.10, 1),
+}
+
+TYPE_LABELS = {
+    "APARTMENT": "Piso", "PENTHOUSE": "Ático", "DUPLEX": "Dúplex", "STUDIO": "Estudio",
+    "HOUSE": "Casa", "CHALET": "Chalet", "VILLA": "Villa", "COMMERCIAL": "Local comercial",
+    "OFFICE": "Oficina", "WAREHOUSE": "Nave", "GARAGE": "Plaza de garaje", "LAND": "Terreno",
+}
+
+RESIDENTIAL_TYPES = {"APARTMENT", "PENTHOUSE", "DUPLEX", "STUDIO", "HOUSE", "CHALET", "VILLA"}
+
+ADJECTIVES = ["luminoso", "reformado", "amplio", "exterior", "céntrico", "tranquilo", "con vistas", "para entrar a vivir"]
+
+ENERGY_RATINGS = {"A": 3, "B": 5, "C": 10, "D": 20, "E": 35, "F": 15, "G": 12}
+
+STATUSES = {"ACTIVE": 75, "RESERVED": 7, "SOLD": 13, "INACTIVE": 5}
+
+FEATURES = {
+    "Ascensor": 0.65, "Calefacción central": 0.35, "Aire acondicionado": 0.55, "Terraza": 0.35,
+    "Balcón": 0.40, "Garaje": 0.30, "Trastero": 0.35, "Piscina comunitaria": 0.12,
+    "Jardín": 0.10, "Armarios empotrados": 0.50, "Portero": 0.15, "Cocina equipada": 0.60,
+    "Exterior": 0.70, "Amueblado": 0.25, "Accesible": 0.20,
+}
+
+POST_TOPICS = [
+    "Cómo calcular la hipoteca de tu primera vivienda en {barrio}",
+    "Precio del metro cuadrado en {barrio}: evolución del último año",
+    "Guía para reformar la cocina sin salirse del presupuesto",
+    "Qué mirar en el certificado energético antes de comprar",
+    "Vivir en {barrio}: servicios, transporte y colegios",
+    "Consejos para vender tu piso más rápido en Zaragoza",
+    "Ideas de decoración para pisos pequeños",
+    "El mercado del alquiler en {barrio}",
+]
+
+PARAGRAPHS = [
+    "El mercado inmobiliario de Zaragoza mantiene una demanda estable, con especial interés en viviendas reformadas y bien comunicadas.",
+    "Antes de firmar conviene revisar la nota simple, las cuotas de la comunidad y el estado de las instalaciones comunes.",
+    "Los barrios con buena oferta de transporte público y zonas verdes son los que mejor conservan su valor con el paso del tiempo.",
+    "Una buena iluminación natural y la orientación de la vivienda influyen tanto en el confort como en el consumo energético.",
+    "Negociar el precio es habitual; contar con una valoración profesional ayuda a fijar expectativas realistas.",
+]
+
+DEFAULT_CATEGORIES = [
+    {"name": "Noticias", "slug": "noticias"},
+    {"name": "Consejos", "slug": "consejos"},
+    {"name": "Mercado inmobiliario", "slug": "mercado-inmobiliario"},
+    {"name": "Reformas", "slug": "reformas"},
+    {"name": "Decoración", "slug": "decoracion"}
+]
+
+
+def _slugify(text):
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    text = re.sub(r'[^\w\s-]', '', text.lower())
+    return re.sub(r'[-\s]+', '-', text).strip('-_')
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), list(weights.values()))[0]
+
+
+def _clamp(value, bounds):
+    return min(max(value, bounds[0]), bounds[1])
+
+
+def generate_property(rng, index, user_id, now, images_per_property):
+    """
+    Genera una propiedad con sus imágenes y características
+    """
+    barrio = _weighted(rng, {name: data[5] for name, data in NEIGHBOURHOODS.items()})
+    lat, lng, radius, zip_code, price_m2, _ = NEIGHBOURHOODS[barrio]
+    property_type = _weighted(rng, {name: data[3] for name, data in PROPERTY_TYPES.items()})
+    median_area, spread, type_factor, _ = PROPERTY_TYPES[property_type]
+
+    area = round(median_area * math.exp(rng.gauss(0, spread)), 1)
+    residential = property_type in RESIDENTIAL_TYPES
+    bedrooms = max(1, min(7, round(area / 30 + rng.gauss(0, 0.6)))) if residential else 0
+    bathrooms = max(1, min(5, round(bedrooms / 2 + rng.gauss(0.3, 0.4)))) if residential else (1 if property_type in ("COMMERCIAL", "OFFICE") else 0)
+    price = round(area * price_m2 * type_factor * math.exp(rng.gauss(0, 0.18)), -3)
+
+    # Distribución normal alrededor del centro del barrio, dentro de la ciudad
+    latitude = round(_clamp(rng.gauss(lat, radius / 2), CITY_BOUNDS["lat"]), 6)
+    longitude = round(_clamp(rng.gauss(lng, radius / 2), CITY_BOUNDS["lng"]), 6)
+
+    created_at = now - timedelta(days=rng.expovariate(1 / 180), minutes=rng.randint(0, 1440))
+    property_id = _uuid(rng)
+    title = f"{TYPE_LABELS[property_type]} {rng.choice(ADJECTIVES)} en {barrio}"
+
+    property = {
+        "id": property_id,
+        "title": title,
+        "slug": f"{_slugify(title)}-{index}",
+        "description": " ".join(rng.sample(PARAGRAPHS, 3)),
+        "price": max(price, 1000.0),
+        "location": barrio,
+        "address": f"{rng.choice(STREETS[barrio])}, {rng.randint(1, 120)}",
+        "zipCode": zip_code,
+        "latitude": latitude,
+        "longitude": longitude,
+        "bedrooms": bedrooms,
+        "bathrooms": bathrooms,
+        "area": area,
+        "yearBuilt": int(_clamp(round(rng.gauss(1978, 22)), (1900, now.year))),
+        "energyRating": _weighted(rng, ENERGY_RATINGS),
+        "propertyType": property_type,
+        "status": _weighted(rng, STATUSES),
+        "featured": rng.random() < 0.03,
+        "userId": user_id,
+        "createdAt": created_at,
+        "updatedAt": created_at + timedelta(days=rng.uniform(0, 30)),
+    }
+    images = [
+        {
+            "url": f"https://res.cloudinary.com/demo/image/upload/inmobiliaria/properties/{property_id}-{j}.jpg",
+            "publicId": f"inmobiliaria/properties/{property_id}-{j}",
+            "propertyId": property_id,
+            "main": j == 0,
+        }
+        for j in range(images_per_property)
+    ]
+    features = []
+    for name, probability in FEATURES.items():
+        if rng.random() < probability:
+            # Enlazadas con el diccionario, como las que se añaden desde la API
+            key = amenities.match(name)
+            if key:
+                features.append({
+                    "name": amenities.display_name(name, key),
+                    "propertyId": property_id,
+                    "amenityId": key
+                })
+            else:
+                features.append({"name": name, "propertyId": property_id})
+    return property, images, features
+
+
+def generate_post(rng, index, user_id, now):
+    barrio = rng.choice(list(NEIGHBOURHOODS))
+    title = rng.choice(POST_TOPICS).format(barrio=barrio)
+    created_at = now - timedelta(days=rng.uniform(0, 730))
+    content = "\n\n".join(rng.choice(PARAGRAPHS) for _ in range(rng.randint(4, 10)))
+    return {
+        "id": _uuid(rng),
+        "title": title,
+        "slug": f"{_slugify(title)}-{index}",
+        "content": content,
+        "excerpt": content[:160],
+        "published": rng.random() < 0.85,
+        "userId": user_id,
+        "createdAt": created_at,
+        "updatedAt": created_at,
+    }
+
+
+async def _insert_property_batch(db, semaphore, batch):
+    try:
+        properties, images, features = batch
+        await db.property.create_many(data=properties)
+        if images:
+            await db.image.create_many(data=images)
+        if features:
+            await db.feature.create_many(data=features)
+    finally:
+        semaphore.release()
+
+
+async def generate_catalog(
+    db,
+    user_id,
+    properties=0,
+    posts=0,
+    images_per_property=5,
+    seed=42,
+    batch_size=1000,
+    concurrency=4
+):
+    """
+    Inserta un catálogo sintético con `create_many` en lotes concurrentes.
+    Los datos se generan en orden con un único `random.Random(seed)` y solo
+    la inserción es concurrente, así que el resultado es determinista.
+    """
+    # Las características enlazadas necesitan las filas de `amenities`
+    await amenities.seed_dictionary(db)
+
+    rng = random.Random(seed)
+    # Fecha de referencia fija para que las fechas también sean reproducibles
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = []
+
+    for start in range(0, properties, batch_size):
+        batch = ([], [], [])
+        for index in range(start, min(start + batch_size, properties)):
+            property, images, features = generate_property(rng, index, user_id, now, images_per_property)
+            batch[0].append(property)
+            batch[1].extend(images)
+            batch[2].extend(features)
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(_insert_property_batch(db, semaphore, batch)))
+        print(f"Propiedades generadas: {min(start + batch_size, properties)}/{properties}")
+    await asyncio.gather(*tasks)
+
+    if posts:
+        categories = await db.category.find_many()
+        for start in range(0, posts, batch_size):
+            batch = [generate_post(rng, index, user_id, now) for index in range(start, min(start + batch_size, posts))]
+            await db.post.create_many(data=batch)
+            if categories:
+                await db.categoryonpost.create_many(
+                    data=[
+                        {"postId": post["id"], "categoryId": category.id}
+                        for post in batch
+                        for category in rng.sample(categories, rng.randint(1, min(2, len(categories))))
+                    ]
+                )
+            print(f"Posts generados: {min(start + batch_size, posts)}/{posts}")
+
+async def main(args):
     # Conectar a la base de datos
     db = Prisma()
     await db.connect()
@@ -44,15 +343,7 @@ async def main():
         
         if categories_count == 0:
             # Crear categorías iniciales
-            categories = [
-                {"name": "Noticias", "slug": "noticias"},
-                {"name": "Consejos", "slug": "consejos"},
-                {"name": "Mercado inmobiliario", "slug": "mercado-inmobiliario"},
-                {"name": "Reformas", "slug": "reformas"},
-                {"name": "Decoración", "slug": "decoracion"}
-            ]
-            
-            for cat in categories:
+            for cat in DEFAULT_CATEGORIES:
                 category = await db.category.create(
                     data={
                         "name": cat["name"],
@@ -63,11 +354,35 @@ async def main():
         else:
             print(f"Ya existen {categories_count} categorías en la base de datos.")
         
+        # Datos sintéticos para pruebas de rendimiento
+        if args.properties or args.posts:
+            await generate_catalog(
+                db,
+                admin.id,
+                properties=args.properties,
+                posts=args.posts,
+                images_per_property=args.images_per_property,
+                seed=args.seed,
+                batch_size=args.batch_size,
+                concurrency=args.concurrency
+            )
+        
         print("Seed completado con éxito.")
     except Exception as e:
         print(f"Error durante el seed: {str(e)}")
     finally:
         await db.disconnect()
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Datos iniciales y catálogo sintético")
+    parser.add_argument("--properties", type=int, default=0, help="Número de propiedades sintéticas")
+    parser.add_argument("--posts", type=int, default=0, help="Número de posts sintéticos")
+    parser.add_argument("--images-per-property", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del generador")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4, help="Lotes insertados en paralelo")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
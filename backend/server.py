@@ -1,29 +1,72 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form, Body
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, RedirectResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from datetime import datetime, timedelta
-from passlib.context import CryptContext
+from datetime import date, datetime, timedelta
 from typing import List, Optional, Dict, Any
 from prisma import Prisma
 from prisma.models import User, Property, Image, Feature, Post, Category
 from pydantic import BaseModel, EmailStr, Field, validator
 import os
-import cloudinary
-import cloudinary.uploader
+import re
+import tempfile
+import unicodedata
 import uuid
+import asyncio
+import logging
+import time
+from functools import lru_cache
 from dotenv import load_dotenv
 
+import fast_json
+import metrics
+import profiling
+import query_tracking
+from query_stats import QueryStats
+import amenities
+from cache import TTLCache
+import catalog
+from catalog_reader import CatalogReader
+from clusters import ClusterPyramid
+from db_client import InstrumentedPrisma, add_query_listener
+from db_routing import Replica, ReplicaRouter
+from invalidation import InvalidationBus
+from jobs import JobQueue, job_handler, periodic_job
+from locations import LocationIndex
+from saved_searches import SearchIndex, record_matches
+from similarity import SimilarityIndex
+from slugs import SlugIndex, record_rename
+from snapshots import (
+    backfill_property_snapshots,
+    fetch_property_snapshot,
+    fetch_property_snapshots,
+    missing_snapshot_ids,
+    rebuild_property_snapshot,
+    render_property_documents
+)
+import stats
+from views import ViewBuffer, rollup_popularity
+
 # Cargar variables de entorno
 load_dotenv()
 
-# Configurar Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
-)
+logger = logging.getLogger("server")
+
+# Cloudinary se importa y configura la primera vez que se usa (arranque más rápido)
+@lru_cache(maxsize=None)
+def get_cloudinary():
+    import cloudinary
+    import cloudinary.api
+    import cloudinary.uploader
+    
+    cloudinary.config(
+        cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+        api_key=os.getenv("CLOUDINARY_API_KEY"),
+        api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+        secure=True
+    )
+    return cloudinary
 
 # Inicializar FastAPI
 app = FastAPI(title="API de InmobiliariaZaragoza")
@@ -37,8 +80,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas de Prometheus (siempre activas salvo que se desactiven)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    add_query_listener(metrics.observe_query)
+
+# Número de consultas y tiempo de BD por petición en cabeceras (solo desarrollo)
+QUERY_DEBUG = os.getenv("QUERY_DEBUG", "false").lower() == "true"
+add_query_listener(query_tracking.track_query)
+
+# Registro de consultas lentas y estadísticas por huella (/api/db/query-stats)
+query_stats = QueryStats(
+    slow_threshold=float(os.getenv("SLOW_QUERY_MS", "200")) / 1000,
+    window=int(os.getenv("QUERY_STATS_WINDOW", "1000"))
+)
+add_query_listener(query_stats.observe)
+
+if QUERY_DEBUG:
+    app.add_middleware(
+        query_tracking.QueryTrackingMiddleware,
+        n_plus_one_threshold=int(os.getenv("N_PLUS_ONE_THRESHOLD", "3"))
+    )
+
 # Configuración de autenticación
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib/bcrypt también se cargan en el primer login o alta de usuario
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/token")
 
 # Variables de JWT
@@ -46,8 +120,141 @@ JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
 JWT_EXPIRATION_TIME = int(os.getenv("JWT_EXPIRATION_TIME", "3600"))
 
+
+def is_admin_token(headers):
+    """
+    True si la cabecera Authorization lleva un token válido de administrador
+    """
+    authorization = headers.get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return False
+    try:
+        payload = jwt.decode(authorization[7:], JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        return False
+    return payload.get("role") == "ADMIN"
+
+
+# Perfilado de peticiones con la cabecera X-Profile: 1 (solo administradores)
+profile_store = profiling.ProfileStore(
+    directory=os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "inmobiliaria-profiles")),
+    ring_size=int(os.getenv("PROFILE_RING_SIZE", "50"))
+)
+app.add_middleware(
+    profiling.ProfilingMiddleware,
+    store=profile_store,
+    authorize=is_admin_token,
+    interval=float(os.getenv("PROFILE_INTERVAL", "0.001"))
+)
+
+# Respuestas JSON rápidas (orjson) para los listados públicos, sin revalidar con Pydantic
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+
 # Cliente Prisma
-db = Prisma()
+def new_client(url: Optional[str] = None) -> Prisma:
+    if url:
+        return InstrumentedPrisma(datasource={"url": url})
+    return InstrumentedPrisma()
+
+
+db = new_client()
+
+# Réplicas de lectura (opcional): lista separada por comas
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+replica_router = ReplicaRouter(
+    primary=db,
+    replicas=[Replica(url, new_client(url)) for url in DATABASE_REPLICA_URLS],
+    pin_seconds=float(os.getenv("REPLICA_PIN_SECONDS", "10")),
+    health_interval=float(os.getenv("REPLICA_HEALTH_INTERVAL", "5")),
+    max_lag_seconds=float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+)
+
+# Lecturas públicas del catálogo con asyncpg (opcional, Prisma sigue para las escrituras)
+ASYNCPG_READS = os.getenv("ASYNCPG_READS", "false").lower() == "true"
+catalog_reader = CatalogReader(
+    dsn=os.getenv("CATALOG_READ_DATABASE_URL", os.getenv("DATABASE_URL")),
+    min_size=int(os.getenv("ASYNCPG_POOL_MIN_SIZE", "1")),
+    max_size=int(os.getenv("ASYNCPG_POOL_MAX_SIZE", "10")),
+    statement_cache_size=int(os.getenv("ASYNCPG_STATEMENT_CACHE_SIZE", "100")),
+    command_timeout=float(os.getenv("ASYNCPG_COMMAND_TIMEOUT", "5")),
+    connect_timeout=float(os.getenv("ASYNCPG_CONNECT_TIMEOUT", "10"))
+)
+
+# Invalidación de cachés entre workers con LISTEN/NOTIFY (requiere conexión directa, sin PgBouncer)
+invalidation_bus = InvalidationBus(
+    dsn=os.getenv("CACHE_INVALIDATION_DATABASE_URL", os.getenv("DATABASE_URL")),
+    channel=os.getenv("CACHE_INVALIDATION_CHANNEL", "cache_invalidation")
+)
+
+# Caché del detalle de propiedades (JSON ya serializado)
+property_cache = TTLCache(
+    "property",
+    maxsize=int(os.getenv("PROPERTY_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("PROPERTY_CACHE_TTL", "300"))
+)
+invalidation_bus.subscribe("property", property_cache.invalidate)
+
+# Máximo de ids por petición en /api/properties/batch (favoritos y comparador)
+PROPERTY_BATCH_MAX = int(os.getenv("PROPERTY_BATCH_MAX", "50"))
+
+# Índice k-NN de propiedades similares, actualizado con cada escritura
+similar_index = SimilarityIndex(
+    db,
+    max_tags=int(os.getenv("SIMILAR_INDEX_MAX_TAGS", "32")),
+    reload_interval=float(os.getenv("SIMILAR_INDEX_RELOAD_INTERVAL", "900")),
+    refit_fraction=float(os.getenv("SIMILAR_INDEX_REFIT_FRACTION", "0.1"))
+)
+invalidation_bus.subscribe("property", similar_index.refresh)
+
+# Catálogo activo en columnas NumPy: filtra, ordena y pagina el listado público
+# (status=ACTIVE) en memoria y alimenta el histograma de precios. Se actualiza con
+# cada escritura y se recarga entero cada CATALOG_RELOAD_INTERVAL segundos.
+CATALOG_ENGINE = os.getenv("CATALOG_ENGINE", "true").lower() == "true"
+property_catalog = catalog.Catalog(db, reload_interval=float(os.getenv("CATALOG_RELOAD_INTERVAL", "900")))
+invalidation_bus.subscribe("property", property_catalog.refresh)
+
+# Clusters del mapa por nivel de zoom (desde CLUSTER_POINTS_ZOOM, puntos sueltos),
+# construidos a partir de las columnas del catálogo, sin consultas propias
+map_clusters = property_catalog.listen(
+    ClusterPyramid(property_catalog, points_zoom=int(os.getenv("CLUSTER_POINTS_ZOOM", "15")))
+)
+
+# Sugerencias de ubicación para el buscador, actualizadas con cada escritura
+location_index = LocationIndex(db)
+invalidation_bus.subscribe("property", location_index.refresh)
+
+# Índice invertido de búsquedas guardadas para emparejar anuncios nuevos o modificados
+search_index = SearchIndex(db)
+invalidation_bus.subscribe("saved-search", search_index.refresh)
+invalidation_bus.subscribe("pin", replica_router.pin)
+
+# Visitas: se acumulan en memoria y se vuelcan en bloque cada VIEW_FLUSH_INTERVAL segundos
+view_buffer = ViewBuffer(db, flush_interval=float(os.getenv("VIEW_FLUSH_INTERVAL", "10")))
+POPULARITY_WINDOW_DAYS = int(os.getenv("POPULARITY_WINDOW_DAYS", "7"))
+POPULARITY_ROLLUP_INTERVAL = float(os.getenv("POPULARITY_ROLLUP_INTERVAL", "600"))
+
+# Agregados diarios para /api/stats/timeseries
+STATS_ROLLUP_INTERVAL = float(os.getenv("STATS_ROLLUP_INTERVAL", "3600"))
+
+# Índices slug → id de las URLs públicas, uno por worker
+property_slugs = SlugIndex("property", db)
+post_slugs = SlugIndex("post", db)
+invalidation_bus.subscribe("property-slug", property_slugs.apply)
+invalidation_bus.subscribe("post-slug", post_slugs.apply)
+
+# Cola de trabajos en segundo plano (tabla jobs). JOB_WORKERS=0 desactiva los
+# workers dentro del proceso web (p. ej. si se lanza aparte `python server.py --jobs`)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+job_queue = JobQueue(
+    db,
+    poll_interval=float(os.getenv("JOB_POLL_INTERVAL", "1")),
+    backoff_base=float(os.getenv("JOB_BACKOFF_BASE", "5")),
+    lock_timeout=float(os.getenv("JOB_LOCK_TIMEOUT", "300")),
+    job_timeout=float(os.getenv("JOB_TIMEOUT", "120")),
+    retention_days=int(os.getenv("JOB_RETENTION_DAYS", "7"))
+)
 
 
 # --- Modelos Pydantic ---
@@ -121,6 +328,11 @@ class FeatureResponse(BaseModel):
     name: str
 
 
+class AmenityResponse(BaseModel):
+    key: str
+    name: str
+
+
 class PropertyResponse(PropertyBase):
     id: str
     slug: str
@@ -131,6 +343,17 @@ class PropertyResponse(PropertyBase):
     features: List[FeatureResponse]
 
 
+class PropertyBatchResponse(BaseModel):
+    properties: List[PropertyResponse]
+    missing: List[str]
+
+
+class LocationSuggestion(BaseModel):
+    text: str
+    type: str
+    count: int
+
+
 class PropertyPatch(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -182,6 +405,58 @@ class PostUpdate(BaseModel):
     categoryIds: Optional[List[str]] = None
 
 
+class SavedSearchBase(BaseModel):
+    name: str
+    email: Optional[EmailStr] = None
+    status: Optional[str] = None
+    minPrice: Optional[float] = None
+    maxPrice: Optional[float] = None
+    bedrooms: Optional[int] = None
+    propertyType: Optional[str] = None
+    location: Optional[str] = None
+    featured: Optional[bool] = None
+    active: bool = True
+
+
+class SavedSearchCreate(SavedSearchBase):
+    pass
+
+
+class SavedSearchResponse(SavedSearchBase):
+    id: str
+    userId: str
+    createdAt: datetime
+    updatedAt: datetime
+
+
+class SavedSearchUpdate(BaseModel):
+    name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    status: Optional[str] = None
+    minPrice: Optional[float] = None
+    maxPrice: Optional[float] = None
+    bedrooms: Optional[int] = None
+    propertyType: Optional[str] = None
+    location: Optional[str] = None
+    featured: Optional[bool] = None
+    active: Optional[bool] = None
+
+
+class SearchMatchResponse(BaseModel):
+    id: str
+    propertyId: str
+    reason: str
+    createdAt: datetime
+    deliveredAt: Optional[datetime] = None
+
+
+class PopularItem(BaseModel):
+    id: str
+    title: str
+    slug: str
+    views: int
+
+
 class DashboardStats(BaseModel):
     activeProperties: int
     totalProperties: int
@@ -193,16 +468,18 @@ class DashboardStats(BaseModel):
     draftPosts: int
     totalUsers: int
     totalCategories: int
+    mostViewedProperties: List[PopularItem] = []
+    mostViewedPosts: List[PopularItem] = []
 
 
 # --- Funciones de autenticación ---
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 async def get_user(email: str):
@@ -255,33 +532,210 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
     return current_user
 
 
+def token_subject(request: Request) -> Optional[str]:
+    """
+    Email del token Bearer de la petición, si lo hay y es válido
+    """
+    authorization = request.headers.get("authorization")
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization[7:], JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+
+def get_read_db(request: Request) -> Prisma:
+    # Los usuarios que acaban de escribir leen del primario
+    return replica_router.for_read(token_subject(request))
+
+
 # --- Helpers ---
 
+SLUG_INVALID_CHARS = re.compile(r'[^\w\s-]')
+SLUG_SEPARATORS = re.compile(r'[-\s]+')
+
+
 def slugify(text):
     """
     Función simple para crear un slug a partir de un texto
     """
-    import re
-    import unicodedata
-
     text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
-    text = re.sub(r'[^\w\s-]', '', text.lower())
-    text = re.sub(r'[-\s]+', '-', text).strip('-_')
+    text = SLUG_INVALID_CHARS.sub('', text.lower())
+    text = SLUG_SEPARATORS.sub('-', text).strip('-_')
     return text
 
 
+async def resolve_slug(index, slug):
+    """
+    Resuelve un slug con el índice en memoria; mientras se carga, con la base de datos
+    """
+    if index.loaded:
+        return index.resolve(slug)
+    
+    model = db.property if index.kind == "property" else db.post
+    entity = await model.find_unique(where={"slug": slug})
+    if entity:
+        return entity.id, None
+    
+    redirect = await db.slugredirect.find_unique(
+        where={"kind_slug": {"kind": index.kind, "slug": slug}}
+    )
+    if redirect:
+        entity = await model.find_unique(where={"id": redirect.targetId})
+        if entity:
+            return entity.id, entity.slug
+    
+    return None, None
+
+
+# El SDK de Cloudinary es bloqueante: se ejecuta en un hilo, pero la duración se
+# mide aquí, en el bucle de eventos, porque el registro de métricas no usa locks
+async def cloudinary_upload(content, **options):
+    with metrics.EXTERNAL_CALL_DURATION.labels("cloudinary", "upload").time():
+        return await asyncio.to_thread(get_cloudinary().uploader.upload, content, **options)
+
+
+async def cloudinary_destroy(public_id):
+    with metrics.EXTERNAL_CALL_DURATION.labels("cloudinary", "destroy").time():
+        return await asyncio.to_thread(get_cloudinary().uploader.destroy, public_id)
+
+
+# --- Trabajos en segundo plano ---
+
+@job_handler("cloudinary.destroy")
+async def destroy_image_job(payload):
+    result = await cloudinary_destroy(payload["publicId"])
+    if result.get("result") not in ("ok", "not found"):
+        raise RuntimeError(f"Cloudinary no eliminó {payload['publicId']}: {result}")
+
+
+@periodic_job("views.rollup", POPULARITY_ROLLUP_INTERVAL)
+async def rollup_popularity_job(payload):
+    await rollup_popularity(db, days=POPULARITY_WINDOW_DAYS)
+
+
+@periodic_job("stats.rollup", STATS_ROLLUP_INTERVAL)
+async def rollup_daily_stats_job(payload):
+    await stats.rollup_daily_stats(db, days=payload.get("days", 2))
+
+
+async def sync_amenity_dictionary():
+    """
+    Siembra el diccionario de características y enlaza las antiguas de texto libre
+    """
+    changed = await amenities.sync_amenities(db)
+    for property_id in changed:
+        await rebuild_property_snapshot(db, property_id)
+        await invalidation_bus.publish("property", property_id)
+    if changed:
+        logger.info("Características enlazadas al diccionario en %d propiedades", len(changed))
+
+
+# Migración de datos: se ejecuta una sola vez en la cola (o con --sync-amenities), nunca en cada worker
+@job_handler("amenities.sync")
+async def sync_amenities_job(payload):
+    await sync_amenity_dictionary()
+
+
+async def schedule_amenity_sync():
+    try:
+        if await amenities.needs_sync(db):
+            await job_queue.ensure_scheduled("amenities.sync")
+    except Exception:
+        logger.exception("No se pudo comprobar el diccionario de características")
+
+
+@job_handler("snapshots.backfill")
+async def backfill_snapshots_job(payload):
+    created = await backfill_property_snapshots(db)
+    if created:
+        logger.info("Snapshots generados para %d propiedades", created)
+
+
+async def schedule_snapshot_backfill():
+    try:
+        if await missing_snapshot_ids(db, limit=1):
+            await job_queue.ensure_scheduled("snapshots.backfill")
+    except Exception:
+        logger.exception("No se pudo comprobar si faltan snapshots de propiedades")
+
+
 # --- Eventos de Inicialización y Cierre ---
 
+background_tasks = []
+
+
+# Funciones async que precargan cachés al arrancar; /api/health/ready espera a que terminen
+cache_warmers = [
+    property_slugs.reload,
+    post_slugs.reload,
+    similar_index.reload,
+    search_index.reload,
+    location_index.reload,
+    property_catalog.reload
+]
+readiness = {
+    "caches_warmed": False,
+    "storage_ok": False,
+    "storage_checked_at": 0.0
+}
+
+
+async def warm_caches():
+    for warmer in cache_warmers:
+        try:
+            await warmer()
+        except Exception:
+            logger.exception("Error al precargar la caché %s", warmer.__name__)
+    readiness["caches_warmed"] = True
+
+
 @app.on_event("startup")
 async def startup():
     await db.connect()
+    await replica_router.connect()
+    if ASYNCPG_READS:
+        await catalog_reader.connect()
+    await invalidation_bus.start()
+    if METRICS_ENABLED:
+        background_tasks.append(asyncio.create_task(metrics.monitor_event_loop()))
+    background_tasks.append(asyncio.create_task(warm_caches()))
+    background_tasks.append(asyncio.create_task(schedule_amenity_sync()))
+    background_tasks.append(asyncio.create_task(schedule_snapshot_backfill()))
+    view_buffer.start()
+    property_catalog.start()
+    similar_index.start()
+    job_queue.start(JOB_WORKERS)
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    await job_queue.stop()
+    await property_catalog.stop()
+    await similar_index.stop()
+    await view_buffer.stop()
+    await invalidation_bus.stop()
+    await catalog_reader.close()
+    await replica_router.disconnect()
     await db.disconnect()
 
 
+@app.middleware("http")
+async def pin_writers_to_primary(request: Request, call_next):
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400 and replica_router.replicas:
+        subject = token_subject(request)
+        if subject:
+            # El resto de workers también fijan al usuario al primario
+            await invalidation_bus.publish("pin", subject)
+    return response
+
+
 # --- Rutas ---
 
 @app.get("/api/")
@@ -289,6 +743,66 @@ async def read_root():
     return {"message": "Bienvenido a la API de InmobiliariaZaragoza"}
 
 
+# --- Rutas de salud ---
+
+STORAGE_CHECK_TTL = float(os.getenv("STORAGE_CHECK_TTL", "30"))
+
+
+async def check_storage():
+    # Cloudinary sin configurar (desarrollo): no bloquea la disponibilidad
+    if not os.getenv("CLOUDINARY_CLOUD_NAME"):
+        return "disabled"
+    
+    # El ping se cachea unos segundos para no llamar a Cloudinary en cada sondeo
+    now = time.monotonic()
+    if now - readiness["storage_checked_at"] > STORAGE_CHECK_TTL:
+        try:
+            with metrics.EXTERNAL_CALL_DURATION.labels("cloudinary", "ping").time():
+                await asyncio.to_thread(get_cloudinary().api.ping)
+            readiness["storage_ok"] = True
+        except Exception as e:
+            logger.warning("Cloudinary no responde: %s", e)
+            readiness["storage_ok"] = False
+        readiness["storage_checked_at"] = now
+    
+    return "ok" if readiness["storage_ok"] else "error"
+
+
+@app.get("/api/health/live")
+async def health_live():
+    return {"status": "ok"}
+
+
+@app.get("/api/health/ready")
+async def health_ready():
+    checks = {}
+    
+    try:
+        await db.query_raw("SELECT 1")
+        checks["database"] = "ok"
+    except Exception as e:
+        logger.warning("La base de datos no responde: %s", e)
+        checks["database"] = "error"
+    
+    checks["storage"] = await check_storage()
+    checks["caches"] = "ok" if readiness["caches_warmed"] else "warming"
+    
+    ready = all(value in ("ok", "disabled") for value in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "checks": checks}
+    )
+
+
+@app.get("/api/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Métricas desactivadas")
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Credenciales inválidas")
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.post("/api/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     user = await authenticate_user(form_data.username, form_data.password)
@@ -430,9 +944,55 @@ async def get_properties(
     property_type: Optional[str] = None,
     location: Optional[str] = None,
     featured: Optional[bool] = None,
+    features: Optional[str] = None,
+    sort: Optional[str] = None,
     skip: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    read_db: Prisma = Depends(get_read_db)
 ):
+    if sort not in (None, "popular"):
+        raise HTTPException(status_code=400, detail="Orden no válido")
+    
+    # features=pool,garage: claves del diccionario de características (todas a la vez)
+    amenity_keys = parse_amenity_keys(features)
+    
+    if CATALOG_ENGINE and status == "ACTIVE" and property_catalog.loaded:
+        # Filtro, orden y paginación en memoria; solo se leen los documentos de la página
+        mask = property_catalog.mask(
+            min_price=min_price,
+            max_price=max_price,
+            bedrooms=bedrooms,
+            property_type=property_type,
+            location=location,
+            featured=featured,
+            features=amenity_keys
+        )
+        property_ids = property_catalog.page(mask, sort=sort, skip=max(skip, 0), limit=limit)
+        bodies = await load_property_documents(property_ids, read_db)
+        return fast_json.RawJSONResponse(b"".join((
+            b"[",
+            b",".join(bodies[property_id] for property_id in property_ids if property_id in bodies),
+            b"]"
+        )))
+    
+    if catalog_reader.connected:
+        properties = await catalog_reader.fetch_properties(
+            status=status,
+            min_price=min_price,
+            max_price=max_price,
+            bedrooms=bedrooms,
+            property_type=property_type,
+            location=location,
+            featured=featured,
+            features=amenity_keys,
+            sort=sort,
+            skip=skip,
+            limit=limit
+        )
+        if FAST_JSON_RESPONSES:
+            return fast_json.FastJSONResponse(properties)
+        return properties
+    
     where = {}
     
     if status:
@@ -459,33 +1019,219 @@ async def get_properties(
     if featured is not None:
         where["featured"] = featured
     
-    properties = await db.property.find_many(
+    if amenity_keys:
+        where["AND"] = [{"features": {"some": {"amenityId": key}}} for key in amenity_keys]
+    
+    # Más recientes primero; sort=popular: visitas de los últimos días (columna popularity).
+    # Mismo orden que el catálogo en memoria, para que la página no dependa de si ya cargó
+    order = [{"createdAt": "desc"}, {"id": "asc"}]
+    if sort == "popular":
+        order.insert(0, {"popularity": "desc"})
+    
+    properties = await read_db.property.find_many(
         where=where,
         include={
             "images": True,
             "features": True
         },
+        order=order,
         skip=skip,
         take=limit
     )
     
+    if FAST_JSON_RESPONSES:
+        return fast_json.properties_response(properties)
+    
     return properties
 
 
-@app.get("/api/properties/{property_id}", response_model=PropertyResponse)
-async def get_property(property_id: str):
-    property = await db.property.find_unique(
-        where={"id": property_id},
-        include={
-            "images": True,
-            "features": True
-        }
+def parse_amenity_keys(features):
+    if not features:
+        return []
+    try:
+        return amenities.parse(features)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Característica no válida: {e}")
+
+
+async def load_property_documents(property_ids, read_db):
+    """
+    Documentos de detalle de varias propiedades: primero la caché compartida con
+    el detalle, después una sola consulta a los snapshots y otra para generar
+    en memoria los que falten
+    """
+    bodies = {}
+    # Si llega una invalidación mientras se lee, no se cachea lo leído
+    generation = property_cache.generation()
+    for property_id in property_ids:
+        body = property_cache.get(property_id)
+        if body is not None:
+            bodies[property_id] = body
+    
+    pending = [property_id for property_id in property_ids if property_id not in bodies]
+    if pending:
+        ttl = None
+        if catalog_reader.connected:
+            found = await catalog_reader.fetch_property_snapshots(pending)
+        else:
+            found = await fetch_property_snapshots(read_db, pending)
+            if read_db is not db:
+                ttl = replica_router.max_lag_seconds
+        
+        # Sin snapshot todavía (o inexistentes): se generan en memoria, sin escribir
+        unrendered = [property_id for property_id in pending if property_id not in found]
+        if unrendered:
+            found.update(await render_property_documents(read_db, unrendered))
+        
+        for property_id in pending:
+            body = found.get(property_id)
+            if body is None:
+                continue
+            property_cache.set(property_id, body, ttl=ttl, generation=generation)
+            bodies[property_id] = body
+    
+    return bodies
+
+
+@app.get("/api/properties/price-histogram")
+async def get_price_histogram(
+    bedrooms: Optional[int] = None,
+    property_type: Optional[str] = None,
+    location: Optional[str] = None,
+    featured: Optional[bool] = None,
+    features: Optional[str] = None,
+    bins: int = 20
+):
+    if not property_catalog.loaded:
+        raise HTTPException(status_code=503, detail="El catálogo se está cargando")
+    
+    # Mismos filtros que el listado salvo el precio (propiedades activas)
+    mask = property_catalog.mask(
+        bedrooms=bedrooms,
+        property_type=property_type,
+        location=location,
+        featured=featured,
+        features=parse_amenity_keys(features)
     )
+    bins = max(5, min(bins, 50))
+    price = property_catalog.price[mask]
+    area = property_catalog.area[mask]
     
-    if not property:
+    return {
+        "count": int(mask.sum()),
+        "price": catalog.histogram(price, bins),
+        "pricePerM2": catalog.histogram(price[area > 0] / area[area > 0], bins)
+    }
+
+
+@app.get("/api/properties/clusters")
+async def get_property_clusters(bbox: str, zoom: int):
+    # bbox=minLng,minLat,maxLng,maxLat
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox no válido")
+    
+    if min_lng > max_lng or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox no válido")
+    
+    if not map_clusters.loaded:
+        raise HTTPException(status_code=503, detail="Los clusters del mapa se están cargando")
+    
+    return fast_json.FastJSONResponse(map_clusters.query((min_lng, min_lat, max_lng, max_lat), zoom))
+
+
+@app.get("/api/properties/batch", response_model=PropertyBatchResponse)
+async def get_properties_batch(ids: str, read_db: Prisma = Depends(get_read_db)):
+    # Ids separados por comas, sin duplicados y en el orden pedido
+    property_ids = list(dict.fromkeys(value.strip() for value in ids.split(",") if value.strip()))
+    
+    if len(property_ids) > PROPERTY_BATCH_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No se pueden pedir más de {PROPERTY_BATCH_MAX} propiedades a la vez"
+        )
+    
+    bodies = await load_property_documents(property_ids, read_db)
+    
+    missing = [property_id for property_id in property_ids if property_id not in bodies]
+    
+    # Los documentos ya serializados se concatenan sin volver a parsearlos
+    content = b"".join((
+        b'{"properties":[',
+        b",".join(bodies[property_id] for property_id in property_ids if property_id in bodies),
+        b'],"missing":',
+        fast_json.dumps(missing),
+        b"}"
+    ))
+    return fast_json.RawJSONResponse(content)
+
+
+@app.get("/api/properties/by-slug/{slug}", response_model=PropertyResponse)
+async def get_property_by_slug(slug: str, read_db: Prisma = Depends(get_read_db)):
+    property_id, current_slug = await resolve_slug(property_slugs, slug)
+    
+    if not property_id:
         raise HTTPException(status_code=404, detail="Propiedad no encontrada")
     
-    return property
+    if current_slug:
+        return RedirectResponse(url=f"/api/properties/by-slug/{current_slug}", status_code=301)
+    
+    return await get_property(property_id, read_db)
+
+
+@app.get("/api/properties/{property_id}", response_model=PropertyResponse)
+async def get_property(property_id: str, read_db: Prisma = Depends(get_read_db)):
+    generation = property_cache.generation()
+    body = property_cache.get(property_id)
+    if body is not None:
+        view_buffer.record("property", property_id)
+        return fast_json.RawJSONResponse(body)
+    
+    # Documento ya renderizado: una lectura por clave primaria.
+    # Lo leído de una réplica solo se cachea el tiempo de retraso tolerado
+    ttl = None
+    if catalog_reader.connected:
+        body = await catalog_reader.fetch_property_snapshot(property_id)
+    else:
+        body = await fetch_property_snapshot(read_db, property_id)
+        if read_db is not db:
+            ttl = replica_router.max_lag_seconds
+    
+    # Propiedades anteriores a los snapshots: se generan en memoria hasta que
+    # el trabajo `snapshots.backfill` los guarde (una lectura no escribe)
+    if body is None:
+        body = (await render_property_documents(read_db, [property_id])).get(property_id)
+    
+    if body is None:
+        raise HTTPException(status_code=404, detail="Propiedad no encontrada")
+    
+    view_buffer.record("property", property_id)
+    # Si se invalidó mientras se leía, el documento puede ser anterior a la escritura
+    property_cache.set(property_id, body, ttl=ttl, generation=generation)
+    return fast_json.RawJSONResponse(body)
+
+
+@app.get("/api/properties/{property_id}/similar", response_model=List[PropertyResponse])
+async def get_similar_properties(property_id: str, limit: int = 6, read_db: Prisma = Depends(get_read_db)):
+    if not similar_index.loaded:
+        raise HTTPException(status_code=503, detail="El índice de propiedades similares se está cargando")
+    
+    limit = max(1, min(limit, 24))
+    
+    # Las propiedades no activas no están en el índice, pero se pueden comparar
+    vector = similar_index.vector(property_id)
+    if vector is None:
+        rows = await similar_index.fetch_rows([property_id])
+        if not rows:
+            raise HTTPException(status_code=404, detail="Propiedad no encontrada")
+        vector = similar_index.encode(rows[0])
+    
+    similar_ids = similar_index.nearest(vector, k=limit, exclude=property_id)
+    bodies = await load_property_documents(similar_ids, read_db)
+    
+    content = b"[" + b",".join(bodies[similar_id] for similar_id in similar_ids if similar_id in bodies) + b"]"
+    return fast_json.RawJSONResponse(content)
 
 
 @app.post("/api/properties", response_model=PropertyResponse)
@@ -502,34 +1248,49 @@ async def create_property(property_data: PropertyCreate, current_user: User = De
         existing_property = await db.property.find_unique(where={"slug": slug})
         counter += 1
     
-    # Crear la propiedad
-    property = await db.property.create(
-        data={
-            "title": property_data.title,
-            "slug": slug,
-            "description": property_data.description,
-            "price": property_data.price,
-            "location": property_data.location,
-            "address": property_data.address,
-            "zipCode": property_data.zipCode,
-            "city": property_data.city,
-            "province": property_data.province,
-            "latitude": property_data.latitude,
-            "longitude": property_data.longitude,
-            "bedrooms": property_data.bedrooms,
-            "bathrooms": property_data.bathrooms,
-            "area": property_data.area,
-            "yearBuilt": property_data.yearBuilt,
-            "energyRating": property_data.energyRating,
-            "propertyType": property_data.propertyType,
-            "featured": property_data.featured,
-            "userId": current_user.id
-        },
-        include={
-            "images": True,
-            "features": True
-        }
-    )
+    # Crear la propiedad y su documento de detalle en la misma transacción
+    async with db.tx() as tx:
+        property = await tx.property.create(
+            data={
+                "title": property_data.title,
+                "slug": slug,
+                "description": property_data.description,
+                "price": property_data.price,
+                "location": property_data.location,
+                "address": property_data.address,
+                "zipCode": property_data.zipCode,
+                "city": property_data.city,
+                "province": property_data.province,
+                "latitude": property_data.latitude,
+                "longitude": property_data.longitude,
+                "bedrooms": property_data.bedrooms,
+                "bathrooms": property_data.bathrooms,
+                "area": property_data.area,
+                "yearBuilt": property_data.yearBuilt,
+                "energyRating": property_data.energyRating,
+                "propertyType": property_data.propertyType,
+                "featured": property_data.featured,
+                "userId": current_user.id
+            },
+            include={
+                "images": True,
+                "features": True
+            }
+        )
+        await tx.slugredirect.delete_many(where={"kind": "property", "slug": slug})
+        await rebuild_property_snapshot(tx, property.id)
+        await record_matches(tx, search_index, property, "new")
+        await tx.propertystatuschange.create(
+            data={
+                "propertyId": property.id,
+                "toStatus": property.status,
+                "listedAt": property.createdAt,
+                "userId": current_user.id
+            }
+        )
+    
+    await invalidation_bus.publish("property", property.id)
+    await invalidation_bus.publish("property-slug", [property.id, slug])
     
     return property
 
@@ -556,15 +1317,58 @@ async def update_property(
     # Preparar los datos para actualizar
     update_data = property_data.dict(exclude_unset=True)
     
-    # Actualizar la propiedad
-    updated_property = await db.property.update(
-        where={"id": property_id},
-        data=update_data,
-        include={
-            "images": True,
-            "features": True
-        }
-    )
+    # Actualizar el slug solo si cambió el título
+    if property_data.title is not None and property_data.title != property.title:
+        base_slug = slugify(property_data.title)
+        slug = base_slug
+        
+        # Verificar si el nuevo slug ya existe
+        existing_property = await db.property.find_unique(where={"slug": slug})
+        counter = 1
+        while existing_property and existing_property.id != property_id:
+            slug = f"{base_slug}-{counter}"
+            existing_property = await db.property.find_unique(where={"slug": slug})
+            counter += 1
+        
+        if slug != property.slug:
+            update_data["slug"] = slug
+    
+    # Actualizar la propiedad y su documento de detalle
+    async with db.tx() as tx:
+        if "slug" in update_data:
+            # El slug antiguo redirigirá al nuevo
+            await record_rename(tx, "property", property.slug, update_data["slug"], property_id)
+        updated_property = await tx.property.update(
+            where={"id": property_id},
+            data=update_data,
+            include={
+                "images": True,
+                "features": True
+            }
+        )
+        await rebuild_property_snapshot(tx, property_id)
+        
+        # Alertas de búsquedas guardadas si cambia el precio o el estado
+        if update_data.get("price", property.price) != property.price:
+            await record_matches(tx, search_index, updated_property, "price")
+        elif update_data.get("status", property.status) != property.status:
+            await record_matches(tx, search_index, updated_property, "status")
+        
+        # Historial de estados para las series del panel
+        if update_data.get("status", property.status) != property.status:
+            await tx.propertystatuschange.create(
+                data={
+                    "propertyId": property_id,
+                    "fromStatus": property.status,
+                    "toStatus": updated_property.status,
+                    "listedAt": property.createdAt,
+                    "userId": current_user.id
+                }
+            )
+    
+    await invalidation_bus.publish("property", property_id)
+    if "slug" in update_data:
+        await invalidation_bus.publish("property-slug", [property_id, update_data["slug"]])
     
     return updated_property
 
@@ -584,16 +1388,19 @@ async def delete_property(property_id: str, current_user: User = Depends(get_cur
     if property.userId != current_user.id and current_user.role != "ADMIN":
         raise HTTPException(status_code=403, detail="No tienes permiso para eliminar esta propiedad")
     
-    # Eliminar las imágenes en Cloudinary
-    for image in property.images:
-        try:
-            cloudinary.uploader.destroy(image.publicId)
-        except Exception as e:
-            # Continuar incluso si falla la eliminación en Cloudinary
-            pass
-    
     # Eliminar la propiedad (las imágenes y características se eliminarán en cascada)
-    await db.property.delete(where={"id": property_id})
+    async with db.tx() as tx:
+        await tx.property.delete(where={"id": property_id})
+        # Las imágenes de Cloudinary se borran en segundo plano (con reintentos),
+        # solo si se confirma el borrado
+        await job_queue.enqueue_many(
+            "cloudinary.destroy",
+            [{"publicId": image.publicId} for image in property.images],
+            client=tx
+        )
+        await tx.slugredirect.delete_many(where={"kind": "property", "targetId": property_id})
+    await invalidation_bus.publish("property", property_id)
+    await invalidation_bus.publish("property-slug", [property_id, None])
     
     return {"detail": "Propiedad eliminada correctamente"}
 
@@ -621,28 +1428,31 @@ async def upload_property_image(
     # Subir la imagen a Cloudinary
     try:
         content = await file.read()
-        upload_result = cloudinary.uploader.upload(
+        upload_result = await cloudinary_upload(
             content,
             folder="inmobiliaria/properties",
             public_id=f"{property_id}-{uuid.uuid4()}",
         )
         
-        # Si es la imagen principal, actualizar las demás imágenes
-        if main:
-            await db.image.update_many(
-                where={"propertyId": property_id},
-                data={"main": False}
+        async with db.tx() as tx:
+            # Si es la imagen principal, actualizar las demás imágenes
+            if main:
+                await tx.image.update_many(
+                    where={"propertyId": property_id},
+                    data={"main": False}
+                )
+            
+            # Guardar la referencia en la base de datos
+            image = await tx.image.create(
+                data={
+                    "url": upload_result["secure_url"],
+                    "publicId": upload_result["public_id"],
+                    "propertyId": property_id,
+                    "main": main
+                }
             )
-        
-        # Guardar la referencia en la base de datos
-        image = await db.image.create(
-            data={
-                "url": upload_result["secure_url"],
-                "publicId": upload_result["public_id"],
-                "propertyId": property_id,
-                "main": main
-            }
-        )
+            await rebuild_property_snapshot(tx, property_id)
+        await invalidation_bus.publish("property", property_id)
         
         return {
             "id": image.id,
@@ -673,17 +1483,45 @@ async def add_property_feature(
     if property.userId != current_user.id and current_user.role != "ADMIN":
         raise HTTPException(status_code=403, detail="No tienes permiso para actualizar esta propiedad")
     
+    # Enlazar con el diccionario si es una característica conocida ("piscina" -> pool)
+    amenity_key = amenities.match(feature_name)
+    if amenity_key:
+        existing = await db.feature.find_first(
+            where={"propertyId": property_id, "amenityId": amenity_key}
+        )
+        if existing:
+            return {
+                "id": existing.id,
+                "name": existing.name,
+                "amenity": amenity_key
+            }
+        feature_name = amenities.display_name(feature_name, amenity_key)
+    
     # Añadir la característica
-    feature = await db.feature.create(
-        data={
-            "name": feature_name,
-            "propertyId": property_id
-        }
-    )
+    async with db.tx() as tx:
+        if amenity_key:
+            # Por si la sincronización del diccionario aún no se ha ejecutado
+            await tx.amenity.upsert(
+                where={"key": amenity_key},
+                data={
+                    "create": {"key": amenity_key, "name": amenities.AMENITIES[amenity_key][0]},
+                    "update": {}
+                }
+            )
+        feature = await tx.feature.create(
+            data={
+                "name": feature_name.strip(),
+                "propertyId": property_id,
+                "amenityId": amenity_key
+            }
+        )
+        await rebuild_property_snapshot(tx, property_id)
+    await invalidation_bus.publish("property", property_id)
     
     return {
         "id": feature.id,
-        "name": feature.name
+        "name": feature.name,
+        "amenity": amenity_key
     }
 
 
@@ -716,14 +1554,36 @@ async def delete_property_feature(
         raise HTTPException(status_code=400, detail="La característica no pertenece a esta propiedad")
     
     # Eliminar la característica
-    await db.feature.delete(where={"id": feature_id})
+    async with db.tx() as tx:
+        await tx.feature.delete(where={"id": feature_id})
+        await rebuild_property_snapshot(tx, property_id)
+    await invalidation_bus.publish("property", property_id)
     
     return {"detail": "Característica eliminada correctamente"}
 
 
+@app.get("/api/amenities", response_model=List[AmenityResponse])
+async def get_amenities():
+    return [{"key": key, "name": name} for key, (name, _) in amenities.AMENITIES.items()]
+
+
+@app.get("/api/locations/suggest", response_model=List[LocationSuggestion])
+async def suggest_locations(q: str = "", limit: int = 8):
+    if not location_index.loaded:
+        raise HTTPException(status_code=503, detail="El índice de ubicaciones se está cargando")
+    
+    return location_index.suggest(q, limit=max(1, min(limit, 20)))
+
+
 @app.get("/api/featured-properties", response_model=List[PropertyResponse])
-async def get_featured_properties(limit: int = 6):
-    properties = await db.property.find_many(
+async def get_featured_properties(limit: int = 6, read_db: Prisma = Depends(get_read_db)):
+    if catalog_reader.connected:
+        properties = await catalog_reader.fetch_featured_properties(limit=limit)
+        if FAST_JSON_RESPONSES:
+            return fast_json.FastJSONResponse(properties)
+        return properties
+    
+    properties = await read_db.property.find_many(
         where={"featured": True, "status": "ACTIVE"},
         include={
             "images": True,
@@ -732,14 +1592,107 @@ async def get_featured_properties(limit: int = 6):
         take=limit
     )
     
+    if FAST_JSON_RESPONSES:
+        return fast_json.properties_response(properties)
+    
     return properties
 
 
+# --- Rutas de búsquedas guardadas ---
+
+async def get_own_saved_search(search_id: str, current_user: User):
+    saved_search = await db.savedsearch.find_unique(where={"id": search_id})
+    
+    if not saved_search:
+        raise HTTPException(status_code=404, detail="Búsqueda no encontrada")
+    
+    # Solo el propietario o un administrador
+    if saved_search.userId != current_user.id and current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permiso para acceder a esta búsqueda")
+    
+    return saved_search
+
+
+@app.get("/api/saved-searches", response_model=List[SavedSearchResponse])
+async def get_saved_searches(current_user: User = Depends(get_current_active_user)):
+    # Los administradores ven todas las búsquedas
+    where = {} if current_user.role == "ADMIN" else {"userId": current_user.id}
+    
+    return await db.savedsearch.find_many(where=where, order={"createdAt": "desc"})
+
+
+@app.post("/api/saved-searches", response_model=SavedSearchResponse)
+async def create_saved_search(
+    search_data: SavedSearchCreate,
+    current_user: User = Depends(get_current_active_user)
+):
+    saved_search = await db.savedsearch.create(
+        data={
+            **search_data.dict(),
+            "email": search_data.email or current_user.email,
+            "userId": current_user.id
+        }
+    )
+    await invalidation_bus.publish("saved-search", saved_search.id)
+    
+    return saved_search
+
+
+@app.get("/api/saved-searches/{search_id}", response_model=SavedSearchResponse)
+async def get_saved_search(search_id: str, current_user: User = Depends(get_current_active_user)):
+    return await get_own_saved_search(search_id, current_user)
+
+
+@app.put("/api/saved-searches/{search_id}", response_model=SavedSearchResponse)
+async def update_saved_search(
+    search_id: str,
+    search_data: SavedSearchUpdate,
+    current_user: User = Depends(get_current_active_user)
+):
+    await get_own_saved_search(search_id, current_user)
+    
+    saved_search = await db.savedsearch.update(
+        where={"id": search_id},
+        data=search_data.dict(exclude_unset=True)
+    )
+    await invalidation_bus.publish("saved-search", search_id)
+    
+    return saved_search
+
+
+@app.delete("/api/saved-searches/{search_id}")
+async def delete_saved_search(search_id: str, current_user: User = Depends(get_current_active_user)):
+    await get_own_saved_search(search_id, current_user)
+    
+    # Las coincidencias pendientes se eliminan en cascada
+    await db.savedsearch.delete(where={"id": search_id})
+    await invalidation_bus.publish("saved-search", search_id)
+    
+    return {"detail": "Búsqueda eliminada correctamente"}
+
+
+@app.get("/api/saved-searches/{search_id}/matches", response_model=List[SearchMatchResponse])
+async def get_saved_search_matches(
+    search_id: str,
+    skip: int = 0,
+    limit: int = 20,
+    current_user: User = Depends(get_current_active_user)
+):
+    await get_own_saved_search(search_id, current_user)
+    
+    return await db.searchmatch.find_many(
+        where={"savedSearchId": search_id},
+        order={"createdAt": "desc"},
+        skip=skip,
+        take=limit
+    )
+
+
 # --- Rutas de categorías ---
 
 @app.get("/api/categories", response_model=List[CategoryResponse])
-async def get_categories():
-    categories = await db.category.find_many()
+async def get_categories(read_db: Prisma = Depends(get_read_db)):
+    categories = await read_db.category.find_many()
     return categories
 
 
@@ -766,13 +1719,14 @@ async def create_category(category_data: CategoryCreate, current_user: User = De
             "slug": slug
         }
     )
+    await invalidation_bus.publish("category", category.id)
     
     return category
 
 
 @app.get("/api/categories/{category_id}", response_model=CategoryResponse)
-async def get_category(category_id: str):
-    category = await db.category.find_unique(where={"id": category_id})
+async def get_category(category_id: str, read_db: Prisma = Depends(get_read_db)):
+    category = await read_db.category.find_unique(where={"id": category_id})
     if not category:
         raise HTTPException(status_code=404, detail="Categoría no encontrada")
     return category
@@ -821,6 +1775,8 @@ async def update_category(
             }
         )
     
+    await invalidation_bus.publish("category", category_id)
+    
     return updated_category
 
 
@@ -836,6 +1792,7 @@ async def delete_category(category_id: str, current_user: User = Depends(get_cur
     
     # Eliminar la categoría (las relaciones se eliminarán en cascada)
     await db.category.delete(where={"id": category_id})
+    await invalidation_bus.publish("category", category_id)
     
     return {"detail": "Categoría eliminada correctamente"}
 
@@ -847,8 +1804,20 @@ async def get_posts(
     published: Optional[bool] = None,
     category_id: Optional[str] = None,
     skip: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    read_db: Prisma = Depends(get_read_db)
 ):
+    if catalog_reader.connected:
+        posts = await catalog_reader.fetch_posts(
+            published=published,
+            category_id=category_id,
+            skip=skip,
+            limit=limit
+        )
+        if FAST_JSON_RESPONSES:
+            return fast_json.FastJSONResponse(posts)
+        return posts
+    
     # Construir la consulta
     where = {}
     
@@ -864,7 +1833,7 @@ async def get_posts(
         }
     
     # Buscar los posts
-    posts = await db.post.find_many(
+    posts = await read_db.post.find_many(
         where=where,
         include={
             "categories": {
@@ -880,24 +1849,11 @@ async def get_posts(
         }
     )
     
-    # Transformar la respuesta para que se ajuste al modelo
-    result = []
-    for post in posts:
-        categories = []
-        for cp in post.categories:
-            categories.append({
-                "id": cp.category.id,
-                "name": cp.category.name,
-                "slug": cp.category.slug,
-                "createdAt": cp.category.createdAt,
-                "updatedAt": cp.category.updatedAt
-            })
-        
-        post_dict = post.dict()
-        post_dict["categories"] = categories
-        result.append(post_dict)
+    if FAST_JSON_RESPONSES:
+        return fast_json.posts_response(posts)
     
-    return result
+    # Transformar la respuesta para que se ajuste al modelo
+    return [fast_json.post_to_dict(post) for post in posts]
 
 
 @app.post("/api/posts", response_model=PostResponse)
@@ -926,10 +1882,15 @@ async def create_post(post_data: PostCreate, current_user: User = Depends(get_cu
     if post_data.excerpt:
         post_create_data["excerpt"] = post_data.excerpt
     
+    if post_data.published:
+        post_create_data["publishedAt"] = datetime.utcnow()
+    
     # Crear el post
     post = await db.post.create(
         data=post_create_data
     )
+    await db.slugredirect.delete_many(where={"kind": "post", "slug": slug})
+    await invalidation_bus.publish("post-slug", [post.id, slug])
     
     # Añadir las categorías
     categories = []
@@ -952,6 +1913,8 @@ async def create_post(post_data: PostCreate, current_user: User = Depends(get_cu
                 "updatedAt": category.updatedAt
             })
     
+    await invalidation_bus.publish("post", post.id)
+    
     # Preparar la respuesta
     post_dict = post.dict()
     post_dict["categories"] = categories
@@ -959,10 +1922,23 @@ async def create_post(post_data: PostCreate, current_user: User = Depends(get_cu
     return post_dict
 
 
+@app.get("/api/posts/by-slug/{slug}", response_model=PostResponse)
+async def get_post_by_slug(slug: str, read_db: Prisma = Depends(get_read_db)):
+    post_id, current_slug = await resolve_slug(post_slugs, slug)
+    
+    if not post_id:
+        raise HTTPException(status_code=404, detail="Post no encontrado")
+    
+    if current_slug:
+        return RedirectResponse(url=f"/api/posts/by-slug/{current_slug}", status_code=301)
+    
+    return await get_post(post_id, read_db)
+
+
 @app.get("/api/posts/{post_id}", response_model=PostResponse)
-async def get_post(post_id: str):
+async def get_post(post_id: str, read_db: Prisma = Depends(get_read_db)):
     # Buscar el post
-    post = await db.post.find_unique(
+    post = await read_db.post.find_unique(
         where={"id": post_id},
         include={
             "categories": {
@@ -976,6 +1952,8 @@ async def get_post(post_id: str):
     if not post:
         raise HTTPException(status_code=404, detail="Post no encontrado")
     
+    view_buffer.record("post", post_id)
+    
     # Transformar la respuesta para que se ajuste al modelo
     categories = []
     for cp in post.categories:
@@ -1048,12 +2026,24 @@ async def update_post(
     
     if post_data.published is not None:
         update_data["published"] = post_data.published
-    
-    # Actualizar el post
-    updated_post = await db.post.update(
-        where={"id": post_id},
-        data=update_data
-    )
+        # Fecha de la primera publicación
+        if post_data.published and not post.publishedAt:
+            update_data["publishedAt"] = datetime.utcnow()
+    
+    # Actualizar el post; el slug antiguo redirigirá al nuevo
+    if update_data.get("slug", post.slug) != post.slug:
+        async with db.tx() as tx:
+            await record_rename(tx, "post", post.slug, update_data["slug"], post_id)
+            await tx.post.update(
+                where={"id": post_id},
+                data=update_data
+            )
+        await invalidation_bus.publish("post-slug", [post_id, update_data["slug"]])
+    else:
+        await db.post.update(
+            where={"id": post_id},
+            data=update_data
+        )
     
     # Actualizar las categorías si se proporcionaron
     if post_data.categoryIds is not None:
@@ -1098,6 +2088,8 @@ async def update_post(
             "updatedAt": cp.category.updatedAt
         })
     
+    await invalidation_bus.publish("post", post_id)
+    
     post_dict = updated_post_with_categories.dict()
     post_dict["categories"] = categories
     
@@ -1117,7 +2109,11 @@ async def delete_post(post_id: str, current_user: User = Depends(get_current_act
         raise HTTPException(status_code=403, detail="No tienes permiso para eliminar este post")
     
     # Eliminar el post (las relaciones con categorías se eliminarán en cascada)
-    await db.post.delete(where={"id": post_id})
+    async with db.tx() as tx:
+        await tx.post.delete(where={"id": post_id})
+        await tx.slugredirect.delete_many(where={"kind": "post", "targetId": post_id})
+    await invalidation_bus.publish("post", post_id)
+    await invalidation_bus.publish("post-slug", [post_id, None])
     
     return {"detail": "Post eliminado correctamente"}
 
@@ -1141,7 +2137,7 @@ async def upload_post_cover_image(
     # Subir la imagen a Cloudinary
     try:
         content = await file.read()
-        upload_result = cloudinary.uploader.upload(
+        upload_result = await cloudinary_upload(
             content,
             folder="inmobiliaria/blog",
             public_id=f"post-{post_id}",
@@ -1152,6 +2148,7 @@ async def upload_post_cover_image(
             where={"id": post_id},
             data={"coverImage": upload_result["secure_url"]}
         )
+        await invalidation_bus.publish("post", post_id)
         
         return {
             "url": updated_post.coverImage
@@ -1161,10 +2158,123 @@ async def upload_post_cover_image(
         raise HTTPException(status_code=500, detail=f"Error al subir la imagen: {str(e)}")
 
 
+# --- Rutas de consultas a la base de datos ---
+
+@app.get("/api/db/query-stats")
+async def get_query_stats(
+    sort: str = "total",
+    limit: int = 50,
+    current_user: User = Depends(get_current_active_user)
+):
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permiso para ver las consultas")
+    
+    if sort not in ("total", "p95", "count", "max", "mean"):
+        raise HTTPException(status_code=400, detail="Orden no válido")
+    
+    # Estadísticas del worker que atiende la petición
+    return {
+        "pid": os.getpid(),
+        "slowThresholdMs": query_stats.slow_threshold * 1000,
+        "queries": query_stats.snapshot(sort=sort, limit=limit)
+    }
+
+
+@app.delete("/api/db/query-stats")
+async def reset_query_stats(current_user: User = Depends(get_current_active_user)):
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permiso para reiniciar las estadísticas")
+    
+    query_stats.reset()
+    return {"detail": "Estadísticas reiniciadas"}
+
+
+# --- Rutas de perfiles de peticiones ---
+
+@app.get("/api/profiles")
+async def get_profiles(current_user: User = Depends(get_current_active_user)):
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permiso para ver los perfiles")
+    
+    return await asyncio.to_thread(profile_store.list)
+
+
+@app.get("/api/profiles/{profile_id}")
+async def get_profile(profile_id: str, current_user: User = Depends(get_current_active_user)):
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permiso para ver los perfiles")
+    
+    path = profile_store.speedscope_path(profile_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    
+    return FileResponse(path, media_type="application/json", filename=os.path.basename(path))
+
+
+# --- Rutas de trabajos en segundo plano ---
+
+@app.get("/api/jobs/stats")
+async def get_job_stats(current_user: User = Depends(get_current_active_user)):
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permiso para ver los trabajos")
+    
+    return await job_queue.stats()
+
+
+@app.post("/api/jobs/{job_id}/retry")
+async def retry_job(job_id: str, current_user: User = Depends(get_current_active_user)):
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permiso para reintentar trabajos")
+    
+    try:
+        job = await job_queue.retry(job_id)
+    except ValueError:
+        raise HTTPException(status_code=409, detail="Solo se pueden reintentar trabajos fallidos")
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    
+    return {"detail": "Trabajo reencolado", "id": job.id}
+
+
 # --- Rutas de estadísticas para el dashboard ---
 
+@app.get("/api/stats/timeseries")
+async def get_stats_timeseries(
+    metric: str = ",".join(stats.METRICS),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    interval: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permiso para ver las estadísticas")
+    
+    names = [name.strip() for name in metric.split(",") if name.strip()]
+    unknown = [name for name in names if name not in stats.METRICS]
+    if unknown or not names:
+        raise HTTPException(status_code=400, detail=f"Métricas no válidas: {', '.join(unknown)}")
+    
+    # Por defecto, el último año
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=364)
+    if start > end:
+        raise HTTPException(status_code=400, detail="La fecha de inicio es posterior a la de fin")
+    
+    # Sin intervalo se elige uno según el rango para no devolver demasiados puntos
+    interval = interval or stats.default_interval(start, end)
+    if interval not in stats.INTERVALS:
+        raise HTTPException(status_code=400, detail="Intervalo no válido")
+    
+    return {
+        "interval": interval,
+        "start": start,
+        "end": end,
+        "series": await stats.timeseries(db, names, start, end, interval)
+    }
+
+
 @app.get("/api/stats/dashboard", response_model=DashboardStats)
-async def get_dashboard_stats(current_user: User = Depends(get_current_active_user)):
+async def get_dashboard_stats(limit: int = 5, current_user: User = Depends(get_current_active_user)):
     if current_user.role != "ADMIN":
         raise HTTPException(status_code=403, detail="No tienes permiso para ver las estadísticas")
     
@@ -1184,6 +2294,18 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_active_us
     total_users = await db.user.count()
     total_categories = await db.category.count()
     
+    # Lo más visto en los últimos días (columna popularity)
+    popular_properties = await db.property.find_many(
+        where={"popularity": {"gt": 0}},
+        order={"popularity": "desc"},
+        take=limit
+    )
+    popular_posts = await db.post.find_many(
+        where={"popularity": {"gt": 0}},
+        order={"popularity": "desc"},
+        take=limit
+    )
+    
     return {
         "activeProperties": active_properties,
         "totalProperties": total_properties,
@@ -1194,10 +2316,83 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_active_us
         "publishedPosts": published_posts,
         "draftPosts": draft_posts,
         "totalUsers": total_users,
-        "totalCategories": total_categories
+        "totalCategories": total_categories,
+        "mostViewedProperties": [
+            {"id": p.id, "title": p.title, "slug": p.slug, "views": p.popularity}
+            for p in popular_properties
+        ],
+        "mostViewedPosts": [
+            {"id": p.id, "title": p.title, "slug": p.slug, "views": p.popularity}
+            for p in popular_posts
+        ]
     }
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("server:app", host="0.0.0.0", port=8001, reload=True)
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="API de InmobiliariaZaragoza")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Muestra el desglose del tiempo de importación y de db.connect() y termina"
+    )
+    parser.add_argument(
+        "--prod",
+        action="store_true",
+        help="Lanza gunicorn con un worker uvicorn por CPU (ver gunicorn.conf.py)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        nargs="?",
+        const=4,
+        metavar="N",
+        help="Ejecuta solo los workers de la cola de trabajos (N tareas, 4 por defecto)"
+    )
+    parser.add_argument(
+        "--sync-amenities",
+        action="store_true",
+        help="Siembra el diccionario de características, enlaza las existentes y termina"
+    )
+    args = parser.parse_args()
+    
+    if args.profile_startup:
+        import sys
+        import startup_profile
+        
+        # Este módulo ya está cargado como __main__: se perfila tal cual, sin importarlo otra vez
+        startup_profile.main(sys.modules[__name__])
+    elif args.prod:
+        config = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py")
+        os.execvp("gunicorn", ["gunicorn", "-c", config, "server:app"])
+    elif args.sync_amenities:
+        async def run_sync():
+            await db.connect()
+            await invalidation_bus.start()
+            try:
+                await sync_amenity_dictionary()
+            finally:
+                await invalidation_bus.stop()
+                await db.disconnect()
+        
+        logging.basicConfig(level=logging.INFO)
+        asyncio.run(run_sync())
+    elif args.jobs:
+        async def run_jobs():
+            await db.connect()
+            job_queue.start(args.jobs)
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await job_queue.stop()
+                await db.disconnect()
+        
+        logging.basicConfig(level=logging.INFO)
+        try:
+            asyncio.run(run_jobs())
+        except KeyboardInterrupt:
+            pass
+    else:
+        import uvicorn
+        uvicorn.run("server:app", host="0.0.0.0", port=8001, reload=True)
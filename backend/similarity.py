@@ -0,0 +1,280 @@
+"""
+Índice de propiedades similares (k vecinos más cercanos) en memoria.
+
+Cada propiedad activa se codifica como un vector: precio y superficie en
+escala logarítmica, dormitorios, baños, coordenadas, tipo (one-hot),
+certificado energético (ordinal) y las características más frecuentes
+(multi-hot). Las columnas numéricas se estandarizan con la media y la
+desviación calculadas en la carga completa y cada bloque lleva un peso.
+Los vectores viven en una matriz NumPy float32 y una búsqueda es un producto
+matriz-vector más `argpartition`, unos pocos ms con 100k anuncios.
+
+El índice se actualiza por propiedad con los eventos `property` del bus de
+invalidación; un evento sin clave (reconexión) fuerza una recarga completa.
+Las propiedades nuevas se codifican con la escala y el vocabulario (tipos y
+características) de la última carga, así que se vuelve a ajustar todo cada
+`reload_interval` y, antes, si los cambios incrementales superan
+`refit_fraction` de las propiedades de la última carga.
+"""
+import asyncio
+import logging
+
+import numpy as np
+
+from energy_ratings import ENERGY_RATINGS, rating_index
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_COLUMNS = ("price", "area", "bedrooms", "bathrooms", "latitude", "longitude")
+
+WEIGHTS = {
+    "price": 3.0,
+    "area": 2.0,
+    "bedrooms": 1.5,
+    "bathrooms": 1.0,
+    "latitude": 1.5,
+    "longitude": 1.5,
+    "propertyType": 2.5,
+    "energyRating": 0.5,
+    "features": 0.4
+}
+
+ROWS_SQL = """
+    SELECT p.id, p.price, p.area, p.bedrooms, p.bathrooms, p.latitude, p.longitude,
+           p.property_type AS "propertyType", p.energy_rating AS "energyRating",
+           p.status::text AS status,
+           COALESCE(
+               array_agg(COALESCE(f.amenity_id, f.name)) FILTER (WHERE f.name IS NOT NULL), '{{}}'
+           ) AS features
+    FROM properties p
+    LEFT JOIN features f ON f.property_id = p.id
+    WHERE {where}
+    GROUP BY p.id
+"""
+
+
+class SimilarityIndex:
+    def __init__(self, db, max_tags=32, initial_capacity=1024, reload_interval=900.0, refit_fraction=0.1):
+        self.db = db
+        self.max_tags = max_tags
+        self.reload_interval = reload_interval
+        self.refit_fraction = refit_fraction
+        self.loaded = False
+        self._initial_capacity = initial_capacity
+        self._reloading = False
+        self._pending = set()
+        # Cambios aplicados desde el último ajuste y tamaño del índice en ese ajuste
+        self._changes = 0
+        self._fitted_size = 0
+        self._task = None
+        self._refit_task = None
+        self._reset([], [])
+
+    def __len__(self):
+        return self._size
+
+    def _reset(self, property_types, tags):
+        self._types = {name: i for i, name in enumerate(property_types)}
+        self._tags = {name: i for i, name in enumerate(tags)}
+        self._dimensions = len(NUMERIC_COLUMNS) + len(self._types) + 1 + len(self._tags)
+        self._vectors = np.zeros((self._initial_capacity, self._dimensions), dtype=np.float32)
+        self._norms = np.zeros(self._initial_capacity, dtype=np.float32)
+        self._ids = []
+        self._rows = {}
+        self._size = 0
+
+    # --- Codificación ---
+
+    def _fit(self, rows):
+        columns = {
+            name: np.array([row[name] for row in rows if row[name] is not None], dtype=np.float64)
+            for name in NUMERIC_COLUMNS
+        }
+        for name in ("price", "area"):
+            columns[name] = np.log1p(np.maximum(columns[name], 0))
+
+        self._mean = np.zeros(len(NUMERIC_COLUMNS))
+        self._scale = np.ones(len(NUMERIC_COLUMNS))
+        for i, name in enumerate(NUMERIC_COLUMNS):
+            values = columns[name]
+            if len(values):
+                self._mean[i] = values.mean()
+                self._scale[i] = values.std() or 1.0
+
+        tag_counts = {}
+        for row in rows:
+            for tag in row["features"] or ():
+                tag_counts[tag] = tag_counts.get(tag, 0) + 1
+        tags = sorted(tag_counts, key=lambda tag: (-tag_counts[tag], tag))[:self.max_tags]
+        property_types = sorted({row["propertyType"] for row in rows})
+        return property_types, tags
+
+    def encode(self, row):
+        vector = np.zeros(self._dimensions, dtype=np.float32)
+        for i, name in enumerate(NUMERIC_COLUMNS):
+            value = row[name]
+            if value is None:
+                # Sin dato: la media de la columna (no acerca ni aleja)
+                continue
+            if name in ("price", "area"):
+                value = np.log1p(max(value, 0))
+            vector[i] = (value - self._mean[i]) / self._scale[i] * WEIGHTS[name]
+
+        offset = len(NUMERIC_COLUMNS)
+        type_index = self._types.get(row["propertyType"])
+        if type_index is not None:
+            vector[offset + type_index] = WEIGHTS["propertyType"]
+
+        offset += len(self._types)
+        rating = rating_index(row["energyRating"])
+        if rating >= 0:
+            vector[offset] = rating / (len(ENERGY_RATINGS) - 1) * WEIGHTS["energyRating"]
+
+        offset += 1
+        for tag in row["features"] or ():
+            tag_index = self._tags.get(tag)
+            if tag_index is not None:
+                vector[offset + tag_index] = WEIGHTS["features"]
+        return vector
+
+    # --- Mantenimiento ---
+
+    async def fetch_rows(self, property_ids=None):
+        if property_ids is None:
+            return await self.db.query_raw(ROWS_SQL.format(where="p.status = 'ACTIVE'"))
+        return await self.db.query_raw(ROWS_SQL.format(where="p.id = ANY($1::text[])"), property_ids)
+
+    async def reload(self):
+        self._reloading = True
+        self._pending.clear()
+        try:
+            rows = await self.fetch_rows()
+            property_types, tags = self._fit(rows)
+            self._reset(property_types, tags)
+            for row in rows:
+                self._put(row["id"], self.encode(row))
+            # Cambios que llegaron mientras se leía la tabla
+            if self._pending:
+                pending = list(self._pending)
+                found = {row["id"]: row for row in await self.fetch_rows(pending)}
+                for property_id in pending:
+                    self.apply(property_id, found.get(property_id))
+        finally:
+            self._reloading = False
+        self.loaded = True
+        self._changes = 0
+        self._fitted_size = len(rows)
+        logger.info("Índice de similares cargado: %d propiedades, %d dimensiones", self._size, self._dimensions)
+
+    def _put(self, property_id, vector):
+        row = self._rows.get(property_id)
+        if row is None:
+            if self._size == len(self._vectors):
+                self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+                self._norms = np.concatenate([self._norms, np.zeros_like(self._norms)])
+            row = self._size
+            self._size += 1
+            self._rows[property_id] = row
+            self._ids.append(property_id)
+        self._vectors[row] = vector
+        self._norms[row] = vector @ vector
+
+    def remove(self, property_id):
+        row = self._rows.pop(property_id, None)
+        if row is None:
+            return
+        # Se mueve la última fila al hueco para mantener la matriz compacta
+        last = self._size - 1
+        if row != last:
+            last_id = self._ids[last]
+            self._vectors[row] = self._vectors[last]
+            self._norms[row] = self._norms[last]
+            self._ids[row] = last_id
+            self._rows[last_id] = row
+        self._ids.pop()
+        self._size -= 1
+
+    def apply(self, property_id, row):
+        if row is not None and row["status"] == "ACTIVE":
+            self._put(property_id, self.encode(row))
+        else:
+            self.remove(property_id)
+
+    async def refresh(self, property_id):
+        """
+        Suscriptor del bus de invalidación
+        """
+        if property_id is None:
+            await self.reload()
+            return
+        if self._reloading or not self.loaded:
+            # Se aplica al terminar la carga (la primera o una tras reconexión)
+            self._pending.add(property_id)
+            return
+        rows = await self.fetch_rows([property_id])
+        self.apply(property_id, rows[0] if rows else None)
+
+        # Demasiados cambios sobre la escala y el vocabulario de la última carga
+        self._changes += 1
+        if self._changes >= max(1, self.refit_fraction * self._fitted_size) and self._refit_task is None:
+            self._refit_task = asyncio.create_task(self._refit())
+
+    async def _refit(self):
+        try:
+            await self.reload()
+        except Exception:
+            logger.exception("Error al reajustar el índice de similares")
+        finally:
+            self._refit_task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except Exception:
+                logger.exception("Error al recargar el índice de similares")
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        tasks = [task for task in (self._task, self._refit_task) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._refit_task = None
+
+    # --- Consultas ---
+
+    def vector(self, property_id):
+        row = self._rows.get(property_id)
+        return None if row is None else self._vectors[row]
+
+    def nearest_many(self, queries, k=6, exclude=()):
+        """
+        Los `k` vecinos de cada vector de `queries` (matriz m × d), en una sola
+        multiplicación. `exclude[i]` es el id que no debe aparecer en la fila i.
+        """
+        if self._size == 0:
+            return [[] for _ in range(len(queries))]
+        vectors = self._vectors[:self._size]
+        queries = np.asarray(queries, dtype=np.float32)
+        # |v - q|² = |v|² - 2 v·q + |q|²  (|q|² no cambia el orden)
+        distances = self._norms[:self._size][None, :] - 2 * (queries @ vectors.T)
+
+        candidates = min(k + 1, self._size)
+        results = []
+        for i, row_distances in enumerate(distances):
+            if candidates < self._size:
+                top = np.argpartition(row_distances, candidates - 1)[:candidates]
+            else:
+                top = np.arange(self._size)
+            top = top[np.argsort(row_distances[top])]
+            skip = exclude[i] if i < len(exclude) else None
+            results.append([self._ids[j] for j in top if self._ids[j] != skip][:k])
+        return results
+
+    def nearest(self, vector, k=6, exclude=None):
+        return self.nearest_many(vector[None, :], k=k, exclude=(exclude,))[0]
@@ -0,0 +1,125 @@
+"""
+Resolución de slugs en memoria para las URLs públicas (propiedades y posts).
+
+Cada worker mantiene un `SlugIndex` por tipo con el mapa slug → id, el inverso
+y los slugs antiguos que quedan tras renombrar (tabla `slug_redirects`). Se
+carga completo al arrancar y se mantiene con los eventos del bus de
+invalidación: la clave es `[id, slug]` (alta o renombrado) o `[id, None]`
+(borrado), así que los demás workers no necesitan consultar la base de datos.
+Una clave `None` (reconexión del bus) fuerza una recarga completa.
+"""
+import logging
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+TABLES = {
+    "property": "properties",
+    "post": "posts"
+}
+
+
+class SlugIndex:
+    def __init__(self, kind, db):
+        self.kind = kind
+        self.db = db
+        self.loaded = False
+        self._ids = {}
+        self._slugs = {}
+        self._redirects = {}
+        self._reloading = False
+        self._pending = []
+
+    def __len__(self):
+        return len(self._ids)
+
+    async def reload(self):
+        self._reloading = True
+        self._pending.clear()
+        try:
+            rows = await self.db.query_raw(f"SELECT id, slug FROM {TABLES[self.kind]}")
+            redirects = await self.db.query_raw(
+                "SELECT slug, target_id FROM slug_redirects WHERE kind = $1",
+                self.kind
+            )
+            self._ids = {row["slug"]: row["id"] for row in rows}
+            self._slugs = {row["id"]: row["slug"] for row in rows}
+            self._redirects = {
+                row["slug"]: row["target_id"] for row in redirects if row["slug"] not in self._ids
+            }
+            self.loaded = True
+        finally:
+            self._reloading = False
+            # Eventos que llegaron mientras se leían las tablas, en orden
+            pending, self._pending = self._pending, []
+            for key in pending:
+                self._apply(key)
+        logger.info("Índice de slugs %s cargado: %d slugs, %d redirecciones", self.kind, len(self._ids), len(self._redirects))
+
+    def resolve(self, slug):
+        """
+        Devuelve `(id, None)` si el slug es el actual, `(id, slug_actual)` si es
+        un slug antiguo que debe redirigir, o `(None, None)` si no existe
+        """
+        entity_id = self._ids.get(slug)
+        if entity_id is not None:
+            metrics.cache_hit(f"{self.kind}_slug")
+            return entity_id, None
+        entity_id = self._redirects.get(slug)
+        if entity_id is not None and entity_id in self._slugs:
+            metrics.cache_hit(f"{self.kind}_slug")
+            return entity_id, self._slugs[entity_id]
+        metrics.cache_miss(f"{self.kind}_slug")
+        return None, None
+
+    def set(self, entity_id, slug):
+        old_slug = self._slugs.get(entity_id)
+        if old_slug is not None and old_slug != slug:
+            self._ids.pop(old_slug, None)
+            self._redirects[old_slug] = entity_id
+        self._redirects.pop(slug, None)
+        self._ids[slug] = entity_id
+        self._slugs[entity_id] = slug
+
+    def remove(self, entity_id):
+        slug = self._slugs.pop(entity_id, None)
+        if slug is not None:
+            self._ids.pop(slug, None)
+        self._redirects = {
+            old_slug: target for old_slug, target in self._redirects.items() if target != entity_id
+        }
+
+    async def apply(self, key):
+        """
+        Suscriptor del bus de invalidación
+        """
+        if key is None:
+            await self.reload()
+            return
+        if self._reloading:
+            self._pending.append(key)
+            return
+        self._apply(key)
+
+    def _apply(self, key):
+        entity_id, slug = key
+        if slug is None:
+            self.remove(entity_id)
+        else:
+            self.set(entity_id, slug)
+
+
+async def record_rename(client, kind, old_slug, new_slug, entity_id):
+    """
+    Guarda el slug antiguo para redirigirlo y libera el nuevo si era una
+    redirección de otra entidad
+    """
+    await client.slugredirect.delete_many(where={"kind": kind, "slug": new_slug})
+    await client.slugredirect.upsert(
+        where={"kind_slug": {"kind": kind, "slug": old_slug}},
+        data={
+            "create": {"kind": kind, "slug": old_slug, "targetId": entity_id},
+            "update": {"targetId": entity_id}
+        }
+    )
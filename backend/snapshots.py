@@ -0,0 +1,95 @@
+"""
+Documentos de detalle de propiedades ya renderizados (tabla `property_snapshots`).
+
+Cada mutación que toca una propiedad, sus imágenes o sus características
+reconstruye el documento dentro de la misma transacción con
+`rebuild_property_snapshot(tx, property_id)`, así que el detalle se sirve con
+una sola lectura por clave primaria y sin volver a serializar.
+
+Las propiedades anteriores a los snapshots los reciben de un trabajo de la
+cola (`backfill_property_snapshots`); mientras tanto las lecturas generan el
+documento en memoria con `render_property_documents`, sin escribir.
+"""
+import fast_json
+
+MISSING_SQL = """
+    SELECT p.id
+    FROM properties p
+    WHERE NOT EXISTS (SELECT 1 FROM property_snapshots s WHERE s.property_id = p.id)
+    ORDER BY p.id
+    LIMIT $1
+"""
+
+
+async def rebuild_property_snapshot(client, property_id):
+    """
+    Vuelve a generar el JSON de la propiedad y lo guarda. Devuelve los bytes
+    del documento o None si la propiedad no existe.
+    """
+    property = await client.property.find_unique(
+        where={"id": property_id},
+        include={
+            "images": True,
+            "features": True
+        }
+    )
+    if not property:
+        return None
+
+    body = fast_json.dumps(fast_json.property_to_dict(property))
+    document = body.decode()
+    await client.propertysnapshot.upsert(
+        where={"propertyId": property_id},
+        data={
+            "create": {"propertyId": property_id, "document": document},
+            "update": {"document": document}
+        }
+    )
+    return body
+
+
+async def fetch_property_snapshot(client, property_id):
+    snapshot = await client.propertysnapshot.find_unique(where={"propertyId": property_id})
+    return snapshot.document.encode() if snapshot else None
+
+
+async def fetch_property_snapshots(client, property_ids):
+    snapshots = await client.propertysnapshot.find_many(where={"propertyId": {"in": property_ids}})
+    return {snapshot.propertyId: snapshot.document.encode() for snapshot in snapshots}
+
+
+async def render_property_documents(client, property_ids):
+    """
+    Documentos generados en memoria con una sola consulta, sin guardarlos
+    (lecturas de propiedades que aún no tienen snapshot)
+    """
+    properties = await client.property.find_many(
+        where={"id": {"in": property_ids}},
+        include={
+            "images": True,
+            "features": True
+        }
+    )
+    return {
+        property.id: fast_json.dumps(fast_json.property_to_dict(property))
+        for property in properties
+    }
+
+
+async def missing_snapshot_ids(client, limit=100):
+    rows = await client.query_raw(MISSING_SQL, limit)
+    return [row["id"] for row in rows]
+
+
+async def backfill_property_snapshots(client, batch_size=100):
+    """
+    Genera los snapshots que falten, por lotes. Devuelve cuántos ha creado.
+    """
+    created = 0
+    while True:
+        property_ids = await missing_snapshot_ids(client, batch_size)
+        for property_id in property_ids:
+            if await rebuild_property_snapshot(client, property_id) is not None:
+                created += 1
+        if len(property_ids) < batch_size:
+            return created
@@ -0,0 +1,99 @@
+"""
+Informe del tiempo de arranque de la API.
+
+    python server.py --profile-startup
+
+Muestra el desglose del tiempo de importación por paquete (`python -X
+importtime`), el tiempo de `db.connect()`, el de cada precarga de cachés (solo
+leen) y lo que cuesta la primera carga diferida de Cloudinary y bcrypt. Las
+tareas que escriben en la base de datos (cola de trabajos, sincronización del
+diccionario de características) no se ejecutan. Sirve para vigilar el
+tiempo hasta la primera petición cuando se escala automáticamente.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_breakdown(module="server"):
+    """
+    Importa `module` en un proceso limpio con `-X importtime` y agrupa el tiempo
+    acumulado de las importaciones de primer nivel por paquete raíz
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{result.stderr[-2000:]}")
+
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, _, cumulative, name = [part for part in line.replace("import time:", "|", 1).split("|")]
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth != 0:
+            continue
+        root = name.strip().split(".")[0]
+        packages[root] = packages.get(root, 0) + int(cumulative)
+
+    return wall, sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+async def runtime_breakdown(server):
+    timings = []
+
+    start = time.perf_counter()
+    await server.db.connect()
+    timings.append(("db.connect()", time.perf_counter() - start))
+
+    try:
+        for warmer in server.cache_warmers:
+            start = time.perf_counter()
+            await warmer()
+            label = warmer.__qualname__
+            # Los índices de slugs son dos instancias de la misma clase
+            kind = getattr(getattr(warmer, "__self__", None), "kind", None)
+            if kind:
+                label = f"{label} ({kind})"
+            timings.append((f"precarga {label}", time.perf_counter() - start))
+    finally:
+        await server.db.disconnect()
+
+    start = time.perf_counter()
+    server.get_cloudinary()
+    timings.append(("primer uso de Cloudinary", time.perf_counter() - start))
+
+    start = time.perf_counter()
+    server.get_pwd_context().hash("profile-startup")
+    timings.append(("primer hash bcrypt", time.perf_counter() - start))
+
+    return timings
+
+
+def main(server, top=15):
+    """
+    `server` es el módulo de la API ya importado (el `__main__` de `server.py --profile-startup`)
+    """
+    wall, packages = import_breakdown()
+    total_us = sum(us for _, us in packages)
+
+    print("Importación de server.py")
+    print(f"  proceso completo (intérprete + imports): {wall * 1000:8.1f} ms")
+    print(f"  imports de primer nivel:                 {total_us / 1000:8.1f} ms\n")
+    print(f"  {'paquete':<28}{'ms':>10}{'%':>8}")
+    for name, us in packages[:top]:
+        print(f"  {name:<28}{us / 1000:>10.1f}{us / total_us * 100:>7.1f}%")
+
+    print("\nArranque")
+    for label, seconds in asyncio.run(runtime_breakdown(server)):
+        print(f"  {label:<40}{seconds * 1000:>10.1f} ms")
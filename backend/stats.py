@@ -0,0 +1,123 @@
+"""
+Series temporales del panel de administración a partir de agregados diarios.
+
+El trabajo periódico `stats.rollup` recalcula los últimos días de la tabla
+`daily_stats` (una fila por día y métrica, con el valor y el número de
+muestras) a partir de `properties`, `property_status_changes` y `posts`. El
+endpoint `/api/stats/timeseries` solo lee esos agregados y los reagrupa por
+semana o mes si hace falta.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+# Cómo se combinan los días de un mismo intervalo
+METRICS = {
+    "properties_created": "sum",
+    "properties_sold": "sum",
+    "properties_reserved": "sum",
+    "days_on_market": "mean",
+    "posts_published": "sum"
+}
+
+INTERVALS = ("day", "week", "month")
+
+ROLLUP_SQL = """
+    INSERT INTO daily_stats (day, metric, value, samples)
+    SELECT day, metric, value, samples FROM (
+        SELECT created_at::date AS day, 'properties_created' AS metric,
+               count(*)::float AS value, count(*)::int AS samples
+        FROM properties
+        WHERE created_at >= $1::date
+        GROUP BY 1
+        UNION ALL
+        SELECT changed_at::date, 'properties_sold', count(*)::float, count(*)::int
+        FROM property_status_changes
+        WHERE to_status = 'SOLD' AND changed_at >= $1::date
+        GROUP BY 1
+        UNION ALL
+        SELECT changed_at::date, 'properties_reserved', count(*)::float, count(*)::int
+        FROM property_status_changes
+        WHERE to_status = 'RESERVED' AND changed_at >= $1::date
+        GROUP BY 1
+        UNION ALL
+        SELECT changed_at::date, 'days_on_market',
+               sum(EXTRACT(EPOCH FROM changed_at - listed_at) / 86400)::float, count(*)::int
+        FROM property_status_changes
+        WHERE to_status = 'SOLD' AND changed_at >= $1::date
+        GROUP BY 1
+        UNION ALL
+        SELECT published_at::date, 'posts_published', count(*)::float, count(*)::int
+        FROM posts
+        WHERE published_at >= $1::date
+        GROUP BY 1
+    ) AS s
+"""
+
+SERIES_SQL = """
+    SELECT date_trunc($1, day)::date::text AS bucket, metric,
+           sum(value)::float AS value, sum(samples)::int AS samples
+    FROM daily_stats
+    WHERE metric = ANY($2::text[]) AND day BETWEEN $3::date AND $4::date
+    GROUP BY 1, 2
+"""
+
+
+async def rollup_daily_stats(db, days=2):
+    """
+    Recalcula los agregados desde hace `days` días (todos si la tabla está vacía)
+    """
+    if await db.dailystat.count() == 0:
+        since = date(1970, 1, 1)
+    else:
+        # Las fechas se guardan en UTC: el día de hoy también
+        since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+
+    async with db.tx() as tx:
+        await tx.execute_raw("DELETE FROM daily_stats WHERE day >= $1::date", since.isoformat())
+        await tx.execute_raw(ROLLUP_SQL, since.isoformat())
+
+
+def default_interval(start, end):
+    days = (end - start).days
+    if days <= 92:
+        return "day"
+    if days <= 731:
+        return "week"
+    return "month"
+
+
+def bucket_start(day, interval):
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+
+def buckets(start, end, interval):
+    current = bucket_start(start, interval)
+    while current <= end:
+        yield current
+        if interval == "day":
+            current += timedelta(days=1)
+        elif interval == "week":
+            current += timedelta(days=7)
+        else:
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+async def timeseries(db, metrics, start, end, interval):
+    rows = await db.query_raw(SERIES_SQL, interval, metrics, start.isoformat(), end.isoformat())
+    values = {(row["metric"], row["bucket"]): row for row in rows}
+
+    series = {}
+    for metric in metrics:
+        points = []
+        for bucket in buckets(start, end, interval):
+            row = values.get((metric, bucket.isoformat()))
+            if METRICS[metric] == "mean":
+                value = row["value"] / row["samples"] if row and row["samples"] else None
+            else:
+                value = row["value"] if row else 0
+            points.append({"date": bucket.isoformat(), "value": value})
+        series[metric] = points
+    return series
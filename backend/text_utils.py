@@ -0,0 +1,13 @@
+"""
+Normalización de textos para comparar y buscar sin distinguir mayúsculas ni tildes.
+"""
+import unicodedata
+
+
+def normalize(text):
+    """
+    "  Las  Delicias " -> "las delicias", "Calefacción" -> "calefaccion"
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.lower().split())
@@ -5,17 +5,29 @@ set -e
 cd /backend || { echo "Backend directory not found"; exit 1; }
 
 echo "Starting FastAPI backend"
-# Start Uvicorn with proper host binding
-uvicorn server:app --host 0.0.0.0 --port 8001 &
+# Gunicorn with one uvicorn worker per CPU (WEB_CONCURRENCY overrides), see gunicorn.conf.py
+gunicorn -c gunicorn.conf.py server:app &
 BACKEND_PID=$!
 
-echo "Waiting for backend to start..."
-sleep 30
-
-if ! kill -0 $BACKEND_PID 2>/dev/null; then
-    echo "Backend failed to start at initialization, exiting"
-    exit 1
-fi
+# Wait until the backend reports ready (database, storage and warmed caches)
+READY_URL="http://127.0.0.1:8001/api/health/ready"
+READY_TIMEOUT=${BACKEND_READY_TIMEOUT:-120}
+DEADLINE=$(( $(date +%s) + READY_TIMEOUT ))
+
+echo "Waiting for backend to become ready..."
+until wget -q -T 2 -O /dev/null "$READY_URL"; do
+    if ! kill -0 $BACKEND_PID 2>/dev/null; then
+        echo "Backend failed to start at initialization, exiting"
+        exit 1
+    fi
+    if [ "$(date +%s)" -ge "$DEADLINE" ]; then
+        echo "Backend not ready after ${READY_TIMEOUT}s, exiting"
+        kill $BACKEND_PID
+        exit 1
+    fi
+    sleep 0.5
+done
+echo "Backend ready"
 
 # Start Nginx
 nginx -g 'daemon off;' &
@@ -0,0 +1,30 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from query_tracking import record_queries
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Falla si el bloque hace más consultas a la base de datos de las permitidas.
+
+        def test_listado(client, query_budget):
+            with query_budget(3):
+                client.get("/api/properties")
+    """
+    @contextmanager
+    def budget(max_queries):
+        with record_queries(capture_all=True) as recorder:
+            yield recorder
+        assert recorder.count <= max_queries, (
+            f"Se esperaban como máximo {max_queries} consultas y se hicieron {recorder.count}:\n"
+            f"{recorder.summary()}"
+        )
+
+    return budget
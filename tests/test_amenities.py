@@ -0,0 +1,116 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from amenities import AMENITIES, bitmask, display_name, match, needs_sync, parse
+from catalog import Catalog
+
+
+def test_reconoce_sinonimos_sin_tildes_ni_mayusculas():
+    assert match("Piscina") == "pool"
+    assert match("  PISCINA comunitaria ") == "pool"
+    assert match("Calefacción central") == "heating"
+    assert match("Plaza de garaje incluida") == "garage"
+    assert match("Aire acondicionado") == "air_conditioning"
+    assert match("A/A") == "air_conditioning"
+
+
+def test_no_reconoce_negaciones_ni_textos_desconocidos():
+    assert match("Sin ascensor") is None
+    assert match("No admite mascotas") is None
+    assert match("Chimenea") is None
+    # Solo palabras completas: "poolside" no es "pool"
+    assert match("Poolside bar") is None
+
+
+def test_nombre_a_mostrar():
+    assert display_name("piscina", "pool") == "Piscina"
+    assert display_name("Calefaccion", "heating") == "Calefacción"
+    assert display_name(" Piscina comunitaria ", "pool") == "Piscina comunitaria"
+
+
+def test_parse_de_claves():
+    assert parse("pool, garage,,pool") == ["pool", "garage"]
+    assert parse("") == []
+    with pytest.raises(ValueError):
+        parse("pool,jacuzzi")
+
+
+def test_cada_clave_es_un_bit():
+    assert bitmask([]) == 0
+    assert bitmask(["pool"]) == 1
+    assert bitmask(["pool", "garage", "pool"]) == 0b11
+    assert bitmask(["desconocida"]) == 0
+    assert bitmask(AMENITIES) == (1 << len(AMENITIES)) - 1
+
+
+class FakeAmenityDB:
+    def __init__(self, rows, unlinked=()):
+        self.rows = rows
+        # Nombres de `features` con amenity_id IS NULL
+        self.unlinked = unlinked
+
+    async def query_raw(self, sql, *args):
+        if "FROM features" in sql:
+            return [{"name": name} for name in self.unlinked]
+        return self.rows
+
+
+SYNCED = [{"key": key, "name": name} for key, (name, _) in AMENITIES.items()]
+
+
+def test_needs_sync_compara_con_el_diccionario():
+    assert not asyncio.run(needs_sync(FakeAmenityDB(SYNCED)))
+    assert asyncio.run(needs_sync(FakeAmenityDB(SYNCED[:-1])))
+    assert asyncio.run(needs_sync(FakeAmenityDB([{**SYNCED[0], "name": "Piscina privada"}, *SYNCED[1:]])))
+
+
+def test_needs_sync_con_caracteristicas_sin_enlazar():
+    # Textos que no corresponden a ninguna característica no obligan a sincronizar
+    assert not asyncio.run(needs_sync(FakeAmenityDB(SYNCED, unlinked=["Chimenea", "Sin ascensor"])))
+    assert asyncio.run(needs_sync(FakeAmenityDB(SYNCED, unlinked=["Chimenea", "piscina"])))
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.rows = {row["id"]: row for row in rows}
+
+    async def query_raw(self, sql, *args):
+        if args:
+            return [dict(self.rows[property_id]) for property_id in args[0] if property_id in self.rows]
+        return [dict(row) for row in self.rows.values() if row["status"] == "ACTIVE"]
+
+
+def random_row(rng, property_id):
+    return {
+        "id": property_id,
+        "status": "ACTIVE",
+        "price": 100_000.0,
+        "area": 80.0,
+        "bedrooms": 2,
+        "bathrooms": 1,
+        "propertyType": "Piso",
+        "energyRating": None,
+        "featured": False,
+        "latitude": None,
+        "longitude": None,
+        "location": "Centro",
+        "created": 0.0,
+        "popularity": 0,
+        "amenities": rng.sample(list(AMENITIES), rng.randrange(len(AMENITIES) + 1))
+    }
+
+
+def test_filtro_de_caracteristicas_del_catalogo():
+    rng = random.Random(1)
+    db = FakeDB(random_row(rng, f"p{i:03d}") for i in range(300))
+    catalog = Catalog(db)
+    asyncio.run(catalog.reload())
+
+    for features in [["pool"], ["pool", "garage"], ["sea_view", "pets", "lift"], list(AMENITIES)[-3:], list(AMENITIES)]:
+        expected = sorted(row["id"] for row in db.rows.values() if set(features) <= set(row["amenities"]))
+        assert sorted(np.array(catalog.ids)[catalog.mask(features=features)].tolist()) == expected
+    assert catalog.mask(features=[]).all()
+
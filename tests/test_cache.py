@@ -0,0 +1,70 @@
+from cache import TTLCache
+
+
+def test_guarda_y_caduca(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("cache.time.monotonic", lambda: now[0])
+    cache = TTLCache("test", ttl=10)
+
+    cache.set("a", b"1")
+    assert cache.get("a") == b"1"
+    now[0] += 11
+    assert cache.get("a") is None
+
+
+def test_expulsa_la_entrada_menos_usada():
+    cache = TTLCache("test", maxsize=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+
+
+def test_no_guarda_lo_leido_antes_de_una_invalidacion():
+    cache = TTLCache("test")
+
+    generation = cache.generation()
+    # Llega la invalidación mientras se lee el valor antiguo
+    cache.invalidate("a")
+    assert not cache.set("a", b"antiguo", generation=generation)
+    assert cache.get("a") is None
+
+    # Una lectura que empieza después sí se guarda
+    assert cache.set("a", b"nuevo", generation=cache.generation())
+    assert cache.get("a") == b"nuevo"
+
+
+def test_la_invalidacion_de_otra_clave_no_afecta():
+    cache = TTLCache("test")
+
+    generation = cache.generation()
+    cache.invalidate("b")
+
+    assert cache.set("a", b"1", generation=generation)
+
+
+def test_vaciar_la_cache_descarta_todas_las_lecturas_en_curso():
+    cache = TTLCache("test")
+
+    generation = cache.generation()
+    cache.invalidate()
+
+    assert not cache.set("a", b"1", generation=generation)
+    assert not cache.set("b", b"2", generation=generation)
+
+
+def test_el_registro_de_invalidaciones_esta_acotado():
+    cache = TTLCache("test", maxsize=3)
+    cache.set("x", b"x")
+
+    generation = cache.generation()
+    for key in "abcde":
+        cache.invalidate(key)
+
+    assert len(cache._invalidated) <= 3
+    # Las lecturas en curso se descartan, pero lo ya guardado sigue
+    assert not cache.set("z", b"z", generation=generation)
+    assert cache.get("x") == b"x"
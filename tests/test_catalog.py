@@ -0,0 +1,198 @@
+import asyncio
+
+import numpy as np
+
+from catalog import COLUMNS, Catalog, histogram
+
+
+def test_histograma_vacio():
+    assert histogram(np.array([])) == {"min": None, "max": None, "edges": [], "counts": []}
+    assert histogram(np.array([np.nan, np.inf])) == {"min": None, "max": None, "edges": [], "counts": []}
+
+
+def test_histograma_cubre_todos_los_valores_finitos():
+    rng = np.random.default_rng(1)
+    prices = np.concatenate([rng.lognormal(12.5, 0.6, 5000), [np.nan, np.inf]])
+
+    result = histogram(prices, bins=20)
+
+    edges = np.array(result["edges"])
+    assert len(result["counts"]) == len(edges) - 1
+    assert np.all(np.diff(edges) > 0)
+    assert edges[0] <= result["min"] and edges[-1] >= result["max"]
+    assert sum(result["counts"]) == 5000
+
+
+def test_bordes_redondeados_y_barras_parecidas():
+    rng = np.random.default_rng(2)
+    prices = rng.uniform(150_000, 950_000, 10_000)
+
+    result = histogram(prices, bins=10)
+
+    # Precios de seis cifras: bordes con dos cifras significativas
+    assert all(edge % 10_000 == 0 for edge in result["edges"])
+    counts = np.array(result["counts"])
+    assert counts.max() < 2 * counts.mean()
+
+
+def test_histograma_de_un_solo_valor():
+    result = histogram(np.array([250_000.0] * 3))
+
+    assert result["min"] == result["max"] == 250_000.0
+    assert sum(result["counts"]) == 3
+    assert len(result["edges"]) >= 2
+
+
+class FakeDB:
+    """
+    Tabla `properties` en memoria. `during_load` se ejecuta en mitad de la
+    lectura completa, para simular eventos que llegan durante una recarga
+    """
+
+    def __init__(self, rows=()):
+        self.rows = {row["id"]: row for row in rows}
+        self.during_load = None
+
+    async def query_raw(self, sql, *args):
+        if args:
+            return [dict(self.rows[property_id]) for property_id in args[0] if property_id in self.rows]
+        rows = [dict(row) for row in self.rows.values() if row["status"] == "ACTIVE"]
+        if self.during_load is not None:
+            during_load, self.during_load = self.during_load, None
+            await during_load()
+        return rows
+
+
+TYPES = ["Piso", "Casa", "Ático"]
+LOCATIONS = ["Madrid Centro", "Madrid Norte", "Valencia", "Sevilla Este"]
+
+
+def random_row(rng, property_id):
+    return {
+        "id": property_id,
+        "status": rng.choice(["ACTIVE", "ACTIVE", "ACTIVE", "SOLD"]),
+        "price": float(rng.integers(1, 10) * 50_000),
+        "area": float(rng.integers(40, 200)),
+        "bedrooms": int(rng.integers(0, 5)),
+        "bathrooms": int(rng.integers(1, 3)),
+        "propertyType": TYPES[rng.integers(len(TYPES))],
+        "energyRating": ["A", "B", "C", None][rng.integers(4)],
+        "featured": bool(rng.random() < 0.3),
+        "latitude": None if rng.random() < 0.1 else float(rng.uniform(36, 43)),
+        "longitude": None if rng.random() < 0.1 else float(rng.uniform(-9, 3)),
+        "location": LOCATIONS[rng.integers(len(LOCATIONS))],
+        # Pocas fechas y popularidades distintas para forzar empates
+        "created": float(rng.integers(0, 8) * 86400),
+        "popularity": int(rng.integers(0, 4)),
+        "amenities": []
+    }
+
+
+def loaded_catalog(db, **options):
+    catalog = Catalog(db, **options)
+    asyncio.run(catalog.reload())
+    return catalog
+
+
+FILTERS = [
+    {},
+    {"min_price": 100_000},
+    {"max_price": 200_000},
+    {"min_price": 150_000, "max_price": 300_000, "bedrooms": 2},
+    {"property_type": "Piso"},
+    {"property_type": "Castillo"},
+    {"location": "Madrid"},
+    {"location": "madrid"},
+    {"featured": True},
+    {"featured": False, "property_type": "Casa", "location": "Este"},
+]
+
+
+def brute_force(rows, min_price=None, max_price=None, bedrooms=None, property_type=None, location=None, featured=None):
+    return [
+        row for row in rows.values()
+        if row["status"] == "ACTIVE"
+        and (min_price is None or row["price"] >= min_price)
+        and (max_price is None or row["price"] <= max_price)
+        and (not bedrooms or row["bedrooms"] >= bedrooms)
+        and (not property_type or row["propertyType"] == property_type)
+        and (not location or location in row["location"])
+        and (featured is None or row["featured"] == featured)
+    ]
+
+
+def sql_order(rows, sort=None):
+    if sort == "popular":
+        return [row["id"] for row in sorted(rows, key=lambda row: (-row["popularity"], -row["created"], row["id"]))]
+    return [row["id"] for row in sorted(rows, key=lambda row: (-row["created"], row["id"]))]
+
+
+def test_mascara_y_paginas_como_en_sql():
+    rng = np.random.default_rng(3)
+    db = FakeDB(random_row(rng, f"p{i:03d}") for i in range(300))
+    catalog = loaded_catalog(db, initial_capacity=8)
+
+    for filters in FILTERS:
+        expected = brute_force(db.rows, **filters)
+        mask = catalog.mask(**filters)
+        assert sorted(np.array(catalog.ids)[mask].tolist()) == sorted(row["id"] for row in expected)
+
+        for sort in (None, "popular"):
+            ordered = sql_order(expected, sort)
+            for skip, limit in [(0, 10), (7, 13), (40, 25), (len(ordered) - 3, 10), (len(ordered), 10), (0, 0)]:
+                assert catalog.page(mask, sort=sort, skip=skip, limit=limit) == ordered[skip:skip + limit]
+
+
+def decoded_row(catalog, property_id):
+    # Los códigos de tipo y zona dependen del orden de llegada: se comparan los valores
+    row = {column: catalog.value(property_id, column) for column in COLUMNS}
+    row["type_code"] = catalog.types[row["type_code"]]
+    row["location_code"] = catalog.locations[row["location_code"]]
+    # NaN != NaN
+    return {column: "nan" if value != value else value for column, value in row.items()}
+
+
+def test_refresh_incremental_equivale_a_recargar():
+    rng = np.random.default_rng(4)
+    db = FakeDB(random_row(rng, f"p{i:03d}") for i in range(100))
+    catalog = loaded_catalog(db, initial_capacity=4)
+
+    for _ in range(400):
+        property_id = f"p{rng.integers(130):03d}"
+        if property_id in db.rows and rng.random() < 0.2:
+            del db.rows[property_id]
+        else:
+            db.rows[property_id] = random_row(rng, property_id)
+        asyncio.run(catalog.refresh(property_id))
+
+    fresh = loaded_catalog(db)
+    assert sorted(catalog.ids) == sorted(fresh.ids)
+    for property_id in fresh.ids:
+        assert decoded_row(catalog, property_id) == decoded_row(fresh, property_id)
+    for filters in FILTERS:
+        for sort in (None, "popular"):
+            assert catalog.page(catalog.mask(**filters), sort=sort, limit=1000) == \
+                fresh.page(fresh.mask(**filters), sort=sort, limit=1000)
+
+
+def test_los_cambios_durante_una_recarga_no_se_pierden():
+    rng = np.random.default_rng(5)
+    db = FakeDB(random_row(rng, f"p{i:03d}") for i in range(20))
+    for row in db.rows.values():
+        row["status"] = "ACTIVE"
+    catalog = loaded_catalog(db)
+
+    async def concurrent_changes():
+        db.rows["p000"] = {**db.rows["p000"], "price": 1.0}
+        db.rows["p001"]["status"] = "SOLD"
+        db.rows["p999"] = {**random_row(rng, "p999"), "status": "ACTIVE"}
+        for property_id in ("p000", "p001", "p999"):
+            await catalog.refresh(property_id)
+
+    db.during_load = concurrent_changes
+    asyncio.run(catalog.reload())
+
+    assert catalog.value("p000", "price") == 1.0
+    assert catalog.value("p001", "price") is None
+    assert catalog.value("p999", "price") == db.rows["p999"]["price"]
+    assert len(catalog) == 20
@@ -0,0 +1,169 @@
+import asyncio
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from catalog import Catalog
+from clusters import ClusterPyramid, project
+
+WORLD = (-180.0, -85.0, 180.0, 85.0)
+POINTS_ZOOM = 8
+
+
+class FakeDB:
+    def __init__(self, rows=()):
+        self.rows = {row["id"]: row for row in rows}
+
+    async def query_raw(self, sql, *args):
+        if args:
+            return [dict(self.rows[property_id]) for property_id in args[0] if property_id in self.rows]
+        return [dict(row) for row in self.rows.values() if row["status"] == "ACTIVE"]
+
+
+def random_row(rng, property_id):
+    located = rng.random() < 0.9
+    return {
+        "id": property_id,
+        "status": "ACTIVE" if rng.random() < 0.85 else "SOLD",
+        "price": float(rng.integers(1, 20) * 25_000),
+        "area": 80.0,
+        "bedrooms": 2,
+        "bathrooms": 1,
+        "propertyType": "Piso",
+        "energyRating": None,
+        "featured": False,
+        # Concentradas en unas pocas ciudades para que compartan celdas
+        "latitude": float(rng.choice([40.4, 41.4, 39.5]) + rng.normal(0, 0.05)) if located else None,
+        "longitude": float(rng.choice([-3.7, 2.2, -0.4]) + rng.normal(0, 0.05)) if located else None,
+        "location": "Centro",
+        "created": 0.0,
+        "popularity": 0,
+        "amenities": []
+    }
+
+
+def loaded_pyramid(db):
+    catalog = Catalog(db, initial_capacity=4)
+    pyramid = catalog.listen(ClusterPyramid(catalog, points_zoom=POINTS_ZOOM))
+    asyncio.run(catalog.reload())
+    return catalog, pyramid
+
+
+def located_rows(db):
+    return [
+        row for row in db.rows.values()
+        if row["status"] == "ACTIVE" and row["latitude"] is not None and row["longitude"] is not None
+    ]
+
+
+def brute_force_clusters(rows, zoom, cells_per_tile=4):
+    cells = defaultdict(list)
+    scale = (1 << zoom) * cells_per_tile
+    for row in rows:
+        x, y = project(row["latitude"], row["longitude"])
+        cells[int(x * scale), int(y * scale)].append(row)
+    return sorted((
+        (
+            len(members),
+            sum(row["latitude"] for row in members) / len(members),
+            sum(row["longitude"] for row in members) / len(members),
+            min(row["price"] for row in members),
+            max(row["price"] for row in members)
+        )
+        for members in cells.values()
+    ), key=cluster_order)
+
+
+def clusters_of(pyramid, zoom, bbox=WORLD):
+    return sorted((
+        (cell["count"], cell["latitude"], cell["longitude"], cell["minPrice"], cell["maxPrice"])
+        for cell in pyramid.query(bbox, zoom)["clusters"]
+    ), key=cluster_order)
+
+
+def cluster_order(cluster):
+    count, latitude, longitude, min_price, max_price = cluster
+    return count, round(latitude, 6), round(longitude, 6), min_price, max_price
+
+
+def assert_same_pyramid(pyramid, fresh):
+    assert pyramid._by_property == fresh._by_property
+    assert pyramid._points == fresh._points
+    for level, fresh_level in zip(pyramid.levels, fresh.levels):
+        assert level.keys() == fresh_level.keys()
+        for key, cell in level.items():
+            expected = fresh_level[key]
+            assert cell.count == expected.count
+            assert cell.prices == expected.prices
+            assert cell.latitude == pytest.approx(expected.latitude)
+            assert cell.longitude == pytest.approx(expected.longitude)
+
+
+def test_clusters_como_la_fuerza_bruta():
+    rng = np.random.default_rng(1)
+    db = FakeDB(random_row(rng, f"p{i:03d}") for i in range(400))
+    _, pyramid = loaded_pyramid(db)
+    rows = located_rows(db)
+
+    assert len(pyramid) == len(rows)
+    for zoom in range(POINTS_ZOOM):
+        clusters, expected = clusters_of(pyramid, zoom), brute_force_clusters(rows, zoom)
+        assert len(clusters) == len(expected)
+        for cluster, expected_cluster in zip(clusters, expected):
+            assert cluster == pytest.approx(expected_cluster)
+
+
+def test_puntos_dentro_del_rectangulo():
+    rng = np.random.default_rng(2)
+    db = FakeDB(random_row(rng, f"p{i:03d}") for i in range(400))
+    _, pyramid = loaded_pyramid(db)
+
+    bbox = (-3.75, 40.38, -3.65, 40.45)
+    min_lng, min_lat, max_lng, max_lat = bbox
+    expected = sorted(
+        row["id"] for row in located_rows(db)
+        if min_lat <= row["latitude"] <= max_lat and min_lng <= row["longitude"] <= max_lng
+    )
+
+    result = pyramid.query(bbox, POINTS_ZOOM + 2)
+    assert result["clusters"] == []
+    assert sorted(point["id"] for point in result["points"]) == expected
+
+
+def test_cambios_incrementales_equivalen_a_reconstruir():
+    rng = np.random.default_rng(3)
+    db = FakeDB(random_row(rng, f"p{i:03d}") for i in range(150))
+    catalog, pyramid = loaded_pyramid(db)
+
+    for _ in range(300):
+        property_id = f"p{rng.integers(180):03d}"
+        if property_id in db.rows and rng.random() < 0.2:
+            del db.rows[property_id]
+        elif property_id in db.rows and rng.random() < 0.3:
+            # Cambio que no afecta a la pirámide
+            db.rows[property_id]["area"] += 1
+        else:
+            db.rows[property_id] = random_row(rng, property_id)
+        asyncio.run(catalog.refresh(property_id))
+
+    _, fresh = loaded_pyramid(db)
+    assert_same_pyramid(pyramid, fresh)
+
+
+def test_la_recarga_periodica_propaga_las_diferencias():
+    rng = np.random.default_rng(4)
+    db = FakeDB(random_row(rng, f"p{i:03d}") for i in range(150))
+    catalog, pyramid = loaded_pyramid(db)
+
+    # Cambios sin evento (perdidos): los recoge la recarga completa
+    for index in rng.choice(180, size=60, replace=False).tolist():
+        property_id = f"p{index:03d}"
+        if property_id in db.rows and rng.random() < 0.3:
+            del db.rows[property_id]
+        else:
+            db.rows[property_id] = random_row(rng, property_id)
+    asyncio.run(catalog.reload())
+
+    _, fresh = loaded_pyramid(db)
+    assert_same_pyramid(pyramid, fresh)
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+import db_routing
+from db_routing import Replica, ReplicaRouter
+
+
+class FakeClient:
+    """
+    Cliente Prisma de mentira: informa de un retraso fijo o falla al consultarlo
+    """
+
+    def __init__(self, name, lag=0.0, error=None):
+        self.name = name
+        self.lag = lag
+        self.error = error
+        self.connected = False
+
+    def is_connected(self):
+        return self.connected
+
+    async def connect(self):
+        if self.error:
+            raise self.error
+        self.connected = True
+
+    async def disconnect(self):
+        self.connected = False
+
+    async def query_raw(self, sql, *args):
+        if self.error:
+            raise self.error
+        return [{"lag": self.lag}]
+
+
+def make_router(*replica_clients, **options):
+    primary = FakeClient("primary")
+    replicas = [Replica(f"postgres://{client.name}", client) for client in replica_clients]
+    return primary, ReplicaRouter(primary, replicas, **options)
+
+
+async def check_all(router):
+    for replica in router.replicas:
+        await router.check_replica(replica)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(db_routing.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_sin_replicas_lee_del_primario():
+    primary, router = make_router()
+    assert router.for_read() is primary
+    assert router.for_read("user-1") is primary
+
+
+def test_reparte_en_round_robin_entre_replicas_sanas():
+    first, second = FakeClient("r1"), FakeClient("r2")
+    primary, router = make_router(first, second)
+    asyncio.run(check_all(router))
+
+    assert [router.for_read() for _ in range(4)] == [first, second, first, second]
+
+
+def test_replica_con_retraso_vuelve_al_primario():
+    lagging = FakeClient("r1", lag=30.0)
+    primary, router = make_router(lagging, max_lag_seconds=5.0)
+    asyncio.run(check_all(router))
+
+    assert not router.replicas[0].healthy
+    assert router.replicas[0].lag == 30.0
+    assert router.for_read() is primary
+
+
+def test_se_salta_la_replica_con_retraso():
+    healthy, lagging = FakeClient("r1"), FakeClient("r2", lag=12.0)
+    primary, router = make_router(healthy, lagging, max_lag_seconds=5.0)
+    asyncio.run(check_all(router))
+
+    assert [router.for_read() for _ in range(3)] == [healthy, healthy, healthy]
+
+
+def test_replica_que_falla_vuelve_al_primario():
+    broken = FakeClient("r1", error=ConnectionError("caída"))
+    primary, router = make_router(broken)
+    router.replicas[0].healthy = True
+    asyncio.run(check_all(router))
+
+    assert not router.replicas[0].healthy
+    assert router.for_read() is primary
+
+
+def test_la_replica_se_recupera_cuando_se_pone_al_dia():
+    client = FakeClient("r1", lag=30.0)
+    primary, router = make_router(client, max_lag_seconds=5.0)
+    asyncio.run(check_all(router))
+    assert router.for_read() is primary
+
+    client.lag = 0.5
+    asyncio.run(check_all(router))
+    assert router.for_read() is client
+
+
+def test_pin_fija_al_primario_hasta_que_caduca(clock):
+    replica = FakeClient("r1")
+    primary, router = make_router(replica, pin_seconds=10.0)
+    asyncio.run(check_all(router))
+
+    router.pin("user-1")
+    assert router.for_read("user-1") is primary
+    # Otros usuarios siguen leyendo de la réplica
+    assert router.for_read("user-2") is replica
+    assert router.for_read() is replica
+
+    clock[0] += 9.0
+    assert router.for_read("user-1") is primary
+
+    clock[0] += 2.0
+    assert router.for_read("user-1") is replica
+    assert not router.is_pinned("user-1")
+
+
+def test_pin_sin_replicas_no_guarda_nada():
+    primary, router = make_router()
+    router.pin("user-1")
+    assert not router._pins
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+from cache import TTLCache
+from invalidation import InvalidationBus
+
+
+def notify(bus, topic, key, origin):
+    bus._on_notify(None, 1234, bus.channel, json.dumps({"t": topic, "k": key, "o": origin}))
+
+
+def test_publish_ejecuta_los_suscriptores_locales():
+    bus = InvalidationBus()
+    received = []
+
+    async def async_handler(key):
+        received.append(("async", key))
+
+    bus.subscribe("property", lambda key: received.append(("sync", key)))
+    bus.subscribe("property", async_handler)
+    bus.subscribe("post", lambda key: received.append(("post", key)))
+
+    asyncio.run(bus.publish("property", "p1"))
+
+    assert received == [("sync", "p1"), ("async", "p1")]
+
+
+def test_un_suscriptor_que_falla_no_corta_a_los_demas():
+    bus = InvalidationBus()
+    received = []
+
+    def broken(key):
+        raise RuntimeError("fallo")
+
+    bus.subscribe("property", broken)
+    bus.subscribe("property", received.append)
+
+    asyncio.run(bus.publish("property", "p1"))
+
+    assert received == ["p1"]
+
+
+def test_ignora_los_eventos_propios():
+    bus = InvalidationBus()
+    received = []
+    bus.subscribe("property", received.append)
+
+    async def run():
+        notify(bus, "property", "p1", bus.origin)
+        notify(bus, "property", "p2", "otro-worker")
+        # Deja correr las tareas creadas por _on_notify
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert received == ["p2"]
+
+
+def test_guarda_las_tareas_de_despacho_hasta_que_terminan():
+    bus = InvalidationBus()
+    received = []
+
+    async def slow_handler(key):
+        await asyncio.sleep(0)
+        received.append(key)
+
+    bus.subscribe("property", slow_handler)
+
+    async def run():
+        notify(bus, "property", "p1", "otro-worker")
+        assert len(bus._tasks) == 1
+        await asyncio.gather(*bus._tasks)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert received == ["p1"]
+    assert not bus._tasks
+
+
+def test_ignora_payloads_no_validos():
+    bus = InvalidationBus()
+    received = []
+    bus.subscribe("property", received.append)
+
+    async def run():
+        bus._on_notify(None, 1234, bus.channel, "no es json")
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert received == []
+
+
+def test_vacia_todas_las_caches_tras_reconectar():
+    bus = InvalidationBus(dsn="postgresql://invalid", reconnect_delay=0)
+    properties = TTLCache("test-properties")
+    posts = TTLCache("test-posts")
+    properties.set("p1", b"{}")
+    posts.set("post-1", b"{}")
+    bus.subscribe("property", properties.invalidate)
+    bus.subscribe("post", posts.invalidate)
+
+    attempts = []
+
+    async def fake_connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("todavía caído")
+
+    bus._connect = fake_connect
+
+    async def run():
+        bus._on_terminated(None)
+        await bus._reconnect_task
+
+    asyncio.run(run())
+
+    assert len(attempts) == 2
+    assert bus._reconnect_task is None
+    assert len(properties) == 0
+    assert len(posts) == 0
+
+
+def test_no_reconecta_al_cerrar():
+    bus = InvalidationBus(dsn="postgresql://invalid")
+    bus._closing = True
+
+    async def run():
+        bus._on_terminated(None)
+
+    asyncio.run(run())
+
+    assert bus._reconnect_task is None
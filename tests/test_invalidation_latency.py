@@ -0,0 +1,93 @@
+"""
+Una escritura en un worker se ve desde los demás en menos de 100 ms
+(invalidación de cachés con LISTEN/NOTIFY).
+
+Arranca gunicorn con 4 workers (`benchmarks.stub_app`), calienta la caché del
+detalle de una propiedad en todos ellos, cambia el precio y mide cuánto tarda
+en verse el nuevo valor desde conexiones nuevas (que gunicorn reparte entre
+workers). Necesita un PostgreSQL con el esquema aplicado:
+
+    TEST_DATABASE_URL=postgresql://... python -m pytest tests/test_invalidation_latency.py
+"""
+import asyncio
+import os
+import subprocess
+import time
+
+import pytest
+
+DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL no configurada")
+
+WORKERS = 4
+ROUNDS = 10
+READERS = 16
+LIMIT_MS = 100
+
+
+async def fresh_get(httpx, base_url, path):
+    # Conexión nueva en cada petición para repartir entre workers
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        return (await client.get(path)).json()
+
+
+async def measure(httpx, base_url, admin_email, admin_password):
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        token = (await client.post(
+            "/api/token", data={"username": admin_email, "password": admin_password}
+        )).json()["access_token"]
+        property_id = (await client.get("/api/properties", params={"limit": 1})).json()[0]["id"]
+    headers = {"Authorization": f"Bearer {token}"}
+    path = f"/api/properties/{property_id}"
+
+    latencies = []
+    for round_number in range(ROUNDS):
+        # Calentar la caché en todos los workers
+        await asyncio.gather(*(fresh_get(httpx, base_url, path) for _ in range(READERS * WORKERS)))
+
+        new_price = 100000.0 + round_number
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            response = await client.patch(path, json={"price": new_price}, headers=headers)
+            response.raise_for_status()
+        written_at = time.perf_counter()
+
+        # Hasta que READERS lecturas seguidas desde conexiones nuevas vean el precio nuevo
+        while time.perf_counter() - written_at < 5:
+            results = await asyncio.gather(*(fresh_get(httpx, base_url, path) for _ in range(READERS)))
+            if all(body["price"] == new_price for body in results):
+                break
+        latencies.append((time.perf_counter() - written_at) * 1000)
+    return latencies
+
+
+def test_un_cambio_se_ve_en_todos_los_workers_en_menos_de_100_ms():
+    httpx = pytest.importorskip("httpx")
+    pytest.importorskip("gunicorn")
+    from benchmarks.run_load import (
+        BACKEND_DIR, BENCH_ADMIN_EMAIL, BENCH_ADMIN_PASSWORD, free_port, seed_catalog, wait_until_up
+    )
+
+    asyncio.run(seed_catalog(DATABASE_URL, properties=50, posts=5, images_per_property=1, seed=1))
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        ["gunicorn", "-c", "gunicorn.conf.py", "benchmarks.stub_app:app"],
+        cwd=BACKEND_DIR,
+        env={
+            **os.environ,
+            "DATABASE_URL": DATABASE_URL,
+            "BIND": f"127.0.0.1:{port}",
+            "WEB_CONCURRENCY": str(WORKERS),
+            "ACCESS_LOG": "/dev/null"
+        }
+    )
+    try:
+        asyncio.run(wait_until_up(base_url))
+        latencies = asyncio.run(measure(httpx, base_url, BENCH_ADMIN_EMAIL, BENCH_ADMIN_PASSWORD))
+    finally:
+        server.terminate()
+        server.wait()
+
+    assert max(latencies) <= LIMIT_MS, f"Latencias por ronda (ms): {[round(ms, 1) for ms in latencies]}"
@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime, timezone
+
+from types import SimpleNamespace
+
+import pytest
+
+import jobs
+from jobs import JobQueue
+
+
+class FakeJobTable:
+    def __init__(self, jobs=()):
+        self.jobs = {job.id: job for job in jobs}
+        self.updates = []
+
+    async def update(self, where, data):
+        self.updates.append((where["id"], data))
+
+    async def find_unique(self, where):
+        return self.jobs.get(where["id"])
+
+    async def update_many(self, where, data):
+        job = self.jobs.get(where["id"])
+        if job is None or job.status != where["status"]:
+            return 0
+        for name, value in data.items():
+            setattr(job, name, value)
+        return 1
+
+
+class FakeDB:
+    def __init__(self, jobs=()):
+        self.job = FakeJobTable(jobs)
+
+
+def fail(queue, attempts, max_attempts=5):
+    job = {"id": "job-1", "kind": "test.kind", "attempts": attempts, "max_attempts": max_attempts}
+    asyncio.run(queue._fail(job, RuntimeError("fallo")))
+    job_id, data = queue.db.job.updates[-1]
+    assert job_id == "job-1"
+    return data
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(jobs.random, "uniform", lambda low, high: 1.0)
+
+
+def delay_of(data):
+    return (data["runAt"] - datetime.now(timezone.utc)).total_seconds()
+
+
+def test_reintenta_con_backoff_exponencial(no_jitter):
+    queue = JobQueue(FakeDB(), backoff_base=5.0, backoff_max=3600.0)
+
+    for attempts, expected in [(1, 5.0), (2, 10.0), (3, 20.0), (4, 40.0)]:
+        data = fail(queue, attempts, max_attempts=10)
+        assert data["status"] == "PENDING"
+        assert data["lockedAt"] is None
+        assert data["lastError"] == "RuntimeError: fallo"
+        assert delay_of(data) == pytest.approx(expected, abs=1.0)
+
+
+def test_el_backoff_no_pasa_del_maximo(no_jitter):
+    queue = JobQueue(FakeDB(), backoff_base=5.0, backoff_max=60.0)
+
+    data = fail(queue, attempts=9, max_attempts=10)
+
+    assert delay_of(data) == pytest.approx(60.0, abs=1.0)
+
+
+def test_el_jitter_queda_dentro_del_20_por_ciento():
+    queue = JobQueue(FakeDB(), backoff_base=100.0)
+
+    for _ in range(20):
+        delay = delay_of(fail(queue, attempts=1))
+        assert 79.0 <= delay <= 120.0
+
+
+def test_falla_definitivamente_al_agotar_los_intentos():
+    queue = JobQueue(FakeDB())
+
+    data = fail(queue, attempts=5, max_attempts=5)
+
+    assert data == {"status": "FAILED", "lockedAt": None, "lastError": "RuntimeError: fallo"}
+
+
+def test_recorta_el_mensaje_de_error():
+    queue = JobQueue(FakeDB())
+    job = {"id": "job-1", "kind": "test.kind", "attempts": 5, "max_attempts": 5}
+
+    asyncio.run(queue._fail(job, ValueError("x" * 5000)))
+
+    assert len(queue.db.job.updates[-1][1]["lastError"]) == 2000
+
+
+def stored_job(status):
+    return SimpleNamespace(id="job-1", status=status, attempts=5, lockedAt=None, runAt=None)
+
+
+def test_reintentar_un_trabajo_fallido():
+    job = stored_job("FAILED")
+    queue = JobQueue(FakeDB([job]))
+
+    assert asyncio.run(queue.retry("job-1")).id == "job-1"
+    assert job.status == "PENDING"
+    assert job.attempts == 0
+    assert queue._wakeup.is_set()
+
+
+@pytest.mark.parametrize("status", ["PENDING", "RUNNING", "DONE"])
+def test_solo_se_reintentan_trabajos_fallidos(status):
+    job = stored_job(status)
+    queue = JobQueue(FakeDB([job]))
+
+    with pytest.raises(ValueError):
+        asyncio.run(queue.retry("job-1"))
+    assert job.status == status
+    assert job.attempts == 5
+
+
+def test_reintentar_un_trabajo_que_no_existe():
+    assert asyncio.run(JobQueue(FakeDB()).retry("no-existe")) is None
@@ -0,0 +1,155 @@
+import asyncio
+import random
+
+from locations import LocationIndex, street_name
+
+
+class FakeDB:
+    def __init__(self, rows=()):
+        self.rows = {row["id"]: row for row in rows}
+        # Se ejecuta en mitad de la lectura completa (eventos durante una recarga)
+        self.during_load = None
+
+    async def query_raw(self, sql, *args):
+        if args:
+            return [self.rows[property_id] for property_id in args[0] if property_id in self.rows]
+        rows = [row for row in self.rows.values() if row["status"] == "ACTIVE"]
+        if self.during_load is not None:
+            during_load, self.during_load = self.during_load, None
+            await during_load()
+        return rows
+
+
+def listing(property_id, location, city="Madrid", zip_code="28045", address=None, status="ACTIVE"):
+    return {
+        "id": property_id,
+        "status": status,
+        "location": location,
+        "city": city,
+        "zipCode": zip_code,
+        "address": address
+    }
+
+
+def loaded_index(db):
+    index = LocationIndex(db)
+    asyncio.run(index.reload())
+    return index
+
+
+def test_nombre_de_calle_sin_numero():
+    assert street_name("Calle Alfonso I, 12, 3º B") == "Calle Alfonso I"
+    assert street_name("Avenida de América nº 5") == "Avenida de América"
+    assert street_name("Paseo del Prado") == "Paseo del Prado"
+
+
+def test_sugiere_por_cualquier_palabra_sin_tildes_ni_mayusculas():
+    index = loaded_index(FakeDB([
+        listing("p1", "Las Delicias"),
+        listing("p2", "Chamberí"),
+    ]))
+
+    assert [s["text"] for s in index.suggest("deli")] == ["Las Delicias"]
+    assert [s["text"] for s in index.suggest("  LAS  d")] == ["Las Delicias"]
+    assert [s["text"] for s in index.suggest("chamberi")] == ["Chamberí"]
+    assert index.suggest("") == []
+    assert index.suggest("xyz") == []
+
+
+def test_ordena_por_numero_de_anuncios_y_respeta_el_limite():
+    index = loaded_index(FakeDB([
+        listing("p1", "Arganzuela", city="Alcalá"),
+        listing("p2", "Arganzuela", city="Alcalá"),
+        listing("p3", "Aravaca", city="Alcalá"),
+        listing("p4", "Arganzuela", city="Madrid"),
+    ]))
+
+    # A igual número de anuncios, por orden alfabético
+    assert index.suggest("a") == [
+        {"text": "Alcalá", "type": "city", "count": 3},
+        {"text": "Arganzuela", "type": "location", "count": 3},
+        {"text": "Aravaca", "type": "location", "count": 1},
+    ]
+    assert len(index.suggest("a", limit=2)) == 2
+
+
+def test_muestra_la_variante_mas_usada():
+    index = loaded_index(FakeDB([
+        listing("p1", "Chamberí"),
+        listing("p2", "chamberi"),
+        listing("p3", "Chamberí"),
+    ]))
+
+    assert index.suggest("cham") == [{"text": "Chamberí", "type": "location", "count": 3}]
+
+
+def random_row(rng, property_id):
+    return listing(
+        property_id,
+        rng.choice(["Las Delicias", "Delicias", "Chamberí", "chamberi", "Salamanca", "Retiro", ""]),
+        city=rng.choice(["Madrid", "Málaga", "Mérida", None]),
+        zip_code=rng.choice(["28045", "28010", "29001", None]),
+        address=rng.choice([None, "Calle Mayor, 3", "Calle Mayor 10", "Paseo del Prado", "Calle Málaga, 1"]),
+        status=rng.choice(["ACTIVE", "ACTIVE", "ACTIVE", "SOLD"])
+    )
+
+
+def test_refresh_incremental_equivale_a_recargar():
+    rng = random.Random(1)
+    db = FakeDB(random_row(rng, f"p{i}") for i in range(60))
+    index = loaded_index(db)
+
+    for _ in range(300):
+        property_id = f"p{rng.randrange(80)}"
+        if property_id in db.rows and rng.random() < 0.2:
+            del db.rows[property_id]
+        else:
+            db.rows[property_id] = random_row(rng, property_id)
+        asyncio.run(index.refresh(property_id))
+
+    fresh = loaded_index(db)
+    assert index._counts == fresh._counts
+    assert index._labels == fresh._labels
+    assert index._keys == fresh._keys
+    for query in ["m", "ma", "mal", "cal", "deli", "2", "280", "prado", "c"]:
+        assert index.suggest(query, limit=20) == fresh.suggest(query, limit=20)
+
+
+def test_los_cambios_durante_una_recarga_no_se_pierden():
+    db = FakeDB([
+        listing("p1", "Chamberí"),
+        listing("p2", "Retiro"),
+    ])
+    index = loaded_index(db)
+
+    async def concurrent_changes():
+        db.rows["p1"] = listing("p1", "Salamanca")
+        db.rows["p2"] = listing("p2", "Retiro", status="SOLD")
+        db.rows["p3"] = listing("p3", "Las Delicias")
+        for property_id in ("p1", "p2", "p3"):
+            await index.refresh(property_id)
+
+    db.during_load = concurrent_changes
+    asyncio.run(index.reload())
+
+    assert index.suggest("cham") == []
+    assert index.suggest("reti") == []
+    assert [s["text"] for s in index.suggest("sala")] == ["Salamanca"]
+    assert [s["text"] for s in index.suggest("deli")] == ["Las Delicias"]
+
+    fresh = loaded_index(db)
+    assert index._counts == fresh._counts
+    assert index._keys == fresh._keys
+
+
+def test_los_eventos_antes_de_la_primera_carga_no_se_pierden():
+    db = FakeDB([listing("p1", "Chamberí")])
+    index = LocationIndex(db)
+
+    db.rows["p1"] = listing("p1", "Salamanca")
+    asyncio.run(index.refresh("p1"))
+    assert index._pending == {"p1"}
+
+    asyncio.run(index.reload())
+    assert [s["text"] for s in index.suggest("sala")] == ["Salamanca"]
+    assert index.suggest("cham") == []
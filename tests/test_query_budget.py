@@ -0,0 +1,95 @@
+"""
+Número máximo de consultas de los listados y el detalle de propiedades: no
+debe crecer con el número de resultados (N+1).
+
+Usa la app real con `TestClient` contra un PostgreSQL con el esquema aplicado:
+
+    TEST_DATABASE_URL=postgresql://... python -m pytest tests/test_query_budget.py
+"""
+import asyncio
+import os
+import time
+
+import pytest
+
+DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL no configurada")
+
+PAGE_SIZE = 20
+
+
+@pytest.fixture(scope="module")
+def api():
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from benchmarks.run_load import seed_catalog
+
+    asyncio.run(seed_catalog(DATABASE_URL, properties=50, posts=5, images_per_property=3, seed=1))
+
+    with pytest.MonkeyPatch.context() as env:
+        env.setenv("DATABASE_URL", DATABASE_URL)
+        # Sin tareas de fondo que consulten mientras se mide
+        env.setenv("JOB_WORKERS", "0")
+        env.setenv("METRICS_ENABLED", "false")
+        env.setenv("VIEW_FLUSH_INTERVAL", "3600")
+        import server
+
+        with TestClient(server.app) as client:
+            deadline = time.monotonic() + 30
+            while not all(task.done() for task in server.background_tasks):
+                assert time.monotonic() < deadline, "Las precargas no terminaron"
+                time.sleep(0.05)
+            yield server, client
+
+
+def page_ids(client):
+    response = client.get("/api/properties", params={"limit": PAGE_SIZE})
+    response.raise_for_status()
+    return [item["id"] for item in response.json()]
+
+
+def test_listado(api, query_budget):
+    server, client = api
+    server.property_cache.invalidate()
+
+    with query_budget(1):
+        response = client.get("/api/properties", params={"limit": PAGE_SIZE})
+    assert len(response.json()) == PAGE_SIZE
+
+
+def test_listado_del_catalogo_en_memoria(api, query_budget):
+    server, client = api
+    server.property_cache.invalidate()
+
+    # Snapshots de la página y, si faltan, los documentos generados en memoria
+    with query_budget(2):
+        response = client.get("/api/properties", params={"status": "ACTIVE", "limit": PAGE_SIZE})
+    assert response.status_code == 200
+
+
+def test_detalle(api, query_budget):
+    server, client = api
+    property_id = page_ids(client)[0]
+    server.property_cache.invalidate()
+
+    with query_budget(2):
+        response = client.get(f"/api/properties/{property_id}")
+    assert response.json()["id"] == property_id
+
+    # Segunda lectura desde la caché
+    with query_budget(0):
+        client.get(f"/api/properties/{property_id}")
+
+
+def test_varias_propiedades_a_la_vez(api, query_budget):
+    server, client = api
+    property_ids = page_ids(client)
+    server.property_cache.invalidate()
+
+    with query_budget(2):
+        response = client.get("/api/properties/batch", params={"ids": ",".join(property_ids + ["no-existe"])})
+    body = response.json()
+    assert [item["id"] for item in body["properties"]] == property_ids
+    assert body["missing"] == ["no-existe"]
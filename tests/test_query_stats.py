@@ -0,0 +1,98 @@
+import logging
+
+import pytest
+
+from query_stats import QueryStats, redact
+from query_tracking import fingerprint, normalize_sql
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("SELECT * FROM properties WHERE status = 'ACTIVE'", "SELECT * FROM properties WHERE status = ?"),
+    ("SELECT * FROM posts WHERE title = 'l''Eixample'", "SELECT * FROM posts WHERE title = ?"),
+    ("SELECT * FROM properties WHERE price > 250000.5 LIMIT 20", "SELECT * FROM properties WHERE price > ? LIMIT ?"),
+    ("SELECT * FROM properties WHERE id IN ('a', 'b', 'c')", "SELECT * FROM properties WHERE id IN (?)"),
+    ("SELECT * FROM properties WHERE id in ($1,$2, $3)", "SELECT * FROM properties WHERE id IN (?)"),
+    # Los parámetros, identificadores con cifras y casts se conservan
+    ("SELECT p2.id FROM properties p2 WHERE p2.id = $1 AND area::int4 > $2",
+     "SELECT p2.id FROM properties p2 WHERE p2.id = $1 AND area::int4 > $2"),
+    ("SELECT *\n  FROM   properties\n WHERE id = ANY($1)", "SELECT * FROM properties WHERE id = ANY($1)"),
+])
+def test_normaliza_los_literales_del_sql(query, expected):
+    assert normalize_sql(query) == expected
+
+
+def test_la_huella_no_depende_de_los_valores():
+    assert fingerprint("Property", "find_unique", {"where": {"id": "p1"}}) == \
+        "Property.find_unique where={id:?}"
+    assert fingerprint("Property", "find_many", {"where": {"id": {"in": ["p1", "p2"]}, "status": "ACTIVE"}}) == \
+        fingerprint("Property", "find_many", {"where": {"status": "SOLD", "id": {"in": ["p3"]}}})
+    assert fingerprint("Property", "find_many", {"take": 20}) == "Property.find_many"
+
+    first = fingerprint("raw", "query_raw", {"query": "SELECT * FROM properties WHERE id IN ('a', 'b') LIMIT 5"})
+    second = fingerprint("raw", "query_raw", {"query": "SELECT * FROM properties WHERE id IN ('c') LIMIT 50"})
+    assert first == second == "raw.query_raw SELECT * FROM properties WHERE id IN (?) LIMIT ?"
+
+
+def test_redact_oculta_los_datos_de_usuario():
+    arguments = {
+        "where": {"email": "ana@example.com", "price": {"gte": 100_000}, "id": {"in": ["p1", "p2"]}},
+        "data": {"title": "Piso", "bedrooms": 3},
+        "take": 20,
+        "include": {"images": True},
+    }
+
+    assert redact(arguments) == {
+        "where": {"email": "?", "price": {"gte": "?"}, "id": {"in": ["?", "?"]}},
+        "data": {"title": "?", "bedrooms": "?"},
+        "take": 20,
+        "include": {"images": True},
+    }
+    assert redact({"query": "SELECT * FROM users WHERE email = 'ana@example.com'", "parameters": ["p1", 3]}) == {
+        "query": "SELECT * FROM users WHERE email = ?",
+        "parameters": ["?", "?"],
+    }
+
+
+def test_agrupa_por_huella():
+    stats = QueryStats(slow_threshold=10)
+    for property_id, duration in [("p1", 0.01), ("p2", 0.03), ("p3", 0.02)]:
+        stats.observe("Property", "find_unique", {"where": {"id": property_id}}, duration, None)
+    for status in ("ACTIVE", "SOLD"):
+        stats.observe("raw", "query_raw", {"query": f"SELECT count(*) FROM properties WHERE status = '{status}'"},
+                      0.5, None)
+    stats.observe("Property", "find_unique", {"where": {"slug": "piso"}}, 0.01, RuntimeError())
+
+    rows = {row["fingerprint"]: row for row in stats.snapshot()}
+
+    assert set(rows) == {
+        "Property.find_unique where={id:?}",
+        "Property.find_unique where={slug:?}",
+        "raw.query_raw SELECT count(*) FROM properties WHERE status = ?",
+    }
+    by_id = rows["Property.find_unique where={id:?}"]
+    assert (by_id["count"], by_id["totalMs"], by_id["maxMs"], by_id["errors"]) == (3, 60.0, 30.0, 0)
+    assert rows["raw.query_raw SELECT count(*) FROM properties WHERE status = ?"]["count"] == 2
+    assert rows["Property.find_unique where={slug:?}"]["errors"] == 1
+    assert [row["fingerprint"] for row in stats.snapshot(sort="count", limit=1)] == ["Property.find_unique where={id:?}"]
+
+
+def test_las_huellas_nuevas_tienen_limite():
+    stats = QueryStats(max_fingerprints=2)
+    for table in ("a", "b", "c", "d"):
+        stats.observe("raw", "query_raw", {"query": f"SELECT * FROM {table}"}, 0.01, None)
+
+    rows = {row["fingerprint"]: row["count"] for row in stats.snapshot()}
+    assert rows == {"raw.query_raw SELECT * FROM a": 1, "raw.query_raw SELECT * FROM b": 1, "other": 2}
+
+
+def test_el_log_de_consultas_lentas_no_incluye_valores(caplog):
+    stats = QueryStats(slow_threshold=0.2)
+
+    with caplog.at_level(logging.WARNING, logger="slow_queries"):
+        stats.observe("User", "find_first", {"where": {"email": "ana@example.com"}}, 0.1, None)
+        stats.observe("User", "find_first", {"where": {"email": "ana@example.com"}}, 0.3, None)
+
+    assert len(caplog.records) == 1
+    message = caplog.records[0].getMessage()
+    assert "User.find_first where={email:?}" in message
+    assert "ana@example.com" not in message
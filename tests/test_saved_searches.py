@@ -0,0 +1,128 @@
+import asyncio
+import math
+import random
+from types import SimpleNamespace
+
+from saved_searches import IntervalTree, SearchIndex
+
+TYPES = ["piso", "casa", "atico", None]
+LOCATIONS = ["Madrid Centro", "Madrid Norte", "Valencia", "Sevilla"]
+
+
+class FakeSavedSearchTable:
+    def __init__(self, searches):
+        self.searches = searches
+
+    async def find_many(self, where):
+        return [search for search in self.searches.values() if search.active == where["active"]]
+
+    async def find_unique(self, where):
+        return self.searches.get(where["id"])
+
+
+class FakeDB:
+    def __init__(self, searches):
+        self.savedsearch = FakeSavedSearchTable(searches)
+
+
+def random_search(rng, search_id):
+    min_price = rng.choice([None, rng.randrange(0, 500_000, 10_000)])
+    max_price = rng.choice([None, (min_price or 0) + rng.randrange(0, 500_000, 10_000)])
+    return SimpleNamespace(
+        id=search_id,
+        active=rng.random() < 0.9,
+        status=rng.choice([None, "FOR_SALE", "FOR_RENT"]),
+        minPrice=min_price,
+        maxPrice=max_price,
+        bedrooms=rng.choice([None, 0, 1, 2, 3]),
+        propertyType=rng.choice(TYPES),
+        location=rng.choice([None, "Madrid", "Valencia", "Norte"]),
+        featured=rng.choice([None, True, False])
+    )
+
+
+def random_listing(rng):
+    return SimpleNamespace(
+        id="listing",
+        status=rng.choice(["FOR_SALE", "FOR_RENT"]),
+        # Precios redondos para caer a menudo justo en los bordes de los intervalos
+        price=float(rng.randrange(0, 1_000_000, 10_000)),
+        bedrooms=rng.randrange(0, 5),
+        propertyType=rng.choice(TYPES[:-1]),
+        location=rng.choice(LOCATIONS),
+        featured=rng.random() < 0.3
+    )
+
+
+def brute_force(searches, listing):
+    """
+    Las condiciones de `get_properties`, búsqueda a búsqueda
+    """
+    return {
+        search.id
+        for search in searches.values()
+        if search.active
+        and (search.minPrice is None or listing.price >= search.minPrice)
+        and (search.maxPrice is None or listing.price <= search.maxPrice)
+        and (not search.propertyType or search.propertyType == listing.propertyType)
+        and (not search.status or search.status == listing.status)
+        and (not search.bedrooms or listing.bedrooms >= search.bedrooms)
+        and (not search.location or search.location in listing.location)
+        and (search.featured is None or search.featured == listing.featured)
+    }
+
+
+def test_el_arbol_devuelve_los_intervalos_que_contienen_el_punto():
+    rng = random.Random(1)
+    intervals = []
+    for key in range(300):
+        start = rng.choice([-math.inf, rng.randrange(0, 100)])
+        end = rng.choice([math.inf, (0 if start == -math.inf else start) + rng.randrange(0, 50)])
+        intervals.append((start, end, key))
+    tree = IntervalTree(intervals)
+
+    for x in [-5, 0, 0.5, *range(0, 160, 3), 149, 150, 1000]:
+        expected = sorted(key for start, end, key in intervals if start <= x <= end)
+        assert sorted(tree.stab(x, [])) == expected
+
+
+def test_arbol_vacio():
+    assert IntervalTree([]).stab(10, []) == []
+
+
+def test_el_indice_casa_igual_que_la_fuerza_bruta():
+    rng = random.Random(2)
+    searches = {f"s{i}": random_search(rng, f"s{i}") for i in range(400)}
+    index = SearchIndex(FakeDB(searches))
+    asyncio.run(index.reload())
+
+    for _ in range(300):
+        listing = random_listing(rng)
+        matched = index.match(listing)
+        assert len(matched) == len(set(matched))
+        assert set(matched) == brute_force(searches, listing)
+
+
+def test_refresh_incremental_equivale_a_recargar():
+    rng = random.Random(3)
+    searches = {f"s{i}": random_search(rng, f"s{i}") for i in range(200)}
+    index = SearchIndex(FakeDB(searches))
+    asyncio.run(index.reload())
+    listings = [random_listing(rng) for _ in range(100)]
+    # Construye los árboles antes de los cambios para comprobar que se invalidan
+    for listing in listings:
+        index.match(listing)
+
+    for _ in range(150):
+        search_id = f"s{rng.randrange(250)}"
+        if search_id in searches and rng.random() < 0.3:
+            del searches[search_id]
+        else:
+            searches[search_id] = random_search(rng, search_id)
+        asyncio.run(index.refresh(search_id))
+
+    fresh = SearchIndex(FakeDB(searches))
+    asyncio.run(fresh.reload())
+    assert len(index) == len(fresh)
+    for listing in listings:
+        assert set(index.match(listing)) == set(fresh.match(listing)) == brute_force(searches, listing)
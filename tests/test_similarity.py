@@ -0,0 +1,183 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from similarity import SimilarityIndex
+
+TYPES = ["Piso", "Casa", "Ático"]
+TAGS = ["pool", "garage", "lift", "terrace", "Chimenea"]
+
+
+class FakeDB:
+    """
+    Tabla `properties` en memoria. `during_load` se ejecuta en mitad de la
+    lectura completa, para simular eventos que llegan durante una recarga
+    """
+
+    def __init__(self, rows=()):
+        self.rows = {row["id"]: row for row in rows}
+        self.during_load = None
+
+    async def query_raw(self, sql, *args):
+        if args:
+            return [dict(self.rows[property_id]) for property_id in args[0] if property_id in self.rows]
+        rows = [dict(row) for row in self.rows.values() if row["status"] == "ACTIVE"]
+        if self.during_load is not None:
+            during_load, self.during_load = self.during_load, None
+            await during_load()
+        return rows
+
+
+def random_row(rng, property_id, price_scale=1.0):
+    return {
+        "id": property_id,
+        "status": "ACTIVE" if rng.random() < 0.9 else "SOLD",
+        "price": float(rng.lognormal(12.5, 0.5) * price_scale),
+        "area": float(rng.uniform(40, 250)),
+        "bedrooms": int(rng.integers(0, 6)),
+        "bathrooms": int(rng.integers(1, 4)),
+        "latitude": None if rng.random() < 0.1 else float(rng.uniform(41.6, 41.7)),
+        "longitude": None if rng.random() < 0.1 else float(rng.uniform(-0.95, -0.85)),
+        "propertyType": TYPES[rng.integers(len(TYPES))],
+        "energyRating": ["A", "C", "E", "G", None][rng.integers(5)],
+        "features": [tag for tag in TAGS if rng.random() < 0.3]
+    }
+
+
+def loaded_index(db, **options):
+    index = SimilarityIndex(db, **options)
+    asyncio.run(index.reload())
+    return index
+
+
+def brute_force_distances(index, db, vector):
+    """
+    Distancia al cuadrado de `vector` a cada propiedad activa, codificada de cero
+    """
+    return {
+        row["id"]: float(np.sum((index.encode(row).astype(np.float64) - vector) ** 2))
+        for row in db.rows.values()
+        if row["status"] == "ACTIVE"
+    }
+
+
+def assert_nearest_like_brute_force(index, db, property_id, k=6):
+    vector = index.vector(property_id)
+    distances = brute_force_distances(index, db, vector)
+    del distances[property_id]
+    expected = sorted(distances.values())[:k]
+
+    result = index.nearest(vector, k=k, exclude=property_id)
+    assert property_id not in result
+    assert len(result) == min(k, len(distances))
+    # Se comparan distancias, no ids: dos vecinos pueden estar casi empatados en float32
+    assert [distances[other] for other in result] == pytest.approx(expected, rel=1e-4, abs=1e-4)
+
+
+def test_vecinos_como_la_fuerza_bruta():
+    rng = np.random.default_rng(1)
+    db = FakeDB(random_row(rng, f"p{i:03d}") for i in range(400))
+    index = loaded_index(db, initial_capacity=16)
+
+    for property_id in index._ids[:40]:
+        assert_nearest_like_brute_force(index, db, property_id)
+
+
+def test_pocas_propiedades():
+    rng = np.random.default_rng(2)
+    db = FakeDB({**random_row(rng, f"p{i}"), "status": "ACTIVE"} for i in range(3))
+    index = loaded_index(db)
+
+    assert_nearest_like_brute_force(index, db, "p0", k=6)
+    assert SimilarityIndex(db).nearest(np.zeros(4, dtype=np.float32)) == []
+
+
+def test_refresh_incremental_equivale_a_recargar():
+    rng = np.random.default_rng(3)
+    db = FakeDB(random_row(rng, f"p{i:03d}") for i in range(200))
+    # Sin reajuste automático: se compara con la codificación de la misma carga
+    index = loaded_index(db, refit_fraction=10.0)
+
+    for _ in range(150):
+        property_id = f"p{rng.integers(230):03d}"
+        if property_id in db.rows and rng.random() < 0.2:
+            del db.rows[property_id]
+        else:
+            db.rows[property_id] = random_row(rng, property_id)
+        asyncio.run(index.refresh(property_id))
+
+    active = {property_id for property_id, row in db.rows.items() if row["status"] == "ACTIVE"}
+    assert set(index._ids) == active
+    for property_id in active:
+        assert np.array_equal(index.vector(property_id), index.encode(db.rows[property_id]))
+    for property_id in list(active)[:20]:
+        assert_nearest_like_brute_force(index, db, property_id)
+
+
+def test_los_cambios_durante_una_recarga_no_se_pierden():
+    rng = np.random.default_rng(4)
+    db = FakeDB({**random_row(rng, f"p{i:03d}"), "status": "ACTIVE"} for i in range(50))
+    index = loaded_index(db)
+
+    async def concurrent_changes():
+        db.rows["p000"] = {**db.rows["p000"], "price": 5_000_000.0}
+        db.rows["p001"]["status"] = "SOLD"
+        db.rows["p999"] = {**random_row(rng, "p999"), "status": "ACTIVE"}
+        for property_id in ("p000", "p001", "p999"):
+            await index.refresh(property_id)
+
+    db.during_load = concurrent_changes
+    asyncio.run(index.reload())
+
+    assert np.array_equal(index.vector("p000"), index.encode(db.rows["p000"]))
+    assert index.vector("p001") is None
+    assert np.array_equal(index.vector("p999"), index.encode(db.rows["p999"]))
+    assert len(index) == 50
+    assert_nearest_like_brute_force(index, db, "p999")
+
+
+def test_los_eventos_antes_de_la_primera_carga_se_aplican_al_cargar():
+    rng = np.random.default_rng(5)
+    db = FakeDB({**random_row(rng, f"p{i:03d}"), "status": "ACTIVE"} for i in range(10))
+    index = SimilarityIndex(db)
+
+    db.rows["p000"]["status"] = "SOLD"
+    asyncio.run(index.refresh("p000"))
+    assert index._pending == {"p000"}
+
+    asyncio.run(index.reload())
+    assert index.vector("p000") is None
+    assert not index._pending
+
+
+def test_reajusta_tras_muchos_cambios():
+    rng = np.random.default_rng(6)
+    db = FakeDB({**random_row(rng, f"p{i:03d}"), "status": "ACTIVE"} for i in range(100))
+
+    async def run():
+        index = SimilarityIndex(db, refit_fraction=0.1)
+        await index.reload()
+        old_mean = index._mean.copy()
+
+        # Entran anuncios mucho más caros y con un tipo nuevo
+        for i in range(10):
+            property_id = f"n{i}"
+            db.rows[property_id] = {
+                **random_row(rng, property_id, price_scale=10.0), "status": "ACTIVE", "propertyType": "Chalet"
+            }
+            await index.refresh(property_id)
+        assert index._refit_task is not None
+        await index._refit_task
+        return index, old_mean
+
+    index, old_mean = asyncio.run(run())
+
+    fresh = loaded_index(db)
+    assert index._refit_task is None
+    assert index._changes == 0
+    assert index._mean[0] > old_mean[0]
+    np.testing.assert_allclose(index._mean, fresh._mean)
+    assert index._types == fresh._types
+    assert "Chalet" in index._types
+    assert_nearest_like_brute_force(index, db, "n0")
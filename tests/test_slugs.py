@@ -0,0 +1,149 @@
+import asyncio
+
+from slugs import SlugIndex
+
+
+class FakeDB:
+    """
+    Tablas `properties` y `slug_redirects` en memoria, con lo que escribiría el
+    handler (incluido `record_rename`)
+    """
+
+    def __init__(self):
+        self.slugs = {}
+        self.redirects = {}
+        # Se ejecuta entre la lectura de los slugs y la de las redirecciones
+        self.during_load = None
+
+    async def query_raw(self, sql, *args):
+        if "slug_redirects" in sql:
+            return [{"slug": slug, "target_id": target} for slug, target in self.redirects.items()]
+        rows = [{"id": entity_id, "slug": slug} for entity_id, slug in self.slugs.items()]
+        if self.during_load is not None:
+            during_load, self.during_load = self.during_load, None
+            await during_load()
+        return rows
+
+    def create(self, entity_id, slug):
+        self.slugs[entity_id] = slug
+        return [entity_id, slug]
+
+    def rename(self, entity_id, slug):
+        self.redirects.pop(slug, None)
+        self.redirects[self.slugs[entity_id]] = entity_id
+        self.slugs[entity_id] = slug
+        return [entity_id, slug]
+
+    def delete(self, entity_id):
+        del self.slugs[entity_id]
+        self.redirects = {old: target for old, target in self.redirects.items() if target != entity_id}
+        return [entity_id, None]
+
+
+def loaded_index(db):
+    index = SlugIndex("property", db)
+    asyncio.run(index.reload())
+    return index
+
+
+def test_resuelve_el_slug_actual():
+    db = FakeDB()
+    db.create("p1", "piso-centro")
+    index = loaded_index(db)
+
+    assert index.resolve("piso-centro") == ("p1", None)
+    assert index.resolve("no-existe") == (None, None)
+
+
+def test_el_slug_antiguo_redirige_al_actual():
+    db = FakeDB()
+    index = loaded_index(db)
+
+    asyncio.run(index.apply(db.create("p1", "piso-centro")))
+    asyncio.run(index.apply(db.rename("p1", "piso-centro-reformado")))
+    asyncio.run(index.apply(db.rename("p1", "atico-centro")))
+
+    assert index.resolve("atico-centro") == ("p1", None)
+    assert index.resolve("piso-centro") == ("p1", "atico-centro")
+    assert index.resolve("piso-centro-reformado") == ("p1", "atico-centro")
+
+
+def test_un_slug_reutilizado_deja_de_redirigir():
+    db = FakeDB()
+    index = loaded_index(db)
+
+    asyncio.run(index.apply(db.create("p1", "piso-centro")))
+    asyncio.run(index.apply(db.rename("p1", "piso-reformado")))
+    asyncio.run(index.apply(db.create("p2", "piso-centro")))
+
+    assert index.resolve("piso-centro") == ("p2", None)
+    assert index.resolve("piso-reformado") == ("p1", None)
+
+
+def test_al_borrar_desaparecen_sus_redirecciones():
+    db = FakeDB()
+    index = loaded_index(db)
+
+    asyncio.run(index.apply(db.create("p1", "piso-centro")))
+    asyncio.run(index.apply(db.rename("p1", "piso-reformado")))
+    asyncio.run(index.apply(db.delete("p1")))
+
+    assert index.resolve("piso-reformado") == (None, None)
+    assert index.resolve("piso-centro") == (None, None)
+    assert len(index) == 0
+
+
+def test_los_eventos_dejan_el_mismo_indice_que_una_recarga():
+    db = FakeDB()
+    db.create("p1", "piso-1")
+    index = loaded_index(db)
+
+    events = [
+        db.create("p2", "piso-2"),
+        db.rename("p1", "piso-1b"),
+        db.create("p3", "piso-3"),
+        db.rename("p2", "piso-1"),
+        db.rename("p3", "piso-3b"),
+        db.delete("p3"),
+        db.rename("p1", "piso-1c"),
+    ]
+    for key in events:
+        asyncio.run(index.apply(key))
+
+    fresh = loaded_index(db)
+    assert index._ids == fresh._ids
+    assert index._slugs == fresh._slugs
+    assert index._redirects == fresh._redirects
+
+
+def test_una_clave_none_recarga_todo():
+    db = FakeDB()
+    index = loaded_index(db)
+    db.create("p1", "piso-centro")
+
+    asyncio.run(index.apply(None))
+
+    assert index.resolve("piso-centro") == ("p1", None)
+
+
+def test_los_eventos_durante_una_recarga_no_se_pierden():
+    db = FakeDB()
+    db.create("p1", "piso-1")
+    db.create("p2", "piso-2")
+    index = loaded_index(db)
+
+    async def concurrent_changes():
+        for key in (db.rename("p1", "piso-1b"), db.create("p3", "piso-3"), db.delete("p2")):
+            await index.apply(key)
+
+    db.during_load = concurrent_changes
+    asyncio.run(index.reload())
+
+    assert index.resolve("piso-1b") == ("p1", None)
+    assert index.resolve("piso-1") == ("p1", "piso-1b")
+    assert index.resolve("piso-3") == ("p3", None)
+    assert index.resolve("piso-2") == (None, None)
+
+    fresh = loaded_index(db)
+    assert index._ids == fresh._ids
+    assert index._redirects == fresh._redirects
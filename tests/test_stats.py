@@ -0,0 +1,139 @@
+import asyncio
+from datetime import date, datetime, timezone
+
+import pytest
+
+import stats
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        # Pasadas las 23:00 en UTC, ya es el día siguiente en Madrid
+        return datetime(2026, 3, 31, 23, 30, tzinfo=timezone.utc).astimezone(tz)
+
+
+class FakeTx:
+    def __init__(self, db):
+        self.db = db
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute_raw(self, sql, *args):
+        self.db.executed.append((sql.split()[0], args))
+
+
+class FakeDailyStat:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def count(self):
+        return self.rows
+
+
+class FakeDB:
+    def __init__(self, stored_rows=0, series_rows=()):
+        self.dailystat = FakeDailyStat(stored_rows)
+        self.series_rows = list(series_rows)
+        self.executed = []
+        self.queries = []
+
+    def tx(self):
+        return FakeTx(self)
+
+    async def query_raw(self, sql, *args):
+        self.queries.append(args)
+        return self.series_rows
+
+
+def test_el_rollup_usa_el_dia_en_utc(monkeypatch):
+    monkeypatch.setattr(stats, "datetime", FrozenDatetime)
+    db = FakeDB(stored_rows=10)
+
+    asyncio.run(stats.rollup_daily_stats(db, days=2))
+
+    assert db.executed == [("DELETE", ("2026-03-30",)), ("INSERT", ("2026-03-30",))]
+
+
+def test_el_primer_rollup_recalcula_todo():
+    db = FakeDB(stored_rows=0)
+
+    asyncio.run(stats.rollup_daily_stats(db))
+
+    assert {args for _, args in db.executed} == {("1970-01-01",)}
+
+
+@pytest.mark.parametrize("day, interval, expected", [
+    (date(2026, 3, 18), "day", date(2026, 3, 18)),
+    (date(2026, 3, 18), "week", date(2026, 3, 16)),
+    (date(2026, 3, 16), "week", date(2026, 3, 16)),
+    (date(2026, 3, 22), "week", date(2026, 3, 16)),
+    (date(2026, 3, 31), "month", date(2026, 3, 1)),
+])
+def test_inicio_de_intervalo(day, interval, expected):
+    assert stats.bucket_start(day, interval) == expected
+
+
+def test_intervalos_diarios_semanales_y_mensuales():
+    assert list(stats.buckets(date(2026, 2, 27), date(2026, 3, 2), "day")) == [
+        date(2026, 2, 27), date(2026, 2, 28), date(2026, 3, 1), date(2026, 3, 2)
+    ]
+    assert list(stats.buckets(date(2026, 3, 4), date(2026, 3, 23), "week")) == [
+        date(2026, 3, 2), date(2026, 3, 9), date(2026, 3, 16), date(2026, 3, 23)
+    ]
+    assert list(stats.buckets(date(2025, 11, 30), date(2026, 2, 1), "month")) == [
+        date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1), date(2026, 2, 1)
+    ]
+
+
+def test_intervalo_por_defecto_segun_el_rango():
+    assert stats.default_interval(date(2026, 1, 1), date(2026, 3, 1)) == "day"
+    assert stats.default_interval(date(2025, 1, 1), date(2026, 1, 1)) == "week"
+    assert stats.default_interval(date(2020, 1, 1), date(2026, 1, 1)) == "month"
+
+
+def test_la_serie_rellena_los_huecos():
+    db = FakeDB(series_rows=[
+        {"metric": "properties_sold", "bucket": "2026-03-02", "value": 4.0, "samples": 4},
+        {"metric": "days_on_market", "bucket": "2026-03-02", "value": 120.0, "samples": 4},
+        {"metric": "properties_sold", "bucket": "2026-03-04", "value": 1.0, "samples": 1},
+        {"metric": "days_on_market", "bucket": "2026-03-04", "value": 10.0, "samples": 1},
+    ])
+
+    series = asyncio.run(stats.timeseries(
+        db, ["properties_sold", "days_on_market"], date(2026, 3, 1), date(2026, 3, 4), "day"
+    ))
+
+    assert db.queries == [("day", ["properties_sold", "days_on_market"], "2026-03-01", "2026-03-04")]
+    # Sumas: los días sin datos valen 0
+    assert series["properties_sold"] == [
+        {"date": "2026-03-01", "value": 0},
+        {"date": "2026-03-02", "value": 4.0},
+        {"date": "2026-03-03", "value": 0},
+        {"date": "2026-03-04", "value": 1.0},
+    ]
+    # Medias: valor / muestras, y sin dato (no 0) cuando no hay muestras
+    assert series["days_on_market"] == [
+        {"date": "2026-03-01", "value": None},
+        {"date": "2026-03-02", "value": 30.0},
+        {"date": "2026-03-03", "value": None},
+        {"date": "2026-03-04", "value": 10.0},
+    ]
+
+
+def test_la_serie_semanal_usa_el_lunes_como_clave():
+    db = FakeDB(series_rows=[
+        {"metric": "posts_published", "bucket": "2026-03-09", "value": 3.0, "samples": 3},
+    ])
+
+    series = asyncio.run(stats.timeseries(db, ["posts_published"], date(2026, 3, 4), date(2026, 3, 20), "week"))
+
+    assert series["posts_published"] == [
+        {"date": "2026-03-02", "value": 0},
+        {"date": "2026-03-09", "value": 3.0},
+        {"date": "2026-03-16", "value": 0},
+    ]
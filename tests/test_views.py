@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+import views
+from views import ViewBuffer
+
+TODAY = "2026-03-01"
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2026, 3, 1, 23, 59, 59, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    monkeypatch.setattr(views, "datetime", FrozenDatetime)
+
+
+class FakeDB:
+    """
+    Recoge los volcados; `fail` hace fallar el siguiente y `during_flush` se
+    ejecuta mientras está en curso
+    """
+
+    def __init__(self):
+        self.flushed = []
+        self.fail = False
+        self.during_flush = None
+
+    async def execute_raw(self, sql, entity_types, entity_ids, days, views):
+        if self.during_flush is not None:
+            during_flush, self.during_flush = self.during_flush, None
+            during_flush()
+        if self.fail:
+            self.fail = False
+            raise ConnectionError("conexión perdida")
+        self.flushed.append(sorted(zip(entity_types, entity_ids, days, views)))
+        return len(views)
+
+
+def test_vuelca_las_visitas_agrupadas():
+    db = FakeDB()
+    buffer = ViewBuffer(db)
+    for entity_id in ["p1", "p1", "p2", "p1"]:
+        buffer.record("property", entity_id)
+    buffer.record("post", "p1")
+
+    assert asyncio.run(buffer.flush()) == 3
+
+    assert db.flushed == [[
+        ("post", "p1", TODAY, 1),
+        ("property", "p1", TODAY, 3),
+        ("property", "p2", TODAY, 1),
+    ]]
+    assert len(buffer) == 0
+    # Sin visitas nuevas no se consulta la base de datos
+    assert asyncio.run(buffer.flush()) == 0
+    assert len(db.flushed) == 1
+
+
+def test_las_visitas_sobreviven_a_un_volcado_fallido():
+    db = FakeDB()
+    buffer = ViewBuffer(db)
+    buffer.record("property", "p1")
+    buffer.record("property", "p1")
+
+    # Llegan más visitas mientras falla el volcado
+    db.fail = True
+    db.during_flush = lambda: [buffer.record("property", entity_id) for entity_id in ("p1", "p2")]
+    with pytest.raises(ConnectionError):
+        asyncio.run(buffer.flush())
+
+    assert db.flushed == []
+    asyncio.run(buffer.flush())
+    assert db.flushed == [[
+        ("property", "p1", TODAY, 3),
+        ("property", "p2", TODAY, 1),
+    ]]
+    assert len(buffer) == 0
+
+
+def test_el_bucle_sigue_tras_un_fallo_y_stop_vuelca_lo_pendiente():
+    db = FakeDB()
+    buffer = ViewBuffer(db, flush_interval=0.01)
+
+    async def run():
+        db.fail = True
+        buffer.record("property", "p1")
+        buffer.start()
+        await asyncio.sleep(0.05)
+        buffer.record("property", "p2")
+        await buffer.stop()
+
+    asyncio.run(run())
+
+    flushed = [row for rows in db.flushed for row in rows]
+    assert sorted(flushed) == [("property", "p1", TODAY, 1), ("property", "p2", TODAY, 1)]
+    assert len(buffer) == 0